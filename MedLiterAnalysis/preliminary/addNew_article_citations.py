@@ -3,30 +3,36 @@ Created on Jul 18, 2014
 
 @author: munichong
 '''
-import csv
-
-old_article_line = {}
-with open( '../article_citations_old.csv', 'r' ) as aco:
-    aco = csv.reader( aco )
-    for line in aco:
-        art_file = line[2]
-        old_article_line[ art_file ] = line[6] + ',' + line[7]
+import csv, os
 
+def read_old_citations(path='../article_citations_old.csv'):
+    """ key: article file   value: [citations, result title] """
+    old_article_line = {}
+    with open( path, 'r' ) as aco:
+        aco = csv.reader( aco )
+        for line in aco:
+            art_file = line[2]
+            old_article_line[ art_file ] = [ line[6], line[7] ]
+    return old_article_line
 
-output = []
-with open( '../qualified_articles.csv', 'r' ) as qa:
-    qa = csv.reader( qa )
-    for line in qa:
+def merge_old_citations(qualified_rows, old_article_line):
+    for line in qualified_rows:
         art_file = line[2]
-        if old_article_line.has_key( art_file ):
+        if art_file in old_article_line:
             """ if this article is OLD """
-            output.append( ','.join( line ) + ',' + old_article_line[ art_file ] )
+            yield line + old_article_line[ art_file ]
         else: 
             """ if this article is NEW """   
-            output.append( ','.join( line ) )
-       
+            yield line
+
+
+if __name__ == '__main__':
+    old_article_line = read_old_citations()
+    with open( '../qualified_articles.csv', 'r' ) as qa:
+        output = list( merge_old_citations( csv.reader( qa ), old_article_line ) )
         
-with open( '../article_citations.csv', 'w' ) as acn: 
-    for line in output:
-        acn.write( line + '\n' )
-        
\ No newline at end of file
+    with open( '../article_citations.csv', 'w' ) as acn: 
+        for line in output:
+            acn.write( ','.join( line ) + '\n' )
+    if os.path.exists( '../article_citations.csv.journal' ):
+        os.remove( '../article_citations.csv.journal' ) # the 'result_writer' journal of the old file
@@ -3,61 +3,150 @@ Created on Jul 15, 2014
 
 @author: munichong
 '''
-import csv, pickle
+import csv, pickle, sys, tempfile, zlib
 from extend_known_grants import Publication, Grant
 
-def grant_cite_ifr():
-    grant_dict = {}
-    with open( '../article_cite_ifr.csv', 'r' ) as aci:
-        aci = csv.reader( aci )
-        for line in aci:
-            grantNo = line[6]
-            
-            if not grant_dict.has_key( grantNo ):
-                grant_dict[ grantNo ] = { 'citations':[], 'impact_factors':[] }
-                
-            impactFactor = line[5]
-            citations = line[7]    
-            grant_dict[ grantNo ][ 'citations' ].append( citations )
-            grant_dict[ grantNo ][ 'impact_factors' ].append( impactFactor )
-            
-    with open( '../articleCiteIf.csv', 'w' ) as aci_new:
-        aci_new = csv.writer( aci_new )
-        for grantNo, info in grant_dict.items():
-            combine = zip( info['citations'], info['impact_factors'] )
+""" a grant group is kept in memory until this many rows are buffered, then the rows are spilled to disk """
+MAX_BUFFERED_ROWS = 1000000
+SPILL_PARTITIONS = 16
+
+def _partition(grantNo, level):
+    """ a stable hash (unlike hash() of a str), salted by the level so a partition splits again on a new hash """
+    return zlib.crc32( ( '%d:%s' % (level, grantNo) ).encode('utf-8') ) % SPILL_PARTITIONS
+
+def grant_groups(rows, max_rows=MAX_BUFFERED_ROWS, sorted_input=False, spill_dir=None, level=0):
+    """
+    Yields (grantNo, [ (citations, impact factor) ]) for the rows (grant, citations, impact factor).
+    sorted_input: the rows of a grant are consecutive, only one group is held at a time
+    otherwise the groups are hashed in memory until max_rows rows are buffered; then every row is spilled
+    to one of SPILL_PARTITIONS files by the hash of its grant, and the partitions are grouped one by one
+    (again split if one is still too large), so memory stays bounded by max_rows however large the input.
+    The groups come in the order of the first row of each grant unless the rows are spilled.
+    """
+    if sorted_input:
+        grantNo, group = None, []
+        for grant, citations, impactFactor in rows:
+            if group and grant != grantNo:
+                yield grantNo, group
+                group = []
+            grantNo = grant
+            group.append( (citations, impactFactor) )
+        if group:
+            yield grantNo, group
+        return
+
+    groups = {}
+    buffered = 0
+    rows = iter(rows)
+    for grant, citations, impactFactor in rows:
+        groups.setdefault( grant, [] ).append( (citations, impactFactor) )
+        buffered += 1
+        if buffered >= max_rows and level < 4: # beyond that, a single grant has more rows than max_rows
+            break
+    else:
+        for grantNo, group in groups.items():
+            yield grantNo, group
+        return
+
+    """ spill the buffered groups and the rest of the rows """
+    partitions = [ tempfile.TemporaryFile( 'w+', newline='', encoding='utf8', dir=spill_dir ) for _ in range(SPILL_PARTITIONS) ]
+    writers = [ csv.writer(partition) for partition in partitions ]
+    for grantNo, group in groups.items():
+        writers[ _partition(grantNo, level) ].writerows( [grantNo, c, i] for c, i in group )
+    groups = None
+    for grant, citations, impactFactor in rows:
+        writers[ _partition(grant, level) ].writerow( [grant, citations, impactFactor] )
+    for partition in partitions:
+        partition.seek(0)
+        for group in grant_groups( csv.reader(partition), max_rows, False, spill_dir, level + 1 ):
+            yield group
+        partition.close()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def h_index(citations):
+    """ the largest h such that h articles have at least h citations each """
+    h = 0
+    for rank, c in enumerate( sorted(citations, reverse=True), 1 ):
+        if c < rank:
+            break
+        h = rank
+    return h
+
+def grant_aggregates(grantNo, group):
+    """
+    [grant, articles, articles with citations, total citations, mean citations, median citations,
+     IF-weighted citations (sum of citations * impact factor), mean impact factor, h-index]
+    """
+    citations = [ c for c in ( _number(c) for c, i in group ) if c is not None ]
+    factors = [ f for f in ( _number(i) for c, i in group ) if f is not None ]
+    weighted = sum( c * f for c, f in ( ( _number(c), _number(i) ) for c, i in group ) if c is not None and f is not None )
+    ordered = sorted(citations)
+    n = len(ordered)
+    median = ( ordered[n // 2] if n % 2 else ( ordered[n // 2 - 1] + ordered[n // 2] ) / 2.0 ) if n else ''
+    return [ grantNo, len(group), n, sum(citations), round( sum(citations) / n, 3 ) if n else '', median,
+             round(weighted, 3), round( sum(factors) / len(factors), 3 ) if factors else '', h_index(citations) ]
+
+def grant_cite_ifr(path='../article_cite_ifr.csv', output_path='../articleCiteIf.csv',
+                   aggregates_path='../grant_aggregates.csv', max_rows=MAX_BUFFERED_ROWS, sorted_input=False):
+    """ articleCiteIf.csv and the numeric aggregates of 'grant_aggregates' of every grant, in one pass """
+    with open( path, 'r' ) as aci, open( output_path, 'w', newline='' ) as aci_new, open( aggregates_path, 'w', newline='' ) as agg:
+        aci_new, agg = csv.writer( aci_new ), csv.writer( agg )
+        rows = ( ( line[6], line[7], line[5] ) for line in csv.reader( aci ) if len(line) >= 8 )
+        num_of_grant = 0
+        for grantNo, group in grant_groups( rows, max_rows, sorted_input ):
             output = [ grantNo ]
-            for c, i in combine:
-                string = 'Cited by: ' + c + '  Impact Factor: ' + i
-                output.append( string )
+            for c, i in group:
+                output.append( 'Cited by: ' + c + '  Impact Factor: ' + i )
             aci_new.writerow( output )
+            agg.writerow( grant_aggregates( grantNo, group ) )
+            num_of_grant += 1
+    return num_of_grant
 
-def output_final_grants():
-    grants_final = pickle.load( open('../grants_final.pkl', 'rb') )
-    
-    csv_writer = csv.writer( open('../grants_final.csv', 'w', encoding="utf8", newline='') )
-    num_of_grant = 0
+def final_grant_rows(grants_final):
     for grant in grants_final:
-        num_of_grant += 1
-        print("Processing Grant", num_of_grant)
-        
         row1 = [ grant.grantID ]
         for pub in grant.publications:
             row2 = [pub.relative_path, pub.title, pub.journal, " & ".join(pub.authors)]
             row2.append(pub.citation) if hasattr(pub, 'citation') else row2.append("")
-            csv_writer.writerow(row1 + row2)
+            yield row1 + row2
+
+def output_final_grants(grants_final=None, path='../grants_final.csv'):
+    if grants_final is None:
+        grants_final = pickle.load( open('../grants_final.pkl', 'rb') )
+    
+    csv_writer = csv.writer( open(path, 'w', encoding="utf8", newline='') )
+    num_of_grant = 0
+    for grant in grants_final:
+        num_of_grant += 1
+        print("Processing Grant", num_of_grant)
+        csv_writer.writerows( final_grant_rows( [grant] ) )
         
-def statistics():
-    csv_reader = csv.reader(open('../grants_final.csv', 'r', encoding='utf-8'))
+def pub_count_distribution(grantIDs):
+    """ { number of publications: number of grants having that many publications } """
     ans1 = {}
-    for row in csv_reader:
-        grantID = row[0]
+    for grantID in grantIDs:
         ans1[grantID] = ans1.get(grantID, 0) + 1
     ans2 = {}
     for grantID, pub_count in ans1.items():
         ans2[pub_count] = ans2.get(pub_count, 0) + 1
-    print(ans2)
+    return ans2
+
+def statistics(grants_final_path='../grants_final.csv'):
+    """ see 'grant_statistics' for the other metrics; its report is cached by the digest of the file """
+    from grant_statistics import grant_report
+    print(dict( grant_report(grants_final_path)['publications_per_grant']['distribution'] ))
     
     
 if __name__ == "__main__":
-    statistics()
+    if 'aggregate' in sys.argv[1:]:
+        """ python alter_representation.py aggregate [sorted] : articleCiteIf.csv and grant_aggregates.csv """
+        print(grant_cite_ifr( sorted_input='sorted' in sys.argv[1:] ), "grants are aggregated.")
+    else:
+        statistics()
     
\ No newline at end of file
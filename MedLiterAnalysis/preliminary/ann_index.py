@@ -0,0 +1,154 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Corpus-wide recall of publications for every grant, without requiring a shared author.
+
+'extend_known_grants' only considers an article for a grant when one of its authors is already
+in the grant's authors pool. This module indexes the body embeddings of 'embedding_store' with
+random-hyperplane LSH (sign bits of random projections, which approximate the cosine) and
+retrieves the top-k publications closest to each grant's seed centroid by looking up a few
+buckets instead of scanning the whole store. The candidates of the buckets are reranked exactly.
+
+    python embedding_store.py 128 corpus   # embeddings of every article in the corpus
+    python ann_index.py 50                 # top-50 per grant, with the recall against exact search
+'''
+import csv, pickle, sys, time
+import numpy as np
+from embedding_store import EmbeddingStore
+
+
+class LSHIndex:
+    def __init__(self, vectors, n_tables=8, n_bits=16, seed=0, chunk_size=100000):
+        assert n_bits <= 64
+        self.vectors = vectors
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        rng = np.random.RandomState(seed)
+        self.planes = rng.standard_normal( (n_tables, n_bits, vectors.shape[1]) ).astype(np.float32)
+        self.weights = ( np.uint64(1) << np.arange(n_bits, dtype=np.uint64) )
+
+        """ for each table: codes sorted and the rows in that order, so a bucket is a searchsorted range """
+        codes = np.empty( (n_tables, len(vectors)), dtype=np.uint64 )
+        for start in range(0, len(vectors), chunk_size):
+            codes[:, start : start + chunk_size] = self.hash( vectors[start : start + chunk_size] )
+        self.rows = np.argsort(codes, axis=1, kind='stable')
+        self.codes = np.take_along_axis(codes, self.rows, axis=1)
+
+    def hash(self, vectors):
+        """ [n_tables, num_of_vectors] bucket codes """
+        bits = np.einsum( 'tbd,nd->tnb', self.planes, np.asarray(vectors, dtype=np.float32) ) > 0
+        return ( bits.astype(np.uint64) * self.weights ).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, query, multiprobe=True):
+        """ rows sharing a bucket with the query in any table (and the buckets one bit away if multiprobe) """
+        codes = self.hash( query[np.newaxis, :] )[:, 0]
+        found = []
+        for t in range(self.n_tables):
+            probes = [ codes[t] ]
+            if multiprobe:
+                probes += [ codes[t] ^ w for w in self.weights ]
+            for code in probes:
+                lo = np.searchsorted(self.codes[t], code, side='left')
+                hi = np.searchsorted(self.codes[t], code, side='right')
+                if hi > lo:
+                    found.append( self.rows[t, lo:hi] )
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique( np.concatenate(found) )
+
+    def query(self, query, k, exclude=(), multiprobe=True):
+        """ (rows, similarities) of the approximate top-k, most similar first, and the number of rows examined """
+        rows = self.candidates(query, multiprobe)
+        if len(exclude):
+            rows = rows[ ~np.isin(rows, exclude) ]
+        return top_k(rows, self.vectors[rows] @ query, k) + ( len(rows), )
+
+    def save(self, path):
+        np.savez(path, planes=self.planes, rows=self.rows, codes=self.codes)
+
+    @staticmethod
+    def load(path, vectors):
+        index = LSHIndex.__new__(LSHIndex)
+        with np.load(path) as data:
+            index.planes, index.rows, index.codes = data['planes'], data['rows'], data['codes']
+        index.vectors = vectors
+        index.n_tables, index.n_bits = index.planes.shape[:2]
+        index.weights = ( np.uint64(1) << np.arange(index.n_bits, dtype=np.uint64) )
+        return index
+
+
+def top_k(rows, similarity, k):
+    if len(rows) > k:
+        best = np.argpartition(-similarity, k)[:k]
+        rows, similarity = rows[best], similarity[best]
+    order = np.argsort(-similarity, kind='stable')
+    return rows[order], similarity[order]
+
+def exact_query(vectors, query, k, exclude=(), chunk_size=100000):
+    """ brute-force top-k over the whole store, to measure the recall of the index """
+    rows, similarity = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk_rows = np.arange( start, min(start + chunk_size, len(vectors)) )
+        chunk_similarity = vectors[start : start + chunk_size] @ query
+        rows, similarity = top_k( np.concatenate([rows, chunk_rows]), np.concatenate([similarity, chunk_similarity]), k + len(exclude) )
+    keep = ~np.isin(rows, exclude)
+    return rows[keep][:k], similarity[keep][:k]
+
+def recall_grants(grants, store, index, k, measure_recall=True):
+    """
+    Returns the recalled (grantID, relative_path, similarity, is_candidate) of every grant and a report
+    of the recall@k against exact search and of the time spent by both.
+    """
+    results = []
+    recalls = []
+    examined = []
+    ann_time = exact_time = 0.0
+    for grant in grants:
+        seed_rows, _ = store.rows( [ pub for pub in grant.publications if pub.isSeed ] )
+        centroid = store.centroid(seed_rows)
+        if centroid is None:
+            continue
+        candidate_paths = set( pub.relative_path for pub in grant.publications if not pub.isSeed )
+
+        start = time.time()
+        rows, similarity, num_examined = index.query(centroid, k, exclude=seed_rows)
+        ann_time += time.time() - start
+        examined.append(num_examined)
+        for row, simi in zip(rows, similarity):
+            relative_path = store.ids[row]
+            results.append( (grant.grantID, relative_path, float(simi), relative_path in candidate_paths) )
+
+        if measure_recall:
+            start = time.time()
+            exact_rows, _ = exact_query(store.vectors, centroid, k, exclude=seed_rows)
+            exact_time += time.time() - start
+            if len(exact_rows):
+                recalls.append( len( np.intersect1d(rows, exact_rows) ) / float( len(exact_rows) ) )
+
+    report = { 'grants': len(examined), 'k': k, 'store_size': len(store),
+               'mean_rows_examined': float(np.mean(examined)) if examined else 0.0,
+               'ann_seconds': ann_time }
+    if measure_recall:
+        report['recall_at_k'] = float(np.mean(recalls)) if recalls else None
+        report['exact_seconds'] = exact_time
+    return results, report
+
+
+if __name__ == '__main__':
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    store = EmbeddingStore()
+    start = time.time()
+    index = LSHIndex(store.vectors)
+    print("LSH index of", len(store), "publications is built in %.1f seconds." % (time.time() - start))
+
+    grant_withCandiPubs = pickle.load( open('../grantsWithCandiPubs.pkl', 'rb') ) # The pkl file is created in 'extend_known_grants'
+    results, report = recall_grants(grant_withCandiPubs, store, index, k)
+    print(report)
+
+    """ the recalled publications which do not share an author with the grant are the uncredited candidates """
+    with open('../ann_recalled_pubs.csv', 'w', encoding="utf8", newline='') as outfile:
+        csv_writer = csv.writer(outfile)
+        for grantID, relative_path, similarity, is_candidate in results:
+            csv_writer.writerow( [grantID, relative_path, "%.4f" % similarity, "author matched" if is_candidate else "new"] )
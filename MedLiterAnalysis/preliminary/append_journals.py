@@ -9,25 +9,29 @@ without overwriting the impact factors that have been found
 
 '''
 import csv
-unique_journals = set()
-""" Read all journals which are up-to-dated """
-with open( '../article_citations.csv', 'r') as ac:
-    ac = csv.reader( ac )
-    for line in ac:
+from journal_index import JournalIndex
+
+def article_journals(article_rows):
+    """ Read all journals which are up-to-dated """
+    unique_journals = set()
+    for line in article_rows:
         journal = line[4].lower()
         unique_journals.add( journal )
+    return unique_journals
+
+def new_journals(unique_journals, path='../journal_impactfactor.csv'):
+    """ Read all journals which have been processed before, under any spelling (see 'journal_index') """
+    index = JournalIndex.load( path )
+    return set( journal for journal in unique_journals if not index.contains( journal ) )
+
+def append_journals(journals, path='../journal_impactfactor.csv'):
+    """ append new journals """
+    with open( path, 'a') as ji_new:    
+        for jn in journals:
+            ji_new.write( '\n' + jn )
+
 
-""" Read all journals which have been processed before """
-with open( '../journal_impactfactor.csv', 'r') as ji:
-    ji = csv.reader( ji )
-    for line in ji:
-        journal = line[0].lower()
-        if journal in unique_journals:
-            unique_journals.discard( journal )
-
-""" append new journals """
-with open( '../journal_impactfactor.csv', 'a') as ji_new:    
-    for jn in unique_journals:
-        ji_new.write( '\n' + jn )
-    
-    
\ No newline at end of file
+if __name__ == '__main__':
+    with open( '../article_citations.csv', 'r') as ac:
+        unique_journals = article_journals( csv.reader( ac ) )
+    append_journals( new_journals( unique_journals ) )
@@ -0,0 +1,149 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Count citations offline from the reference lists of the corpus itself.
+
+One parallel pass over the corpus extracts, for every NXML file, its identifiers (pmid, DOI and
+normalized title) and the identifiers of every <ref> of its <ref-list>. References are then resolved
+to corpus articles by pmid, else DOI, else title, and every article gets the number of distinct
+corpus articles citing it. These are citations within the corpus only, so they are lower than the
+counts of Google Scholar, but they need no query at all.
+
+    article_citations_offline.csv   the rows of qualified_articles.csv + citations in the corpus + own title
+                                    (the layout of article_citations.csv)
+
+    python citation_index.py [workers]
+'''
+import csv, os, re, sys
+from multiprocessing import Pool
+from extend_known_grants import DATA_ROOT, FOLDERS, iter_corpus_files
+from parse_documents import remove_tags
+from title_matching import title_key
+
+REF_LIST_RE = re.compile( r'<ref-list[\s\S]*?</ref-list>' )
+REF_RE = re.compile( r'<ref[\s>][\s\S]*?</ref>' )
+ARTICLE_META_RE = re.compile( r'<article-meta[\s\S]*?</article-meta>' )
+ARTICLE_PMID_RE = re.compile( r'<article-id pub-id-type="pmid"[^>]*>([\s\S]*?)</article-id>' )
+ARTICLE_DOI_RE = re.compile( r'<article-id pub-id-type="doi"[^>]*>([\s\S]*?)</article-id>' )
+ARTICLE_TITLE_RE = re.compile( r'<title-group[\s\S]*?>[\s\S]*?<article-title[^>]*>([\s\S]*?)</article-title>' )
+REF_PMID_RE = re.compile( r'<pub-id pub-id-type="pmid"[^>]*>([\s\S]*?)</pub-id>' )
+REF_DOI_RE = re.compile( r'<pub-id pub-id-type="doi"[^>]*>([\s\S]*?)</pub-id>' )
+REF_TITLE_RE = re.compile( r'<article-title[^>]*>([\s\S]*?)</article-title>' )
+
+""" shorter titles are too generic to identify an article on their own """
+MIN_TITLE_WORDS = 4
+
+
+def _first(regex, text):
+    match = regex.search(text)
+    return match.group(1).strip() if match else ''
+
+def _title(raw_title):
+    key = title_key( remove_tags(raw_title) ) if raw_title else ''
+    return key if len( key.split() ) >= MIN_TITLE_WORDS else ''
+
+def article_identifiers(fdata):
+    """ (pmid, lower-cased DOI, title key) of an article, '' where missing """
+    meta = ARTICLE_META_RE.search(fdata)
+    meta = meta.group(0) if meta else fdata
+    return ( _first(ARTICLE_PMID_RE, meta), _first(ARTICLE_DOI_RE, meta).lower(), _title( _first(ARTICLE_TITLE_RE, meta) ) )
+
+def reference_identifiers(fdata):
+    """ (pmid, lower-cased DOI, title key) of every reference of the <ref-list>s """
+    references = []
+    for ref_list in REF_LIST_RE.findall(fdata):
+        for ref in REF_RE.findall(ref_list):
+            references.append( ( _first(REF_PMID_RE, ref), _first(REF_DOI_RE, ref).lower(), _title( _first(REF_TITLE_RE, ref) ) ) )
+    return references
+
+def _parse_file(item):
+    relative_path, path = item
+    fdata = open(path, 'r').read()
+    return relative_path, article_identifiers(fdata), reference_identifiers(fdata)
+
+def parse_corpus(items, workers=1):
+    """ items: (relative path, file path); yields (relative path, identifiers, reference identifiers) """
+    if workers > 1:
+        pool = Pool(workers)
+        for result in pool.imap_unordered(_parse_file, items, chunksize=64):
+            yield result
+        pool.close()
+        pool.join()
+    else:
+        for result in map(_parse_file, items):
+            yield result
+
+
+class CitationIndex:
+    def __init__(self):
+        self.by_pmid = {}
+        self.by_doi = {}
+        self.by_title = {}
+        self.references = {} # key: relative path of a citing article   value: its reference identifiers
+        self.stats = { 'articles': 0, 'references': 0, 'resolved_pmid': 0, 'resolved_doi': 0, 'resolved_title': 0 }
+
+    def add_article(self, relative_path, identifiers, references):
+        pmid, doi, title = identifiers
+        if pmid:
+            self.by_pmid.setdefault(pmid, relative_path)
+        if doi:
+            self.by_doi.setdefault(doi, relative_path)
+        if title:
+            self.by_title.setdefault(title, relative_path)
+        self.references[relative_path] = references
+        self.stats['articles'] += 1
+        self.stats['references'] += len(references)
+
+    def resolve(self, reference):
+        """ the relative path of the cited corpus article, or None """
+        pmid, doi, title = reference
+        if pmid and pmid in self.by_pmid:
+            self.stats['resolved_pmid'] += 1
+            return self.by_pmid[pmid]
+        if doi and doi in self.by_doi:
+            self.stats['resolved_doi'] += 1
+            return self.by_doi[doi]
+        if title and title in self.by_title:
+            self.stats['resolved_title'] += 1
+            return self.by_title[title]
+        return None
+
+    def citation_counts(self):
+        """ key: relative path   value: number of distinct corpus articles citing it """
+        counts = {}
+        for citing, references in self.references.items():
+            cited = set( self.resolve(reference) for reference in references )
+            cited.discard(None)
+            cited.discard(citing)
+            for relative_path in cited:
+                counts[relative_path] = counts.get(relative_path, 0) + 1
+        return counts
+
+
+def build_index(items, workers=1):
+    index = CitationIndex()
+    for relative_path, identifiers, references in parse_corpus(items, workers):
+        index.add_article(relative_path, identifiers, references)
+    return index
+
+def output_counts(counts, qualified_path='../qualified_articles.csv', path='../article_citations_offline.csv'):
+    """ returns the number of qualified articles with at least one citation """
+    cited = 0
+    with open(qualified_path, 'r') as articles, open(path, 'w', encoding="utf8", newline='') as outfile:
+        csv_writer = csv.writer(outfile)
+        for line in csv.reader(articles):
+            count = counts.get( "\\".join( line[:3] ), 0 )
+            cited += count > 0
+            csv_writer.writerow( line + [ count, line[3] ] )
+    return cited
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    items = ( ( "\\".join( [folder, dirname, filename] ), path ) for folder, dirname, filename, path in iter_corpus_files(DATA_ROOT, FOLDERS) )
+    index = build_index(items, workers)
+    counts = index.citation_counts()
+    print(index.stats)
+    print(len(counts), "articles are cited in the corpus,", output_counts(counts), "of them are qualified articles.")
@@ -0,0 +1,251 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Where retrieve_citations_from_Scholar gets citation counts from.
+
+A provider answers an article (its title and its row of qualified_articles.csv) with
+(citations, result title), or None when it does not know the article:
+
+    scholar   Google Scholar through scholar.main, or scholar_concurrent with workers
+    dump      a locally downloaded bulk citation dump, indexed by DOI/pmid in SQLite
+    corpus    the in-corpus counts of citation_index (article_citations_offline.csv)
+
+ProviderChain asks the providers in the configured order and falls back to the next one for the
+articles a provider does not know, or failed to look up (e.g. Scholar did not answer). An article
+which no provider knows gets ('', ''); one whose lookup failed and which no later provider knows
+gets None, so it is not recorded as finished and a resumed run looks it up again. When the circuit
+breaker of scholar_concurrent opens, CircuitOpenError stops the chain. The dump provider needs the
+DOI/pmid of the article, read from its NXML file.
+
+A dump is either an OpenCitations-style CSV with one row per citation and a 'cited' column
+("10.1000/xyz", "doi:10.1000/xyz", or several space-separated "doi:... pmid:..." ids), or JSON
+lines with 'doi' and/or 'pmid' and a 'citation_count'. It is aggregated into a "<dump>.sqlite"
+table of (id, count), built again when the size or the modification time of the dump changes:
+
+    python citation_providers.py index <dump file>
+'''
+import csv, json, os, sqlite3, sys
+from extend_known_grants import DATA_ROOT, publication_file
+from citation_index import article_identifiers
+
+
+class CitationProvider:
+    name = None
+
+    def lookup(self, title, line):
+        """ (citations, result title), or None if the article is unknown to this provider; raises if the lookup failed """
+        raise NotImplementedError
+
+    def lookup_many(self, items):
+        """ items: (title, line); yields (position in items, answer or None, error or None) """
+        for position, (title, line) in enumerate(items):
+            try:
+                yield position, self.lookup(title, line), None
+            except Exception as err:
+                yield position, None, err
+
+
+class ScholarProvider(CitationProvider):
+    name = 'scholar'
+
+    def __init__(self, workers=None):
+        self.workers = workers
+
+    def lookup(self, title, line):
+        import scholar
+        citations, result_title = scholar.main(title, raise_errors=True)
+        return ( citations, result_title ) if result_title else None
+
+    def lookup_many(self, items):
+        if not self.workers:
+            for result in CitationProvider.lookup_many(self, items):
+                yield result
+            return
+        from scholar_concurrent import ConcurrentScholarQuerier
+        engine = ConcurrentScholarQuerier( workers=self.workers )
+        results = engine.map( [ title for title, line in items ] )
+        for position, (title, answer, error) in enumerate(results):
+            yield position, ( answer if error is None and answer[1] else None ), error
+
+
+def identifier_keys(pmid='', doi=''):
+    keys = []
+    if doi:
+        keys.append( 'doi:' + doi.strip().lower() )
+    if pmid:
+        keys.append( 'pmid:' + pmid.strip() )
+    return keys
+
+def parse_ids(field):
+    """ the keys of an id field of a dump: '10.1/x', 'doi:10.1/x', 'pmid:123' or several separated by spaces """
+    keys = []
+    for value in field.split():
+        scheme, _, identifier = value.partition(':')
+        if value.startswith('10.'):
+            keys.extend( identifier_keys( doi=value ) )
+        elif scheme.lower() in ('doi', 'pmid') and identifier:
+            keys.extend( identifier_keys( **{ scheme.lower(): identifier } ) )
+    return keys
+
+
+class DumpIndex:
+    """ the citation counts of a dump in a SQLite table keyed by 'doi:...' / 'pmid:...' """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS counts (id TEXT PRIMARY KEY, count INTEGER) WITHOUT ROWID' )
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS dump (size INTEGER, mtime_ns INTEGER)' )
+
+    @staticmethod
+    def dump_version(dump_path):
+        info = os.stat(dump_path)
+        return ( info.st_size, info.st_mtime_ns )
+
+    def is_current(self, dump_path):
+        """ whether the index was built from the dump as it is now """
+        row = self.conn.execute( 'SELECT size, mtime_ns FROM dump' ).fetchone()
+        return row is not None and tuple(row) == self.dump_version(dump_path)
+
+    def add_counts(self, counts):
+        self.conn.executemany( 'INSERT INTO counts VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET count = count + excluded.count',
+                               counts.items() )
+
+    def build(self, dump_path, chunk_size=1000000):
+        """ aggregates the dump chunk by chunk, so memory stays bounded however large the dump is """
+        version = self.dump_version(dump_path)
+        self.conn.execute( 'DELETE FROM counts' )
+        self.conn.execute( 'DELETE FROM dump' )
+        counts = {}
+        for keys, count in self._read_dump(dump_path):
+            for key in keys:
+                counts[key] = counts.get(key, 0) + count
+            if len(counts) >= chunk_size:
+                self.add_counts(counts)
+                counts = {}
+        self.add_counts(counts)
+        self.conn.execute( 'INSERT INTO dump VALUES (?, ?)', version )
+        self.conn.commit()
+        return self.conn.execute( 'SELECT COUNT(*) FROM counts' ).fetchone()[0]
+
+    @staticmethod
+    def _read_dump(dump_path):
+        """ yields (keys of a cited article, citations) """
+        with open(dump_path, 'r', encoding="utf8", newline='') as dump:
+            if dump_path.endswith('.jsonl') or dump_path.endswith('.json'):
+                for row in dump:
+                    if not row.strip():
+                        continue
+                    record = json.loads(row)
+                    keys = identifier_keys( str( record.get('pmid') or '' ), record.get('doi') or '' )
+                    yield keys, int( record.get('citation_count', 0) )
+            else:
+                for row in csv.DictReader(dump):
+                    yield parse_ids( row['cited'] ), 1
+
+    def count(self, keys):
+        """ the count of the first known key, or None """
+        for key in keys:
+            row = self.conn.execute( 'SELECT count FROM counts WHERE id = ?', (key,) ).fetchone()
+            if row is not None:
+                return row[0]
+        return None
+
+    def close(self):
+        self.conn.close()
+
+
+def article_keys(line, root=DATA_ROOT):
+    """ the DOI/pmid keys of an article of qualified_articles.csv, read from its NXML file """
+    path = publication_file( "\\".join( line[:3] ), root )
+    if not os.path.exists(path):
+        return []
+    pmid, doi, title = article_identifiers( open(path, 'r').read() )
+    return identifier_keys(pmid, doi)
+
+
+class DumpProvider(CitationProvider):
+    name = 'dump'
+
+    def __init__(self, dump_path, root=DATA_ROOT):
+        index_path = dump_path + '.sqlite'
+        self.index = DumpIndex(index_path)
+        if not self.index.is_current(dump_path):
+            self.index.build(dump_path)
+        self.root = root
+
+    def lookup(self, title, line):
+        count = self.index.count( article_keys(line, self.root) )
+        return None if count is None else ( str(count), line[3] )
+
+
+class CorpusProvider(CitationProvider):
+    name = 'corpus'
+
+    def __init__(self, path='../article_citations_offline.csv'):
+        self.counts = {}
+        with open(path, 'r', encoding="utf8") as infile:
+            for line in csv.reader(infile):
+                self.counts[ tuple( line[:3] ) ] = line[6]
+
+    def lookup(self, title, line):
+        count = self.counts.get( tuple( line[:3] ) )
+        return None if count is None else ( count, line[3] )
+
+
+""" key: provider name   value: function of the options creating it """
+PROVIDERS = { 'scholar': lambda options: ScholarProvider( options.get('workers') ),
+              'dump': lambda options: DumpProvider( options['dump'], options.get('root', DATA_ROOT) ),
+              'corpus': lambda options: CorpusProvider( options.get('corpus', '../article_citations_offline.csv') ) }
+
+
+class ProviderChain:
+    def __init__(self, providers):
+        self.providers = providers
+        self.stats = dict( ( provider.name, 0 ) for provider in providers )
+        self.stats['unanswered'] = 0
+        self.stats['failed'] = 0
+
+    def lookup_many(self, items):
+        """
+        yields (position in items, (citations, result title), provider name); ('', '') and None if no provider
+        knows it, None and None if a lookup failed and no provider after it knows it
+        """
+        remaining = list( range( len(items) ) )
+        failed = set()
+        for provider in self.providers:
+            if not remaining:
+                break
+            missed = []
+            for position, answer, error in provider.lookup_many( [ items[i] for i in remaining ] ):
+                if answer is None:
+                    missed.append( remaining[position] )
+                    if error is not None:
+                        failed.add( remaining[position] )
+                    continue
+                self.stats[provider.name] += 1
+                yield remaining[position], answer, provider.name
+            remaining = sorted(missed)
+        for position in remaining:
+            if position in failed:
+                self.stats['failed'] += 1
+                yield position, None, None
+            else:
+                self.stats['unanswered'] += 1
+                yield position, ( '', '' ), None
+
+
+def build_chain(names, **options):
+    """ names: provider names in fallback order, e.g. ['dump', 'corpus', 'scholar'] """
+    for name in names:
+        if name not in PROVIDERS:
+            raise ValueError('unknown citation provider "%s", one of %s' % (name, sorted(PROVIDERS)))
+    return ProviderChain( [ PROVIDERS[name](options) for name in names ] )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'index':
+        index = DumpIndex( sys.argv[2] + '.sqlite' )
+        print( index.build( sys.argv[2] ), "ids are indexed." )
+        index.close()
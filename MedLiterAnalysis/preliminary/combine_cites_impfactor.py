@@ -4,35 +4,35 @@ Created on Jul 15, 2014
 @author: munichong
 '''
 import csv
+from journal_index import JournalIndex
 
-""" Read all journal:impactFactor into a dictionary """
-impactFactors = {}
-with open( '../journal_impactfactor.csv', 'r' ) as jif:
-    jif = csv.reader( jif )
-    for journal, ifr in jif:
-        impactFactors[ journal.lower() ] = ifr
-print "Impact factors have been read."
-
-
-""" Insert impactFactors into article-citation """
-output = []
-with open( '../article_citations.csv', 'r' ) as ac:
-    ac = csv.reader( ac )
-    for line in ac:
-        journal = line[4].lower()
-        ifr = ''
-        ifr = impactFactors.get( journal, '')
+def read_impact_factors(path='../journal_impactfactor.csv'):
+    """ Read all journal:impactFactor into a 'journal_index' JournalIndex """
+    return JournalIndex.load( path )
+
+def insert_impact_factors(article_rows, impactFactors):
+    """ Insert impactFactors into article-citation; see 'journal_index' for how the journals are matched """
+    for line in article_rows:
+        ifr = impactFactors.impact_factor( line[4] )
+        line = list( line )
         line.insert( 5, ifr )
-        output.append( line )
-print "Impact Factors are inserted."
-
-
-""" Output """
-with open( '../article_cite_ifr.csv', 'w' ) as ac:
-    ac = csv.writer( ac )
-    for line in output:
-        ac.writerow( line )
-print "Output."
-        
-        
-        
+        yield line
+
+def output(article_cite_ifr, path='../article_cite_ifr.csv'):
+    with open( path, 'w', newline='' ) as ac:
+        ac = csv.writer( ac )
+        for line in article_cite_ifr:
+            ac.writerow( line )
+
+
+if __name__ == '__main__':
+    impactFactors = read_impact_factors()
+    print("Impact factors have been read.")
+
+    with open( '../article_citations.csv', 'r' ) as ac:
+        output_rows = list( insert_impact_factors( csv.reader( ac ), impactFactors ) )
+    print("Impact Factors are inserted.")
+
+    output( output_rows )
+    print("Output.")
+    print("%d journals have no impact factor, %d are matched fuzzily, see journal_misses.csv" % impactFactors.write_report())
@@ -0,0 +1,173 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Throughput of the scripts on a 'synthetic_corpus' corpus (or on any corpus laid out as the real one):
+
+    parse_documents       qualified_rows over the corpus
+    extend_known_grants   build_grant_table of the qualified articles (as seeds with made-up citations)
+                          and add_candidate_publications over the corpus
+    tfidf_vectorizer      recall_grant_publications of the candidate grants
+
+Every stage runs in a fresh process, its input unpickled before the clock starts. Its peak RSS is
+what the stage adds to the peak of the process before it starts, i.e. without the imports and the
+unpickled input (which stays in memory during the stage); the peak of the whole process is kept as
+peak_rss_total_mb. For each stage: seconds, files and MB read, files/s, MB/s, peak RSS (MB, not
+measured on Windows), the number of records it returned and the 'run_metrics' breakdown of its
+time (read, extract, vectorize, ...).
+
+The results are written as JSON, ../benchmarks/benchmark_<time>.json by default, and compared with a
+previous run: a stage is a regression when its files/s fell or its peak RSS grew by more than the
+tolerance.
+
+    python corpus_benchmark.py [--corpus <root>] [--files 1000] [--seed 1] [--output <path>] [--compare <baseline.json>] [--tolerance 0.1]
+without --corpus, a corpus of the given number of files is generated in a temporary directory.
+'''
+import argparse, contextlib, json, multiprocessing, os, pickle, platform, shutil, sys, tempfile, time
+from extend_known_grants import FOLDERS, iter_corpus_files, publication_file
+from run_metrics import METRICS, peak_rss_mb
+from synthetic_corpus import generate_corpus
+
+BENCHMARK_DIR = '../benchmarks'
+STAGES = [ 'parse_documents', 'extend_known_grants', 'tfidf_vectorizer' ]
+
+
+def _sizes(paths):
+    return sum( os.path.getsize(path) for path in paths )
+
+
+""" the stages: function of (root, folders, records of the previous stage) returning (records, files read, bytes read) """
+
+def parse_documents_stage(root, folders, previous):
+    from parse_documents import qualified_rows
+    paths = [ path for _, _, _, path in iter_corpus_files(root, folders) ]
+    return list( qualified_rows(root, folders) ), len(paths), _sizes(paths)
+
+def extend_known_grants_stage(root, folders, qualified_rows):
+    from extend_known_grants import build_grant_table, add_candidate_publications
+    """ the rows of article_cite_ifr.csv: no impact factor, 10 citations and the title found is the title """
+    aci_rows = [ list( line[:5] ) + [ '', line[5], '10', line[3] ] for line in qualified_rows ]
+    grant_table = build_grant_table(aci_rows, root)
+    add_candidate_publications(grant_table, root, folders)
+    paths = [ path for _, _, _, path in iter_corpus_files(root, folders) ]
+    seeds = [ publication_file( "\\".join( line[:3] ), root ) for line in aci_rows ]
+    return list( grant_table.values() ), len(paths) + len(seeds), _sizes(paths) + _sizes(seeds)
+
+def tfidf_vectorizer_stage(root, folders, grants):
+    from tfidf_vectorizer import recall_grant_publications
+    paths = [ publication_file( publication.relative_path, root ) for grant in grants for publication in grant.publications ]
+    with open( os.devnull, 'w' ) as devnull, contextlib.redirect_stdout(devnull): # one print per grant
+        grants_final = recall_grant_publications(grants, 0.9, root=root)
+    return grants_final, len(paths), _sizes(paths)
+
+STAGE_FUNCTIONS = { 'parse_documents': parse_documents_stage,
+                    'extend_known_grants': extend_known_grants_stage,
+                    'tfidf_vectorizer': tfidf_vectorizer_stage }
+
+
+def _run_stage(name, root, folders, input_path, output_path):
+    """ in the child process: runs one stage, pickles its records to output_path and returns its measures """
+    previous = None
+    if input_path:
+        with open( input_path, 'rb' ) as infile:
+            previous = pickle.load( infile )
+    baseline = peak_rss_mb()
+    METRICS.reset()
+    start = time.perf_counter()
+    records, files, n_bytes = STAGE_FUNCTIONS[name](root, folders, previous)
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb()
+    measures = { 'seconds': round(seconds, 3), 'files': files, 'mb': round( n_bytes / 1e6, 3 ),
+                 'files_per_second': round( files / seconds, 1 ) if seconds else None,
+                 'mb_per_second': round( n_bytes / 1e6 / seconds, 3 ) if seconds else None,
+                 'peak_rss_mb': None if peak is None else round( peak - baseline, 1 ), 'peak_rss_total_mb': peak,
+                 'rss_before_mb': baseline, 'records': len(records),
+                 'breakdown': METRICS.to_dict(name)['stages'] }
+    with open( output_path, 'wb' ) as outfile:
+        pickle.dump( records, outfile )
+    return measures
+
+def run_benchmark(root, folders=None, workdir=None):
+    """ runs the stages one after another on the corpus under root; returns the results """
+    if folders is None:
+        folders = [ folder for folder in FOLDERS if os.path.isdir( os.path.join(root, folder) ) ]
+    workdir = workdir or tempfile.mkdtemp( prefix='benchmark_' )
+    manifest_path = os.path.join( root, 'manifest.json' )
+    manifest = json.load( open(manifest_path) ) if os.path.exists(manifest_path) else None
+    results = { 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                'platform': platform.platform(), 'cpus': os.cpu_count(), 'root': root, 'folders': list(folders),
+                'corpus': { 'params': manifest['params'], 'seed': manifest['seed'], 'generated': manifest['generated'] } if manifest else None,
+                'stages': {} }
+    """ spawn: the child does not inherit the memory of this process, nor of the previous stage """
+    context = multiprocessing.get_context('spawn')
+    input_path = None
+    start = time.time()
+    for name in STAGES:
+        output_path = os.path.join( workdir, name + '.pkl' )
+        with context.Pool(1) as pool:
+            results['stages'][name] = pool.apply( _run_stage, ( name, root, list(folders), input_path, output_path ) )
+        print(name, results['stages'][name])
+        input_path = output_path
+    results['total_seconds'] = round( time.time() - start, 3 )
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def save_results(results, path=None):
+    if path is None:
+        os.makedirs( BENCHMARK_DIR, exist_ok=True )
+        path = os.path.join( BENCHMARK_DIR, 'benchmark_%s.json' % time.strftime('%Y%m%d_%H%M%S') )
+    with open( path, 'w' ) as outfile:
+        json.dump( results, outfile, indent=2, sort_keys=True )
+    return path
+
+def compare(baseline, results, tolerance=0.1):
+    """
+    the regressions of results against baseline, e.g. "tfidf_vectorizer: files_per_second 120.5 -> 80.2 (-33%)";
+    peak_rss_mb is the memory a stage adds, see _run_stage
+    """
+    regressions = []
+    for name, measures in sorted( results['stages'].items() ):
+        before = baseline.get('stages', {}).get(name)
+        if not before:
+            continue
+        for key, worse in ( ( 'files_per_second', lambda old, new: new < old * (1 - tolerance) ),
+                            ( 'peak_rss_mb', lambda old, new: new > old * (1 + tolerance) ) ):
+            old, new = before.get(key), measures.get(key)
+            if old and new is not None and worse(old, new):
+                regressions.append( "%s: %s %s -> %s (%+.0f%%)" % ( name, key, old, new, 100.0 * ( new - old ) / old ) )
+    if baseline.get('corpus') != results.get('corpus'):
+        regressions.append( "the corpora differ, the runs may not be comparable" )
+    return regressions
+
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser( description='Throughput of the scripts on a corpus, see the documentation of corpus_benchmark.py.' )
+    parser.add_argument( '--corpus', metavar='ROOT', help='the corpus, a synthetic one is generated if not given' )
+    parser.add_argument( '--files', type=int, default=1000, help='the files of the generated corpus' )
+    parser.add_argument( '--seed', type=int, default=1, help='the seed of the generated corpus' )
+    parser.add_argument( '--output', metavar='PATH', help='the results, %s/benchmark_<time>.json by default' % BENCHMARK_DIR )
+    parser.add_argument( '--compare', metavar='BASELINE', help='the results of an earlier run to compare with' )
+    parser.add_argument( '--tolerance', type=float, default=0.1, help='the share a measure may get worse by' )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    root = options.corpus
+    generated = None
+    if root is None:
+        generated = root = tempfile.mkdtemp( prefix='synthetic_corpus_' )
+        print("Generating a corpus in", root, generate_corpus( root, options.files, seed=options.seed )['generated'])
+    try:
+        results = run_benchmark(root)
+    finally:
+        if generated:
+            shutil.rmtree(generated, ignore_errors=True)
+    print("Results are written to", save_results( results, options.output ))
+    if options.compare:
+        with open( options.compare, 'r' ) as infile:
+            regressions = compare( json.load(infile), results, options.tolerance )
+        for regression in regressions:
+            print("REGRESSION", regression)
+        sys.exit( 1 if regressions else 0 )
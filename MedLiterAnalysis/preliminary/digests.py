@@ -0,0 +1,20 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Digests of files, to tell whether an input changed since a result was computed from it
+('pipeline' fingerprints its stages with them, 'grant_statistics' keys its cache with them).
+'''
+import hashlib, os
+
+
+def file_digest(path):
+    """ the digest of the content of a file, '' if it does not exist """
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as infile:
+        for block in iter( lambda: infile.read(1 << 20), b'' ):
+            digest.update(block)
+    return digest.hexdigest()
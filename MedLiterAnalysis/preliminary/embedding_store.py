@@ -0,0 +1,135 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Dense body embeddings of the publications, as an alternative to the per-grant sparse vectors
+of 'tfidf_vectorizer'.
+
+The bodies are vectorized once with a corpus-wide TF-IDF vocabulary and projected by TruncatedSVD
+into a fixed number of float32 dimensions. The rows are L2-normalized and written to a .npy file
+which is opened memory-mapped, so the dot product is the cosine similarity and several processes
+reading the same store share its pages instead of copying them.
+
+    body_embeddings.npy        float32 [num_of_publications, n_components]
+    body_embeddings_ids.txt    relative path of the publication in each row
+    body_embeddings_model.pkl  (vectorizer, svd) to project new bodies into the same space
+'''
+import pickle, sys
+import numpy as np
+from nltk import word_tokenize
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from extend_known_grants import DATA_ROOT, publication_file, iter_corpus_files
+from tfidf_vectorizer import extract_body
+
+
+class EmbeddingStore:
+    def __init__(self, prefix='../body_embeddings'):
+        self.prefix = prefix
+        self.vectors = np.load(prefix + '.npy', mmap_mode='r')
+        with open(prefix + '_ids.txt', 'r', encoding="utf8") as idfile:
+            self.ids = idfile.read().splitlines()
+        self.index = { relative_path: row for row, relative_path in enumerate(self.ids) } # key: relative path   value: row
+        self.model = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, publications):
+        """ rows of the publications which have a non-empty body, and those publications """
+        rows, found = [], []
+        for pub in publications:
+            row = self.index.get(pub.relative_path)
+            if row is not None:
+                rows.append(row)
+                found.append(pub)
+        rows = np.array(rows, dtype=np.int64)
+        if len(rows):
+            nonzero = np.abs(self.vectors[rows]).sum(axis=1) > 0
+            found = [ pub for pub, keep in zip(found, nonzero) if keep ]
+            rows = rows[nonzero]
+        return rows, found
+
+    def centroid(self, rows):
+        if not len(rows):
+            return None
+        centroid = self.vectors[rows].mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            return None
+        return (centroid / norm).astype(np.float32)
+
+    def transform(self, bodies):
+        """ project new bodies into the space of the store """
+        if self.model is None:
+            self.model = pickle.load( open(self.prefix + '_model.pkl', 'rb') )
+        vectorizer, svd = self.model
+        return normalize_rows( svd.transform( vectorizer.transform(bodies) ).astype(np.float32) )
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+def read_bodies(relative_paths, root=DATA_ROOT):
+    for relative_path in relative_paths:
+        fdata = open( publication_file(relative_path, root), 'r' ).read()
+        yield extract_body(fdata) or ''
+
+def build_store(relative_paths, prefix='../body_embeddings', n_components=128, max_features=50000,
+                chunk_size=10000, root=DATA_ROOT):
+    relative_paths = sorted(set(relative_paths))
+    bodies = list( read_bodies(relative_paths, root) )
+    print(len(bodies), "bodies are read.")
+
+    vectorizer = TfidfVectorizer( stop_words='english', tokenizer=word_tokenize, max_features=max_features )
+    tfidf = vectorizer.fit_transform(bodies)
+    n_components = min( n_components, tfidf.shape[1] - 1 )
+    svd = TruncatedSVD( n_components=n_components, random_state=0 ).fit(tfidf)
+    print("Explained variance:", svd.explained_variance_ratio_.sum())
+
+    vectors = np.lib.format.open_memmap( prefix + '.npy', mode='w+', dtype=np.float32,
+                                         shape=(len(relative_paths), n_components) )
+    for start in range(0, len(relative_paths), chunk_size):
+        vectors[start : start + chunk_size] = normalize_rows( svd.transform( tfidf[start : start + chunk_size] ) )
+    vectors.flush()
+    del vectors
+
+    with open(prefix + '_ids.txt', 'w', encoding="utf8") as idfile:
+        for relative_path in relative_paths:
+            idfile.write(relative_path + '\n')
+    pickle.dump( (vectorizer, svd), open(prefix + '_model.pkl', 'wb') )
+    return EmbeddingStore(prefix)
+
+def score_candidates_dense(grant, store):
+    """ the same as 'tfidf_vectorizer.score_candidates' but with the vectors of the store """
+    pub_seeds = [ pub for pub in grant.publications if pub.isSeed ]
+    seed_rows, _ = store.rows(pub_seeds)
+    centroid = store.centroid(seed_rows)
+    if centroid is None:
+        return pub_seeds, []
+
+    candidates = [ pub for pub in grant.publications if pub not in pub_seeds ]
+    rows, candidates = store.rows(candidates)
+    if not len(rows):
+        return pub_seeds, []
+    similarity = store.vectors[rows] @ centroid
+    order = np.argsort(-similarity, kind='stable')
+    return pub_seeds, [ (candidates[i], float(similarity[i])) for i in order ]
+
+
+if __name__ == '__main__':
+    """ 
+    python embedding_store.py [n_components]          # the publications of grantsWithCandiPubs.pkl (created in 'extend_known_grants')
+    python embedding_store.py [n_components] corpus   # every article in the corpus, for 'ann_index'
+    """
+    n_components = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    if 'corpus' in sys.argv[2:]:
+        relative_paths = [ "\\".join( [folder, dirname, filename] ) for folder, dirname, filename, path in iter_corpus_files() ]
+    else:
+        grant_withCandiPubs = pickle.load( open('../grantsWithCandiPubs.pkl', 'rb') )
+        relative_paths = [ pub.relative_path for grant in grant_withCandiPubs for pub in grant.publications ]
+    store = build_store(relative_paths, n_components=n_components)
+    print(len(store), "publications are stored with", store.vectors.shape[1], "dimensions.")
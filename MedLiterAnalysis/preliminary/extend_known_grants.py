@@ -5,6 +5,11 @@ Created on Mar 11, 2015
 '''
 import csv, re, os, pickle
 from parse_documents import extract_target_content
+from run_metrics import METRICS
+
+DATA_ROOT = "J:\\Medical Papers Data\\"
+FOLDERS = [ "articles.A-B", "articles.C-H", "articles.I-N", "articles.O-Z" ]
+SCANNED_FILE = '../grantsWithCandiPubs_scanned.pkl' # the relative paths of the articles add_candidate_publications considered
 
 class Publication:
     def __init__(self, line):
@@ -59,7 +64,7 @@ def findRegexPattern(regex, text):
 
 def extract_authors(text):
     try:
-        contrib_group = findRegexPattern( "<contrib-group([\s\S]*?)</contrib-group>", fdata )[0]
+        contrib_group = findRegexPattern( "<contrib-group([\s\S]*?)</contrib-group>", text )[0]
     #         print(rawfile_path)        
         """ extract author names """
         extracted_authors = findRegexPattern( "<name([\s\S]*?)</name>", contrib_group )
@@ -85,6 +90,36 @@ def match_authors(text):
         return grants
     return None
 
+def build_author_index(grants):
+    """ key: author name   value: list of the grants whose authors pool has this author """
+    author_index = {}
+    for grant in grants:
+        for author in grant.authors_pool:
+            author_index.setdefault(author, []).append(grant)
+    return author_index
+
+def match_authors_indexed(authors_list, author_index):
+    """ the same as match_authors() but looks the authors up in an index instead of scanning every grant """
+    grants = []
+    for author in authors_list or []:
+        for grant in author_index.get(author, []):
+            if grant not in grants:
+                grants.append(grant)
+    return grants
+
+def publication_file(relative_path, root=DATA_ROOT):
+    return os.path.join( root, *relative_path.split("\\") )
+
+def iter_corpus_files(root=DATA_ROOT, folders=FOLDERS):
+    """ yield (folder, dirname, filename, file path) of every article in the corpus """
+    for folder in folders:
+        path = os.path.join(root, folder)
+        for dirname in os.listdir( path ):
+            for filename in os.listdir( os.path.join(path, dirname) ):
+                if filename[0] == '#' and filename[-1] == '#':
+                    continue
+                yield folder, dirname, filename, os.path.join(path, dirname, filename)
+
 def create_publication_instance(folder, dirname, filename, fdata):
         
     """ For output """
@@ -110,71 +145,83 @@ def extract_pmid(fdata):
 
 
 
+def build_grant_table(aci_rows, root=DATA_ROOT):
+    """ key: grantID, str   value: Grant instance with its seed publications (rows of "article_cite_ifr.csv") """
+    grant_table = {}
+    for newline in aci_rows:
+        
+        grantID = newline[6]
+        publication = Publication(newline)
+        
+        """ add authors and create publication instance """
+        with METRICS.stage('read'):
+            fdata = open( publication_file(publication.relative_path, root), 'r' ).read()
+        with METRICS.stage('extract'):
+            authors_list = extract_authors( fdata )
+            publication.setAuthors( authors_list )
+            publication.setPMID( extract_pmid(fdata) )
+        METRICS.count('seeds')
+        
+        """ add into grant_table """
+        if grantID in grant_table:
+            grant_table[grantID].addPublication( publication )
+            grant_table[grantID].addAuthors( publication.authors )
+        else:
+            grant = Grant(grantID)
+            grant.addPublication(publication)
+            grant.addAuthors( publication.authors )
+            grant_table[grantID] = grant
+    return grant_table
+
+def add_candidate_publications(grant_table, root=DATA_ROOT, folders=FOLDERS, duplicate_map={}, scanned=None):
+    """
+    Find publications whose authors are also participate in seed grants; returns the number of matched publications
+    scanned: a set to add the relative paths of the articles considered to (the duplicates skipped included),
+             what 'incremental_update' takes as already seen
+    """
+    author_index = build_author_index( grant_table.values() )
+    matched_pub_counter = 0
+    for folder, dirname, filename, path in iter_corpus_files(root, folders):
+        relative_path = "\\".join( [folder, dirname, filename] )
+        if scanned is not None:
+            scanned.add(relative_path)
+        if relative_path in duplicate_map:
+            continue
+        with METRICS.stage('read'):
+            fdata = open( path, 'r' ).read()
+        METRICS.count('files')
+        
+        """ Check if at least one author wrote any known grant. """
+        with METRICS.stage('extract'):
+            authors_list = extract_authors(fdata)
+        with METRICS.stage('match'):
+            matched_grants = match_authors_indexed( authors_list, author_index )
+        if not matched_grants:
+            continue
+        
+        """ If any author wrote any grant, create a publication instance and add into the grants. """
+        with METRICS.stage('extract'):
+            publication = create_publication_instance(folder, dirname, filename, fdata)
+        METRICS.count('matched_publications')
+        for grant in matched_grants:
+            grant.addPublication(publication)
+        matched_pub_counter += 1
+    return matched_pub_counter
+
+
 if __name__ == '__main__':  
     """ Read seed grants """
-    grant_table = {} # key: grantID, str   value: Grant instance
     print("Reading \"article_cite_ifr.csv\"...")
     with open("../article_cite_ifr.csv", 'r', encoding="utf8") as acifile:
-        aci_reader = csv.reader(acifile)
-        for newline in aci_reader:
-            
-            grantID = newline[6]
-            publication = Publication(newline)
-            
-            """ add authors and create publication instance """
-            rawfile_path = "J:\\Medical Papers Data\\" + "\\".join( [ newline[0], newline[1], newline[2] ] )
-#             print(rawfile_path)
-            fdata = open( rawfile_path, 'r' ).read()
-            authors_list = extract_authors( fdata )
-            publication.setAuthors( authors_list )
-            publication.setPMID( extract_pmid(fdata) )
-            
-            """ add into grant_table """
-            if grantID in grant_table:
-                grant_table[grantID].addPublication( publication )
-                grant_table[grantID].addAuthors( publication.authors )
-            else:
-                grant = Grant(grantID)
-                grant.addPublication(publication)
-                grant.addAuthors( publication.authors )
-                grant_table[grantID] = grant
+        grant_table = build_grant_table( csv.reader(acifile) ) # key: grantID, str   value: Grant instance
     print("Finish Reading\n    ---", len(grant_table), "known grants are extracted and created.")
     
     
     """ Find publications whose authors are also participate in seed grants. """
-    root = "J:\\Medical Papers Data\\"
-    folders = [ "articles.A-B", "articles.C-H", "articles.I-N", "articles.O-Z" ]  
-    matched_pub_counter = 0 
-    total_filenum = 0 
-    for folder in folders:
-        path = root + folder 
-        print(folder) 
-        dir_num = 0 
-        for dirname in os.listdir( path ): 
-            dir_num += 1
-            print(folder, dirname, dir_num, matched_pub_counter, total_filenum)
-            for filename in os.listdir( "\\".join( [path, dirname] ) ):
-                if filename[0] == '#' and filename[-1] == '#':
-                    continue
-                total_filenum += 1
-                fdata = open( "\\".join( [path, dirname, filename] ) , 'r').read()
-                
-                """ Check if at least one author wrote any known grant. """
-#                 print(path + dirname + '\\' + filename)
-                matched_grants = match_authors(fdata)
-                if not matched_grants:
-                    continue
-                
-#                 print(dirname, "Find matched grants")
-                
-                """ If any author wrote any grant, create a publication instance and add into the grants. """
-                publication = create_publication_instance(folder, dirname, filename, fdata)
-                for grant in matched_grants:
-                    grant.addPublication(publication)
-                
-#                 print("ADD PUB. TO", len(matched_grants), "grants:", folder + filename)
-                matched_pub_counter += 1
-            
+    from near_duplicates import load_duplicate_map
+    duplicate_map = load_duplicate_map() # only the representative of a group of near-duplicates (created in 'near_duplicates') is considered
+    scanned = set()
+    matched_pub_counter = add_candidate_publications(grant_table, DATA_ROOT, FOLDERS, duplicate_map, scanned)
     print(matched_pub_counter, "publications are matched.")
     
                 
@@ -182,6 +229,6 @@ if __name__ == '__main__':
     grant_withCandiPubs = []
     for grant in grant_table.values():
         grant_withCandiPubs.append(grant)
-    pickle.dump( grant_withCandiPubs, open('../grantsWithCandiPubs.pkl', 'wb') )            
-            
-            
\ No newline at end of file
+    pickle.dump( grant_withCandiPubs, open('../grantsWithCandiPubs.pkl', 'wb') )
+    pickle.dump( scanned, open(SCANNED_FILE, 'wb') ) # the articles 'incremental_update' starts from
+    print("Run metrics are written to", METRICS.save())
@@ -0,0 +1,205 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+A binary copy of grants_final.csv to read the publications of one grant without reading the others.
+
+    grants_final.gidx
+        header         magic, version, number of entries, offsets of the sections below
+        data           one block per run of consecutive rows of a grant:
+                       u32 number of publications, then for each publication the u32 length of
+                       (relative path, title, journal, authors, citations) in UTF-8, separated by US (\\x1f)
+        keys           the grant IDs of the entries, sorted, UTF-8
+        key offsets    u64[n + 1]   entry i has the key keys[key_offsets[i]:key_offsets[i + 1]]
+        data starts    u64[n]       and its block at data[starts[i]:ends[i]]
+        data ends      u64[n]
+
+The file is memory-mapped and the offset arrays are NumPy views of the map, so opening it reads
+nothing; a lookup is a binary search over the keys, O(log n) comparisons of slices of the map, and
+the decoding of the blocks of that grant only. A grant whose rows are not consecutive in the input
+has several entries, next to each other in the index.
+
+    python grant_index.py export [grants_final.csv]
+    python grant_index.py lookup <grant ID>
+    python grant_index.py benchmark [grants_final.csv]
+'''
+import bisect, csv, mmap, os, random, struct, sys, time
+import numpy as np
+
+INDEX_FILE = '../grants_final.gidx'
+MAGIC = b'GIDX'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQQQQ') # magic, version, n, keys, key offsets, data starts, data ends
+COUNT = struct.Struct('<I')
+FIELDS = 5 # relative path, title, journal, authors, citations
+SEPARATOR = '\x1f' # the ASCII unit separator, never in the cleaned fields
+
+
+def _encode_block(publications):
+    parts = [ COUNT.pack( len(publications) ) ]
+    for publication in publications:
+        record = SEPARATOR.join( ( list(publication) + [''] * FIELDS )[:FIELDS] ).encode('utf-8')
+        parts.append( COUNT.pack( len(record) ) )
+        parts.append(record)
+    return b''.join(parts)
+
+def export_grants(rows, path=INDEX_FILE):
+    """
+    rows: grants_final.csv rows (grant, relative path, title, journal, authors, citations), streamed;
+    only the keys and offsets of the blocks are kept in memory. Returns the number of grants.
+    """
+    entries = [] # (grant, start, end)
+    with open(path + '.tmp', 'wb') as outfile:
+        outfile.write( b'\0' * HEADER.size )
+        grant, block = None, []
+        def flush():
+            start = outfile.tell()
+            outfile.write( _encode_block(block) )
+            entries.append( ( grant, start - HEADER.size, outfile.tell() - HEADER.size ) )
+        for row in rows:
+            if len(row) < 2:
+                continue
+            if block and row[0] != grant:
+                flush()
+                block = []
+            grant = row[0]
+            block.append( row[1:] )
+        if block:
+            flush()
+
+        entries.sort( key=lambda entry: ( entry[0].encode('utf-8'), entry[1] ) )
+        keys = [ entry[0].encode('utf-8') for entry in entries ]
+        keys_offset = outfile.tell()
+        outfile.write( b''.join(keys) )
+        key_offsets = np.zeros( len(keys) + 1, dtype='<u8' )
+        key_offsets[1:] = np.cumsum( [ len(key) for key in keys ] )
+        sections = []
+        for array in ( key_offsets, np.array( [ entry[1] for entry in entries ], dtype='<u8' ), np.array( [ entry[2] for entry in entries ], dtype='<u8' ) ):
+            outfile.write( b'\0' * ( -outfile.tell() % 8 ) ) # aligned for the NumPy views
+            sections.append( outfile.tell() )
+            outfile.write( array.tobytes() )
+        outfile.seek(0)
+        outfile.write( HEADER.pack( MAGIC, VERSION, len(entries), keys_offset, *sections ) )
+    os.replace(path + '.tmp', path)
+    return len( set( entry[0] for entry in entries ) )
+
+
+class _SortedKeys:
+    """ the keys of an index as a sequence for bisect, read from the map one at a time """
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.n
+
+    def __getitem__(self, i):
+        return self.index.key(i)
+
+
+class GrantIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap( self.file.fileno(), 0, access=mmap.ACCESS_READ )
+        magic, version, self.n, self.keys_offset, key_offsets, starts, ends = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a grant index of version %d' % (path, VERSION))
+        self.key_offsets = np.frombuffer( self.map, dtype='<u8', count=self.n + 1, offset=key_offsets )
+        self.starts = np.frombuffer( self.map, dtype='<u8', count=self.n, offset=starts )
+        self.ends = np.frombuffer( self.map, dtype='<u8', count=self.n, offset=ends )
+
+    def close(self):
+        self.key_offsets = self.starts = self.ends = None # the views must go before the map
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n
+
+    def key(self, i):
+        return self.map[ self.keys_offset + int( self.key_offsets[i] ) : self.keys_offset + int( self.key_offsets[i + 1] ) ]
+
+    def _entries(self, grantID):
+        """ the range of entries of the grant """
+        key = grantID.encode('utf-8')
+        first = bisect.bisect_left( _SortedKeys(self), key )
+        last = first
+        while last < self.n and self.key(last) == key:
+            last += 1
+        return range(first, last)
+
+    def _decode(self, start, end):
+        position = HEADER.size + start
+        count, = COUNT.unpack_from(self.map, position)
+        position += COUNT.size
+        publications = []
+        for _ in range(count):
+            length, = COUNT.unpack_from(self.map, position)
+            position += COUNT.size
+            publications.append( self.map[position:position + length].decode('utf-8').split(SEPARATOR) )
+            position += length
+        return publications
+
+    def lookup(self, grantID):
+        """ the publications [relative path, title, journal, authors, citations] of the grant, [] if it is unknown """
+        publications = []
+        for i in self._entries(grantID):
+            publications.extend( self._decode( int( self.starts[i] ), int( self.ends[i] ) ) )
+        return publications
+
+    def grantIDs(self):
+        return [ self.key(i).decode('utf-8') for i in range(self.n) ]
+
+
+def benchmark(csv_path='../grants_final.csv', path=INDEX_FILE, n=10000, seed=1):
+    """ lookup latency of the index against a scan of the CSV """
+    start = time.time()
+    with open(csv_path, 'r', encoding="utf8") as infile:
+        grants = export_grants( csv.reader(infile), path )
+    export_time = time.time() - start
+
+    start = time.time()
+    index = GrantIndex(path)
+    open_time = time.time() - start
+    grantIDs = index.grantIDs()
+    rnd = random.Random(seed)
+    queries = [ rnd.choice(grantIDs) for _ in range(n) ]
+    latencies = []
+    for grantID in queries:
+        start = time.perf_counter()
+        index.lookup(grantID)
+        latencies.append( time.perf_counter() - start )
+    latencies = np.array(latencies) * 1e6
+
+    start = time.time()
+    scans = queries[:5]
+    for grantID in scans:
+        with open(csv_path, 'r', encoding="utf8") as infile:
+            [ row[1:] for row in csv.reader(infile) if row and row[0] == grantID ]
+    scan_time = ( time.time() - start ) / len(scans)
+    index.close()
+    return { 'grants': grants, 'entries': len(grantIDs), 'index_bytes': os.path.getsize(path), 'csv_bytes': os.path.getsize(csv_path),
+             'export_seconds': round(export_time, 3), 'open_microseconds': round(open_time * 1e6, 1), 'lookups': n,
+             'lookup_microseconds_p50': round( float( np.percentile(latencies, 50) ), 1 ),
+             'lookup_microseconds_p99': round( float( np.percentile(latencies, 99) ), 1 ),
+             'csv_scan_microseconds': round(scan_time * 1e6, 1) }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        with open(sys.argv[2] if len(sys.argv) > 2 else '../grants_final.csv', 'r', encoding="utf8") as infile:
+            print(export_grants( csv.reader(infile) ), "grants are exported to", INDEX_FILE)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'lookup':
+        with GrantIndex() as index:
+            for publication in index.lookup( sys.argv[2] ):
+                print(publication)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        print( benchmark( sys.argv[2] if len(sys.argv) > 2 else '../grants_final.csv' ) )
+    else:
+        print(__doc__)
@@ -0,0 +1,230 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+A daemon classifying NXML documents against the grants, with everything warm in memory: the
+'incremental_update' state (per grant, its fitted vectorizer and the centroid of its seeds) and
+the author index built from it. A document costs one author lookup and one transform per grant its
+authors match, instead of a rerun of the scripts.
+
+    POST /classify            an NXML document
+    POST /classify/batch      {"documents": [ {"id": ..., "nxml": ...}, ... ]}, at most max_batch
+    GET  /stats               counters and latencies
+    POST /save                writes the state back (with the publications accepted so far)
+
+/classify answers, for each document:
+
+    {"grant_numbers": "RSG-09-175-01-CCE", "acs_acknowledged": true, "title": ..., "authors": 5,
+     "matches": [ {"grant": ..., "similarity": 0.93, "accepted": true}, ... ], "error": null}
+
+matches are the grants sharing an author with the document, the most similar first; "accepted" is
+similarity >= the threshold of the state. With ?accept=1&path=<folder\\dir\\file> the accepted
+publications are added to their grants as 'incremental_update' does. A malformed request (not
+JSON of that shape, a document without "nxml", a path not of three parts) gets HTTP 400.
+
+At most max_concurrent requests are classified at a time; the others wait up to queue_timeout
+seconds and then get HTTP 503.
+
+    python grant_service.py [--port 8766 | --socket <path>] [--max-concurrent 4] [--max-batch 64] [--state ../grant_states.pkl]
+'''
+import argparse, json, os, socketserver, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from extend_known_grants import extract_authors, create_publication_instance
+from parse_documents import qualify_document
+from tfidf_vectorizer import extract_body
+from incremental_update import GrantStateStore
+
+
+def classify(store, fdata, path=None):
+    """ the answer of /classify for one document, and the states of the accepted grants """
+    record = qualify_document(path, fdata)
+    authors = extract_authors(fdata)
+    matched_grants = store.match(authors)
+    body = extract_body(fdata) if matched_grants else None
+    matches, accepted = [], []
+    for state in matched_grants:
+        similarity = state.score(body)
+        is_accepted = bool( similarity is not None and similarity >= store.simi_threshold )
+        if is_accepted:
+            accepted.append(state)
+        matches.append( { 'grant': state.grantID, 'similarity': None if similarity is None else round( float(similarity), 4 ), 'accepted': is_accepted } )
+    matches.sort( key=lambda match: -1.0 if match['similarity'] is None else match['similarity'], reverse=True )
+    return { 'grant_numbers': record.grant_numbers or '', 'acs_acknowledged': record.qualified,
+             'title': record.title, 'authors': len(authors or []), 'matches': matches, 'error': record.error }, accepted
+
+
+def batch_documents(payload):
+    """ the documents of a /classify/batch request; raises ValueError if it is not of the documented shape """
+    documents = payload.get('documents') if isinstance(payload, dict) else None
+    if not isinstance(documents, list):
+        raise ValueError('expected {"documents": [{"id": ..., "nxml": ...}]}')
+    for document in documents:
+        if not isinstance(document, dict) or not isinstance( document.get('nxml'), str ):
+            raise ValueError('every document needs an "nxml" string')
+        if document.get('id') is not None and not isinstance( document['id'], str ):
+            raise ValueError('the "id" of a document is a string')
+    return documents
+
+def split_path(relative_path):
+    """ folder, dirname, filename of a relative path folder\\dir\\file; raises ValueError for other paths """
+    parts = relative_path.split('\\')
+    if len(parts) != 3 or not all(parts):
+        raise ValueError('expected a path folder\\dir\\file, not "%s"' % relative_path)
+    return parts
+
+
+class ServiceState(object):
+    def __init__(self, store, state_path, max_concurrent=4, max_batch=64, queue_timeout=5.0):
+        self.store = store
+        self.state_path = state_path
+        self.max_batch = max_batch
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock() # the counters, and the state when publications are accepted
+        self.stats = { 'requests': 0, 'documents': 0, 'accepted': 0, 'rejected': 0, 'errors': 0, 'seconds': 0.0 }
+        store.match([]) # builds the author index now rather than in the first request
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def accept(self, accepted, relative_path, fdata):
+        folder, dirname, filename = split_path(relative_path)
+        publication = create_publication_instance(folder, dirname, filename, fdata)
+        with self.lock:
+            self.store.seen.add(relative_path)
+            for state in accepted:
+                state.accept(publication)
+            self.stats['accepted'] += len(accepted)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return str(self.client_address) # '' on a Unix socket
+
+    def send(self, code, answer):
+        body = json.dumps(answer).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/stats':
+            return self.send(404, { 'error': 'unknown path' })
+        service = self.service
+        with service.lock:
+            stats = dict(service.stats)
+        stats['milliseconds_per_document'] = round( 1000 * stats['seconds'] / stats['documents'], 3 ) if stats['documents'] else None
+        stats['grants'] = len(service.store.grants)
+        self.send(200, stats)
+
+    def do_POST(self):
+        service = self.service
+        parts = urlsplit(self.path)
+        args = dict( parse_qsl(parts.query) )
+        try:
+            length = int( self.headers.get('Content-Length', 0) )
+        except ValueError:
+            return self.send(400, { 'error': 'bad Content-Length' })
+        data = self.rfile.read(length)
+        if parts.path == '/save':
+            with service.lock:
+                service.store.save(service.state_path)
+            return self.send(200, { 'saved': service.state_path })
+        if parts.path not in ('/classify', '/classify/batch'):
+            return self.send(404, { 'error': 'unknown path' })
+
+        service.count('requests')
+        if parts.path == '/classify':
+            documents = [ { 'id': args.get('path'), 'nxml': data.decode('utf-8', 'replace') } ]
+        else:
+            try:
+                documents = batch_documents( json.loads( data.decode('utf-8') ) )
+            except ValueError as err: # also a JSONDecodeError or a UnicodeDecodeError
+                service.count('errors')
+                return self.send(400, { 'error': str(err) })
+            if len(documents) > service.max_batch:
+                service.count('errors')
+                return self.send(413, { 'error': 'at most %d documents per batch' % service.max_batch })
+        if args.get('accept') == '1':
+            try:
+                for document in documents:
+                    if document.get('id'):
+                        split_path( document['id'] )
+            except ValueError as err:
+                service.count('errors')
+                return self.send(400, { 'error': str(err) })
+
+        if not service.slots.acquire( timeout=service.queue_timeout ):
+            service.count('rejected')
+            return self.send(503, { 'error': 'busy' })
+        try:
+            start = time.time()
+            answers = []
+            for document in documents:
+                answer, accepted = classify( service.store, document['nxml'], document.get('id') )
+                if args.get('accept') == '1' and document.get('id') and accepted:
+                    service.accept( accepted, document['id'], document['nxml'] )
+                answer['id'] = document.get('id')
+                answers.append(answer)
+            service.count('documents', len(documents))
+            service.count('seconds', time.time() - start)
+        finally:
+            service.slots.release()
+        self.send( 200, answers[0] if parts.path == '/classify' else { 'results': answers } )
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def start_service(store, state_path, port=8766, socket_path=None, max_concurrent=4, max_batch=64, queue_timeout=5.0):
+    """ serve in a background thread on 127.0.0.1:port, or on the Unix socket if socket_path is given; returns the server """
+    service = ServiceState(store, state_path, max_concurrent, max_batch, queue_timeout)
+    handler = type( 'BoundServiceHandler', (ServiceHandler,), { 'service': service } )
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+    else:
+        server = ThreadingHTTPServer( ('127.0.0.1', port), handler )
+        server.daemon_threads = True
+    server.service = service
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser( description='Classify NXML documents against the grants of an incremental_update state.' )
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument( '--port', type=int, default=8766, help='serve on 127.0.0.1:PORT' )
+    address.add_argument( '--socket', metavar='PATH', help='serve on this Unix socket instead' )
+    parser.add_argument( '--max-concurrent', type=int, default=4, help='requests classified at a time' )
+    parser.add_argument( '--max-batch', type=int, default=64, help='documents of a /classify/batch request' )
+    parser.add_argument( '--state', default='../grant_states.pkl', help='the state of incremental_update' )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    if not os.path.exists(options.state):
+        sys.exit("No grant state. Run \"python incremental_update.py build\" first.")
+    store = GrantStateStore.load(options.state)
+    server = start_service( store, options.state, options.port, options.socket, options.max_concurrent, options.max_batch )
+    print(len(store.grants), "grants are loaded, serving on", options.socket or "http://127.0.0.1:%d" % server.server_port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
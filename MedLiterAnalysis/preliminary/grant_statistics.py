@@ -0,0 +1,179 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Statistics of grants_final.csv (grant, file, title, journal, authors, citations of a seed).
+
+The columns are read once into NumPy arrays, every publication with the index of its grant, and
+all the metrics are grouped with bincount over that index:
+
+    publications_per_grant   distribution of the number of publications of a grant ('alter_representation')
+    seeds_vs_recalled        seeds and recalled publications per grant
+    citations                distribution of the citations of the seeds, and per grant
+    impact_factor_output     the sum of the impact factors of the journals of a grant's publications,
+                             and its IF-weighted citations (journals matched by 'journal_index')
+
+The seeds are the publications which were seeds of their grant in extend_known_grants (isSeed): the
+articles of article_cite_ifr.csv with citations, under their grant. A seed Scholar gave no count
+for is still a seed. Without article_cite_ifr.csv, the publications with citations are taken.
+
+A report is cached in ../grant_statistics_cache/ under the digest of grants_final.csv,
+article_cite_ifr.csv, journal_impactfactor.csv, this module and journal_index, so rerunning it
+while tuning costs a few file hashes.
+
+    python grant_statistics.py [grants_final.csv] [per-grant]
+prints the report as JSON; "per-grant" also writes the metrics of every grant to grant_statistics.csv.
+'''
+import csv, hashlib, json, os, sys
+import numpy as np
+import journal_index
+from journal_index import JournalIndex
+from digests import file_digest
+
+CACHE_DIR = '../grant_statistics_cache'
+PERCENTILES = [ 10, 25, 50, 75, 90, 99 ]
+
+
+class GrantColumns:
+    """ the columns of grants_final.csv; arrays have one entry per publication row """
+    def __init__(self, grantIDs, grant_index, citations, impact_factors, is_seed=None):
+        self.grantIDs = grantIDs            # the distinct grants
+        self.grant_index = grant_index      # int: index of the grant of the row in grantIDs
+        self.citations = citations          # float: citations, NaN if it is not a seed or has no count
+        self.impact_factors = impact_factors # float: impact factor of the journal, NaN if unknown
+        self.is_seed = is_seed if is_seed is not None else ~np.isnan(citations) # bool: a seed of its grant
+
+    @classmethod
+    def load(cls, path='../grants_final.csv', impact_factor_path='../journal_impactfactor.csv', seeds_path='../article_cite_ifr.csv'):
+        seeds = read_seeds(seeds_path)
+        grants, journals, citations, is_seed = [], [], [], []
+        with open( path, 'r', encoding="utf8" ) as infile:
+            for row in csv.reader( infile ):
+                if len(row) < 4:
+                    continue
+                grants.append( row[0] )
+                journals.append( row[3] )
+                citation = row[5] if len(row) > 5 else ''
+                seed = ( row[0], row[1] ) in seeds if seeds is not None else citation != ''
+                citations.append( citation if seed else '' )
+                is_seed.append( seed )
+        grantIDs, grant_index = np.unique( np.array(grants, dtype=str), return_inverse=True )
+        """ every distinct journal is looked up once """
+        unique_journals, journal_index = np.unique( np.array(journals, dtype=str), return_inverse=True )
+        factors = np.full( len(unique_journals), np.nan )
+        if os.path.exists(impact_factor_path):
+            index = JournalIndex.load(impact_factor_path)
+            factors = np.array( [ _number( index.impact_factor(journal) ) for journal in unique_journals ], dtype=float )
+        return cls( grantIDs, grant_index, _numbers(citations), factors[journal_index], np.array(is_seed, dtype=bool) )
+
+    def __len__(self):
+        return len(self.grant_index)
+
+
+def read_seeds(path='../article_cite_ifr.csv'):
+    """ the (grant, relative path) of the seeds: the rows with citations, as build_grant_table takes them; None without the file """
+    if not os.path.exists(path):
+        return None
+    with open( path, 'r', encoding="utf8" ) as infile:
+        return set( ( line[6], "\\".join( line[:3] ) ) for line in csv.reader( infile ) if len(line) >= 8 )
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def _numbers(values):
+    """ a float array of the strings, NaN for '' (and for anything else which is not a number) """
+    values = np.array(values, dtype=str)
+    numbers = np.full( len(values), np.nan )
+    given = values != ''
+    try:
+        numbers[given] = values[given].astype(float)
+    except ValueError:
+        numbers = np.array( [ _number(value) for value in values ], dtype=float )
+    return numbers
+
+def _summary(values):
+    values = values[ ~np.isnan(values) ]
+    if not len(values):
+        return { 'n': 0 }
+    return { 'n': int( len(values) ), 'mean': round( float( values.mean() ), 3 ), 'sum': round( float( values.sum() ), 3 ),
+             'percentiles': dict( ( str(p), round( float(v), 3 ) ) for p, v in zip( PERCENTILES, np.percentile(values, PERCENTILES) ) ) }
+
+def per_grant(columns):
+    """ { metric: array with one value per grant of columns.grantIDs } """
+    n = len(columns.grantIDs)
+    group = lambda weights=None: np.bincount( columns.grant_index, weights=weights, minlength=n )
+    is_seed = columns.is_seed
+    citations = np.nan_to_num(columns.citations)
+    factors = np.nan_to_num(columns.impact_factors)
+    publications = group()
+    seeds = group( is_seed.astype(float) )
+    total_citations = group(citations)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return { 'publications': publications,
+                 'seeds': seeds,
+                 'recalled': publications - seeds,
+                 'recalled_per_seed': np.where( seeds > 0, ( publications - seeds ) / seeds, np.nan ),
+                 'total_citations': total_citations,
+                 'mean_citations': np.where( seeds > 0, total_citations / seeds, np.nan ),
+                 'impact_factor_output': group(factors),
+                 'if_weighted_citations': group( citations * factors ),
+                 'with_impact_factor': group( ( ~np.isnan(columns.impact_factors) ).astype(float) ) }
+
+def compute_report(columns, top=10):
+    metrics = per_grant(columns)
+    counts, grants = np.unique( metrics['publications'].astype(int), return_counts=True )
+    order = np.argsort( -metrics['impact_factor_output'], kind='stable' )[:top]
+    return { 'grants': int( len(columns.grantIDs) ), 'publications': int( len(columns) ),
+             'publications_per_grant': { 'distribution': [ [ int(c), int(g) ] for c, g in zip(counts, grants) ],
+                                         'summary': _summary( metrics['publications'] ) },
+             'seeds_vs_recalled': { 'seeds': int( metrics['seeds'].sum() ), 'recalled': int( metrics['recalled'].sum() ),
+                                    'recalled_per_seed': _summary( metrics['recalled_per_seed'] ),
+                                    'grants_without_recall': int( ( metrics['recalled'] == 0 ).sum() ) },
+             'citations': { 'seeds': _summary( columns.citations ),
+                            'per_grant_total': _summary( metrics['total_citations'] ),
+                            'per_grant_mean': _summary( metrics['mean_citations'] ) },
+             'impact_factor_output': { 'publications_with_impact_factor': int( metrics['with_impact_factor'].sum() ),
+                                       'per_grant': _summary( metrics['impact_factor_output'] ),
+                                       'if_weighted_citations': _summary( metrics['if_weighted_citations'] ),
+                                       'top_grants': [ [ str( columns.grantIDs[i] ), round( float( metrics['impact_factor_output'][i] ), 3 ) ] for i in order ] } }
+
+def report_key(path, impact_factor_path, seeds_path='../article_cite_ifr.csv'):
+    """ the digest of the inputs and of the code of the report, 'journal_index' matching the journals """
+    digest = hashlib.sha1()
+    for name in ( path, seeds_path, impact_factor_path, os.path.abspath(__file__), os.path.abspath( journal_index.__file__ ) ):
+        digest.update( file_digest(name).encode('utf-8') )
+    return digest.hexdigest()
+
+def grant_report(path='../grants_final.csv', impact_factor_path='../journal_impactfactor.csv', seeds_path='../article_cite_ifr.csv', cache_dir=CACHE_DIR):
+    """ the report of compute_report, read from the cache when the input files are unchanged """
+    cache_path = os.path.join( cache_dir, report_key(path, impact_factor_path, seeds_path) + '.json' )
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as cached:
+            return json.load(cached)
+    report = compute_report( GrantColumns.load(path, impact_factor_path, seeds_path) )
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_path + '.tmp', 'w') as outfile:
+        json.dump(report, outfile, indent=2, sort_keys=True)
+    os.replace(cache_path + '.tmp', cache_path)
+    return report
+
+def output_per_grant(columns, path='../grant_statistics.csv'):
+    metrics = per_grant(columns)
+    names = sorted(metrics)
+    with open( path, 'w', encoding="utf8", newline='' ) as outfile:
+        csv_writer = csv.writer( outfile )
+        csv_writer.writerow( [ 'grant' ] + names )
+        for i, grantID in enumerate(columns.grantIDs):
+            csv_writer.writerow( [ grantID ] + [ '' if np.isnan( metrics[name][i] ) else round( float( metrics[name][i] ), 3 ) for name in names ] )
+
+
+if __name__ == '__main__':
+    arguments = [ argument for argument in sys.argv[1:] if argument != 'per-grant' ]
+    path = arguments[0] if arguments else '../grants_final.csv'
+    print( json.dumps( grant_report(path), indent=2, sort_keys=True ) )
+    if 'per-grant' in sys.argv[1:]:
+        output_per_grant( GrantColumns.load(path) )
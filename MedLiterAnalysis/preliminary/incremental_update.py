@@ -0,0 +1,166 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Extend the grants with newly arrived articles without rerunning 'extend_known_grants'
+and 'tfidf_vectorizer' over the whole corpus.
+
+    python incremental_update.py build    # once, after 'extend_known_grants' has created grantsWithCandiPubs.pkl
+                                          # and grantsWithCandiPubs_scanned.pkl
+    python incremental_update.py update   # every night; only the articles which are not in the state are read
+
+The state keeps, for every grant, the vectorizer fitted on its publications, the centroid of
+its seeds and the accepted publications, plus the set of articles which have already been seen:
+at first the articles 'extend_known_grants' scanned, so the ones which arrived after that run are
+scored by the first delta run.
+A delta run vectorizes a new article only for the grants its authors match and scores it
+against the stored centroids.
+
+The centroid is not updated by a delta run, and that is what the full run does too: it is the
+centroid of the seeds (the articles with citations of the grant), and an accepted publication
+never becomes a seed. What a delta run does not refresh is the vectorizer, whose vocabulary
+and IDF were fitted on the publications of the build; rebuild the state when many articles
+have been added.
+'''
+import csv, os, pickle, sys
+from sklearn.metrics.pairwise import cosine_similarity
+from extend_known_grants import ( DATA_ROOT, FOLDERS, extract_authors, build_author_index, match_authors_indexed,
+                                  create_publication_instance, iter_corpus_files, SCANNED_FILE )
+from tfidf_vectorizer import fit_body_vectors, seed_centroid, score_candidates, recall_publications, extract_body
+
+
+class GrantState:
+    def __init__(self, grant, vectorizer, centroid):
+        self.grantID = grant.grantID
+        self.authors_pool = grant.authors_pool
+        self.vectorizer = vectorizer
+        self.centroid = centroid # None if no seed has a body
+        self.publications = [] # seeds and accepted publications, without vectors
+
+    def accept(self, pub):
+        if pub not in self.publications:
+            self.publications.append(pub)
+
+    def score(self, body):
+        if self.centroid is None or not body:
+            return None
+        return cosine_similarity( self.vectorizer.transform([body]), self.centroid )[0][0]
+
+
+class GrantStateStore:
+    def __init__(self, simi_threshold):
+        self.simi_threshold = simi_threshold
+        self.grants = {} # key: grantID   value: GrantState
+        self.seen = set() # relative paths of the articles which have been processed
+        self.author_index = None
+
+    def add_grant(self, state):
+        self.grants[state.grantID] = state
+        self.author_index = None
+
+    def match(self, authors_list):
+        if self.author_index is None:
+            self.author_index = build_author_index( self.grants.values() )
+        return match_authors_indexed( authors_list, self.author_index )
+
+    def save(self, path):
+        author_index, self.author_index = self.author_index, None # rebuilt on demand
+        pickle.dump( self, open(path, 'wb') )
+        self.author_index = author_index
+
+    @staticmethod
+    def load(path):
+        return pickle.load( open(path, 'rb') )
+
+
+def strip_vector(pub):
+    if hasattr(pub, 'vector'):
+        del pub.vector
+    return pub
+
+def build_state(grant_withCandiPubs, simi_threshold, scanned, root=DATA_ROOT):
+    """
+    the full run: the same as 'tfidf_vectorizer' but the fitted vectorizers and centroids are kept
+    scanned: the relative paths of the articles add_candidate_publications considered for the grants
+    """
+    store = GrantStateStore(simi_threshold)
+    n = 0
+    for grant in grant_withCandiPubs:
+        n += 1
+        print("*** GRANT", n, grant.grantID)
+        vectorizer = fit_body_vectors(grant, root)
+        centroid, pub_seeds = seed_centroid(grant)
+        pub_seeds, similarity_to_seed = score_candidates( grant, seeds=( centroid, pub_seeds ) )
+        grant_new = recall_publications( grant, pub_seeds, similarity_to_seed, simi_threshold )
+
+        state = GrantState(grant, vectorizer, centroid)
+        for pub in grant_new.publications:
+            state.accept( strip_vector(pub) )
+        store.add_grant(state)
+
+    """ not the corpus as it is now: an article added since 'extend_known_grants' ran is new """
+    store.seen.update(scanned)
+    print(len(store.grants), "grants and", len(store.seen), "articles are in the state.")
+    return store
+
+def new_articles(store, root=DATA_ROOT, folders=FOLDERS):
+    for folder, dirname, filename, path in iter_corpus_files(root, folders):
+        if "\\".join( [folder, dirname, filename] ) not in store.seen:
+            yield folder, dirname, filename, path
+
+def update(store, articles):
+    """
+    Score the new articles against the stored centroids of the grants their authors match.
+    The accepted publications are added to the grants but not to their seeds, so the centroids do not change.
+    Returns the (grant state, publication, similarity) of the accepted ones.
+    """
+    accepted = []
+    num_of_articles = 0
+    for folder, dirname, filename, path in articles:
+        num_of_articles += 1
+        relative_path = "\\".join( [folder, dirname, filename] )
+        fdata = open( path, 'r' ).read()
+        store.seen.add( relative_path )
+
+        matched_grants = store.match( extract_authors(fdata) )
+        if not matched_grants:
+            continue
+
+        body = extract_body(fdata)
+        publication = None
+        for state in matched_grants:
+            similarity = state.score(body)
+            if similarity is None or similarity < store.simi_threshold:
+                continue
+            if publication is None:
+                publication = create_publication_instance(folder, dirname, filename, fdata)
+            state.accept(publication)
+            accepted.append( (state, publication, similarity) )
+    print(num_of_articles, "new articles,", len(accepted), "publications are accepted.")
+    return accepted
+
+def output_accepted(accepted, path='../grants_final_delta.csv'):
+    """ the same columns as grants_final.csv """
+    with open(path, 'a', encoding="utf8", newline='') as outfile:
+        csv_writer = csv.writer(outfile)
+        for state, pub, similarity in accepted:
+            csv_writer.writerow( [ state.grantID, pub.relative_path, pub.title, pub.journal, " & ".join(pub.authors or []), "" ] )
+
+
+if __name__ == '__main__':
+    state_path = '../grant_states.pkl'
+    simi_threshold = 0.9
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        if not os.path.exists(SCANNED_FILE):
+            sys.exit("No %s. Run \"python extend_known_grants.py\" again." % SCANNED_FILE)
+        grant_withCandiPubs = pickle.load( open('../grantsWithCandiPubs.pkl', 'rb') ) # The pkl files are created in 'extend_known_grants'
+        store = build_state( grant_withCandiPubs, simi_threshold, pickle.load( open(SCANNED_FILE, 'rb') ) )
+    else:
+        if not os.path.exists(state_path):
+            sys.exit("No grant state. Run \"python incremental_update.py build\" first.")
+        store = GrantStateStore.load(state_path)
+        accepted = update( store, new_articles(store) )
+        output_accepted(accepted)
+    store.save(state_path)
@@ -0,0 +1,245 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Look up the impact factor of a journal however its name is written.
+
+The journal of an article (line[4] of article_citations.csv) and the names of journal_impactfactor.csv
+often differ: "ACS Chemical Biology" vs "acs chem biol", "&amp;" vs "&" vs "and". A name is looked up in
+three steps:
+    exact        the lower-cased name
+    normalized   journal_key: entities decoded, punctuation and stop words dropped, and every word
+                 abbreviated as in the NLM/ISO 4 titles, so the full title and its abbreviation share a key
+    fuzzy        the key with the most trigrams in common with the key of the name, if their Dice
+                 coefficient is at least min_similarity (misspellings, words missing from ABBREVIATIONS)
+                 and at least min_margin more than that of any other key; a near tie is 'ambiguous'
+
+A fuzzy match gives one journal the impact factor of another, so the cutoff errs on the side of a
+miss: "cancers" is not taken for "cancer" (0.8), nor is a name close to two journals taken for either.
+
+The trigram index only counts the candidates sharing one of the rarest trigrams of the key that any
+match must share (prefix filtering), and lookups are memoized, so a lookup stays well under a
+millisecond with tens of thousands of journals.
+
+Names which are not found, and the fuzzy matches to check by hand, are kept for write_report:
+
+    journal_misses.csv   journal, articles, how ('miss', 'ambiguous' or 'fuzzy'), closest journal, similarity
+
+    python journal_index.py [journal_impactfactor.csv]
+benchmarks the lookups of variants of all the journals of the file.
+'''
+import csv, html, math, random, re, sys, time
+
+""" impact factors which mean 'not known', e.g. for the journals appended by 'append_journals' """
+UNKNOWN_VALUES = ('', '-')
+
+STOP_WORDS = { 'the', 'of', 'and', 'for', 'in', 'on', 'a', 'an', 'de', 'la', 'le', 'der', 'und' }
+
+""" key: word of a journal title   value: its abbreviation in the NLM/ISO 4 titles """
+ABBREVIATIONS = {
+    'academy': 'acad', 'acta': 'acta', 'advances': 'adv', 'american': 'am', 'analytical': 'anal',
+    'anatomy': 'anat', 'annals': 'ann', 'annual': 'annu', 'applied': 'appl', 'archives': 'arch',
+    'association': 'assoc', 'bacteriology': 'bacteriol', 'biochemistry': 'biochem', 'biochemical': 'biochem',
+    'biological': 'biol', 'biology': 'biol', 'biomedical': 'biomed', 'biomedicine': 'biomed',
+    'biophysics': 'biophys', 'biophysical': 'biophys', 'biotechnology': 'biotechnol', 'british': 'br',
+    'bulletin': 'bull', 'canadian': 'can', 'cancer': 'cancer', 'cardiology': 'cardiol', 'cellular': 'cell',
+    'central': 'cent', 'chemical': 'chem', 'chemistry': 'chem', 'clinical': 'clin', 'communications': 'commun',
+    'comparative': 'comp', 'computational': 'comput', 'current': 'curr', 'dermatology': 'dermatol',
+    'development': 'dev', 'developmental': 'dev', 'diseases': 'dis', 'disease': 'dis', 'endocrinology': 'endocrinol',
+    'environmental': 'environ', 'epidemiology': 'epidemiol', 'european': 'eur', 'experimental': 'exp',
+    'gastroenterology': 'gastroenterol', 'general': 'gen', 'genetics': 'genet', 'gynecology': 'gynecol',
+    'health': 'health', 'hematology': 'hematol', 'immunology': 'immunol', 'infection': 'infect',
+    'infectious': 'infect', 'international': 'int', 'investigation': 'invest', 'investigative': 'invest',
+    'journal': 'j', 'laboratory': 'lab', 'letters': 'lett', 'medical': 'med', 'medicine': 'med',
+    'medicinal': 'med', 'methods': 'methods', 'microbiology': 'microbiol', 'molecular': 'mol',
+    'national': 'natl', 'neurology': 'neurol', 'neuroscience': 'neurosci', 'nuclear': 'nucl',
+    'nutrition': 'nutr', 'obstetrics': 'obstet', 'oncology': 'oncol', 'ophthalmology': 'ophthalmol',
+    'organic': 'org', 'pathology': 'pathol', 'pediatrics': 'pediatr', 'pharmacology': 'pharmacol',
+    'pharmaceutical': 'pharm', 'physics': 'phys', 'physiology': 'physiol', 'proceedings': 'proc',
+    'psychiatry': 'psychiatry', 'psychology': 'psychol', 'public': 'public', 'quarterly': 'q',
+    'radiology': 'radiol', 'research': 'res', 'reports': 'rep', 'reviews': 'rev', 'review': 'rev',
+    'royal': 'r', 'science': 'sci', 'sciences': 'sci', 'scientific': 'sci', 'society': 'soc',
+    'surgery': 'surg', 'surgical': 'surg', 'technology': 'technol', 'therapeutics': 'ther', 'therapy': 'ther',
+    'toxicology': 'toxicol', 'transactions': 'trans', 'urology': 'urol', 'virology': 'virol', 'united': 'u',
+    'states': 's', 'america': 'a',
+}
+
+NON_WORD_RE = re.compile( "[^a-z0-9]+" )
+
+
+def journal_key(name):
+    """ the canonical form of a journal name, e.g. "ACS Chemical Biology" and "acs chem. biol." give "acs chem biol" """
+    name = html.unescape( html.unescape(name) ).lower().replace('&', ' and ') # "&amp;amp;" is seen too
+    words = NON_WORD_RE.sub( ' ', name ).split()
+    return ' '.join( ABBREVIATIONS.get(word, word) for word in words if word not in STOP_WORDS )
+
+def trigrams(key):
+    padded = '  ' + key + ' '
+    return set( padded[i:i + 3] for i in range( len(padded) - 2 ) )
+
+def dice(a, b):
+    return 2.0 * len(a & b) / ( len(a) + len(b) ) if a or b else 0.0
+
+
+class JournalIndex:
+    def __init__(self, min_similarity=0.85, min_margin=0.05):
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.values = {}   # key: lower-cased name   value: impact factor
+        self.by_key = {}   # key: journal_key        value: lower-cased name, the one with a known value first
+        self.keys = []     # the journal keys, their positions are the ids of the trigram index
+        self.key_trigrams = []
+        self.postings = {} # key: trigram   value: ids of the keys containing it
+        self.cache = {}
+        self.misses = {}   # key: name   value: number of lookups
+        self.fuzzy = {}    # key: name   value: (matched name, similarity, number of lookups)
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def load(cls, path='../journal_impactfactor.csv', min_similarity=0.85, min_margin=0.05):
+        """ rows 'journal,impact factor'; a journal appended by 'append_journals' has no impact factor yet """
+        index = cls(min_similarity, min_margin)
+        with open( path, 'r' ) as jif:
+            for line in csv.reader( jif ):
+                if line and line[0].strip():
+                    index.add( line[0], line[1] if len(line) > 1 else '' )
+        return index
+
+    def add(self, name, value):
+        name = name.strip().lower()
+        if name not in self.values or self.values[name] in UNKNOWN_VALUES:
+            self.values[name] = value
+        key = journal_key(name)
+        if key not in self.by_key:
+            self.by_key[key] = name
+            self.keys.append(key)
+            self.key_trigrams.append( trigrams(key) )
+            for trigram in self.key_trigrams[-1]:
+                self.postings.setdefault( trigram, [] ).append( len(self.keys) - 1 )
+        elif self.values[ self.by_key[key] ] in UNKNOWN_VALUES and value not in UNKNOWN_VALUES:
+            self.by_key[key] = name
+        self.cache = {}
+
+    def _fuzzy(self, key):
+        """ (name of the most similar key, its similarity, similarity of the runner-up), the name None if there is no key """
+        query = trigrams(key)
+        """ the runner-up counts down to min_similarity - min_margin, so the candidates are filtered for that """
+        t = max( self.min_similarity - self.min_margin, 0.01 )
+        """ a key with Dice >= t shares at least 'overlap' trigrams, so it has one of the rarest len - overlap + 1 """
+        overlap = int( math.ceil( len(query) * t / (2 - t) ) )
+        rarest = sorted( query, key=lambda trigram: len( self.postings.get(trigram, ()) ) )[: len(query) - overlap + 1]
+        candidates = set()
+        for trigram in rarest:
+            candidates.update( self.postings.get(trigram, ()) )
+        """ and it has between len * t / (2 - t) and len * (2 - t) / t trigrams """
+        shortest, longest = len(query) * t / (2 - t), len(query) * (2 - t) / t
+        best, best_similarity, runner_up = None, 0.0, 0.0
+        for i in candidates:
+            if not shortest <= len( self.key_trigrams[i] ) <= longest:
+                continue
+            similarity = dice( query, self.key_trigrams[i] )
+            if similarity > best_similarity:
+                best, best_similarity, runner_up = i, similarity, best_similarity
+            elif similarity > runner_up:
+                runner_up = similarity
+        return ( self.by_key[ self.keys[best] ] if best is not None else None ), best_similarity, runner_up
+
+    def match(self, name):
+        """
+        (lower-cased name in the index, how: 'exact', 'normalized', 'fuzzy', 'ambiguous' or 'miss', similarity);
+        the name is None unless how is 'exact', 'normalized' or 'fuzzy'
+        """
+        if name in self.cache:
+            return self.cache[name]
+        lowered = name.strip().lower()
+        if lowered in self.values and self.values[lowered] not in UNKNOWN_VALUES:
+            result = ( lowered, 'exact', 1.0 )
+        else:
+            key = journal_key(lowered)
+            if key in self.by_key:
+                result = ( self.by_key[key], 'normalized', 1.0 )
+            elif key:
+                matched, similarity, runner_up = self._fuzzy(key)
+                if matched is None or similarity < self.min_similarity:
+                    result = ( None, 'miss', similarity )
+                elif similarity - runner_up < self.min_margin:
+                    result = ( None, 'ambiguous', similarity )
+                else:
+                    result = ( matched, 'fuzzy', similarity )
+            else:
+                result = ( None, 'miss', 0.0 )
+        self.cache[name] = result
+        return result
+
+    def contains(self, name):
+        """ whether the journal is in the index in any form, with or without an impact factor """
+        return self.match(name)[0] is not None or name.strip().lower() in self.values
+
+    def impact_factor(self, name):
+        """ the impact factor of the journal as in the file ('-' stays '-'), '' if it is not found; misses and fuzzy matches are recorded """
+        matched, how, similarity = self.match(name)
+        value = self.values[matched] if matched is not None else ''
+        if how == 'fuzzy':
+            self.fuzzy[name] = ( matched, similarity, self.fuzzy.get(name, (None, None, 0))[2] + 1 )
+        if value in UNKNOWN_VALUES:
+            self.misses[name] = self.misses.get(name, 0) + 1
+        return value
+
+    def write_report(self, path='../journal_misses.csv'):
+        """ the journals without an impact factor, the most frequent first, then the fuzzy matches """
+        with open( path, 'w', newline='' ) as report:
+            report = csv.writer( report )
+            for name, count in sorted( self.misses.items(), key=lambda item: -item[1] ):
+                matched, how, similarity = self.match(name)
+                closest = matched or self._closest(name)
+                report.writerow( [ name, count, 'ambiguous' if how == 'ambiguous' else 'miss', closest or '', round(similarity, 3) ] )
+            for name, (matched, similarity, count) in sorted( self.fuzzy.items(), key=lambda item: item[1][1] ):
+                if name not in self.misses:
+                    report.writerow( [ name, count, 'fuzzy', matched, round(similarity, 3) ] )
+        return len(self.misses), len(self.fuzzy)
+
+    def _closest(self, name):
+        """ the most similar journal of a name which is not matched, to check by hand """
+        key = journal_key(name)
+        return self._fuzzy(key)[0] if key else None
+
+
+def _variant(name, rnd):
+    """ the name written the way articles may write it: abbreviated, without stop words, or with a typo """
+    choice = rnd.randrange(3)
+    if choice == 0:
+        return ' '.join( ABBREVIATIONS.get(word, word) for word in name.lower().split() if word not in STOP_WORDS )
+    if choice == 1:
+        return name.upper().replace(' and ', ' &amp; ')
+    position = rnd.randrange( max( len(name) - 1, 1 ) )
+    return name[:position] + name[position + 1:]
+
+def benchmark(names, n=10000, seed=1):
+    rnd = random.Random(seed)
+    start = time.time()
+    index = JournalIndex()
+    for name in names:
+        index.add( name, '1.0' )
+    build_time = time.time() - start
+    queries = [ _variant( rnd.choice(names), rnd ) for _ in range(n) ]
+
+    start = time.time()
+    hows = {}
+    for query in queries:
+        how = index.match(query)[1]
+        hows[how] = hows.get(how, 0) + 1
+    lookup_time = time.time() - start
+    return { 'journals': len(names), 'keys': len(index.keys), 'lookups': n,
+             'build_seconds': round(build_time, 3),
+             'microseconds_per_lookup': round( 1e6 * lookup_time / n, 1 ),
+             'matches': hows }
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else '../journal_impactfactor.csv'
+    with open( path, 'r' ) as jif:
+        names = [ line[0] for line in csv.reader( jif ) if line and line[0].strip() ]
+    print( benchmark(names) )
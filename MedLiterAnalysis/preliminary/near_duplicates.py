@@ -0,0 +1,175 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Group near-identical articles (versions, errata and reprints saved as separate NXML files) by
+MinHash signatures of their cleaned <body> text, so that the later stages only see one
+representative per group.
+
+Every body is turned into a set of word 5-gram shingles and a MinHash signature. The signatures
+are cut into bands and articles sharing a band are compared, so the cost is linear in the corpus
+instead of quadratic. Pairs whose estimated Jaccard similarity reaches the threshold are merged.
+
+    duplicate_groups.csv   group, representative, member, estimated similarity to the representative, body length
+
+'extend_known_grants' skips the members which are not representatives and 'tfidf_vectorizer'
+drops them from the candidates of each grant.
+'''
+import csv, os, re, sys, zlib
+import numpy as np
+from multiprocessing import Pool
+from extend_known_grants import DATA_ROOT, FOLDERS, iter_corpus_files
+from tfidf_vectorizer import extract_body
+
+MERSENNE_PRIME = np.uint64( (1 << 61) - 1 )
+MAX_HASH = np.uint64( (1 << 32) - 1 )
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+        self.word_re = re.compile("\\w+")
+
+    def shingles(self, text):
+        words = self.word_re.findall( text.lower() )
+        n = self.shingle_size
+        if len(words) < n:
+            grams = [ " ".join(words) ] if words else []
+        else:
+            grams = [ " ".join( words[i : i + n] ) for i in range( len(words) - n + 1 ) ]
+        return np.unique( np.array( [ zlib.crc32( g.encode('utf8') ) for g in grams ], dtype=np.uint64 ) )
+
+    def signature(self, text):
+        """ None if the text has no words """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+        """ (a * x + b) mod p for every permutation and shingle; a, b < 2^31 and x < 2^32 so a * x does not overflow """
+        hashes = ( self.a[:, np.newaxis] * shingles[np.newaxis, :] + self.b[:, np.newaxis] ) % MERSENNE_PRIME
+        return ( hashes & MAX_HASH ).min(axis=1).astype(np.uint32)
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[ self.parent[x] ]
+            x = self.parent[x]
+        return x
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x != y:
+            self.parent[max(x, y)] = min(x, y)
+
+
+_hasher = None
+
+def _init_worker(num_perm, shingle_size):
+    global _hasher
+    _hasher = MinHasher(num_perm, shingle_size)
+
+def _signature_of_file(item):
+    relative_path, path = item
+    body = extract_body( open(path, 'r').read() ) or ''
+    return relative_path, len(body), _hasher.signature(body)
+
+def compute_signatures(items, num_perm=128, shingle_size=5, workers=1):
+    """ items: (relative path, file path); returns the paths, body lengths and signatures of the articles with a body """
+    if workers > 1:
+        pool = Pool( workers, _init_worker, (num_perm, shingle_size) )
+        results = pool.imap(_signature_of_file, items, chunksize=64)
+    else:
+        _init_worker(num_perm, shingle_size)
+        pool = None
+        results = map(_signature_of_file, items)
+
+    paths, lengths, signatures = [], [], []
+    for relative_path, length, signature in results:
+        if signature is None:
+            continue
+        paths.append(relative_path)
+        lengths.append(length)
+        signatures.append(signature)
+    if pool:
+        pool.close()
+        pool.join()
+    signatures = np.array(signatures, dtype=np.uint32).reshape(len(paths), num_perm)
+    return paths, lengths, signatures
+
+def find_groups(signatures, bands=16, threshold=0.8):
+    """
+    Returns a list of groups (lists of row numbers) with more than one member.
+    With 16 bands of 8 rows, pairs above ~0.7 Jaccard similarity are very likely to share a band.
+    """
+    num_of_docs, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    union_find = UnionFind(num_of_docs)
+    for band in range(bands):
+        buckets = {}
+        band_values = np.ascontiguousarray( signatures[:, band * rows_per_band : (band + 1) * rows_per_band] )
+        for doc, key in enumerate( band_values ):
+            buckets.setdefault( key.tobytes(), [] ).append(doc)
+        for docs in buckets.values():
+            if len(docs) < 2:
+                continue
+            for i in range( 1, len(docs) ):
+                """ compare with the first and the previous article of the bucket; the union does the rest """
+                for other in set( [ docs[0], docs[i - 1] ] ):
+                    if union_find.find(docs[i]) == union_find.find(other):
+                        continue
+                    if np.mean( signatures[docs[i]] == signatures[other] ) >= threshold:
+                        union_find.union(docs[i], other)
+
+    groups = {}
+    for doc in range(num_of_docs):
+        groups.setdefault( union_find.find(doc), [] ).append(doc)
+    return [ docs for docs in groups.values() if len(docs) > 1 ]
+
+def output_groups(paths, lengths, signatures, groups, path='../duplicate_groups.csv'):
+    """ the longest body of a group is its representative; returns the group statistics """
+    sizes = {}
+    with open(path, 'w', encoding="utf8", newline='') as outfile:
+        csv_writer = csv.writer(outfile)
+        for group_id, docs in enumerate( sorted( groups, key=lambda docs: paths[ docs[0] ] ) ):
+            representative = min( docs, key=lambda doc: (-lengths[doc], paths[doc]) )
+            for doc in sorted( docs, key=lambda doc: paths[doc] ):
+                similarity = np.mean( signatures[doc] == signatures[representative] )
+                csv_writer.writerow( [ group_id, paths[representative], paths[doc], "%.3f" % similarity, lengths[doc] ] )
+            sizes[len(docs)] = sizes.get(len(docs), 0) + 1
+    return { 'articles': len(paths), 'groups': len(groups),
+             'collapsed_articles': sum( len(docs) - 1 for docs in groups ),
+             'group_sizes': sizes }
+
+def load_duplicate_map(path='../duplicate_groups.csv'):
+    """ key: relative path of a member which is not a representative   value: relative path of its representative """
+    duplicate_map = {}
+    if not os.path.exists(path):
+        return duplicate_map
+    with open(path, 'r', encoding="utf8") as infile:
+        for group_id, representative, member, similarity, length in csv.reader(infile):
+            if member != representative:
+                duplicate_map[member] = representative
+    return duplicate_map
+
+def collapse_duplicates(grant, duplicate_map):
+    """ drop the candidates which are duplicates of another article; seeds are always kept """
+    grant.publications = [ pub for pub in grant.publications
+                           if pub.isSeed or pub.relative_path not in duplicate_map ]
+    return grant
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    items = ( ( "\\".join( [folder, dirname, filename] ), path ) for folder, dirname, filename, path in iter_corpus_files(DATA_ROOT, FOLDERS) )
+    paths, lengths, signatures = compute_signatures(items, workers=workers)
+    print(len(paths), "signatures are computed.")
+    groups = find_groups(signatures)
+    print( output_groups(paths, lengths, signatures, groups) )
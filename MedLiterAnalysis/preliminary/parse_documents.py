@@ -4,8 +4,26 @@ Created on Jul 12, 2014
 @author: munichong
 '''
 import os, re
+from collections import namedtuple
+from multiprocessing import Pool
 from html import entities
 import string
+from run_metrics import METRICS
+
+""" compiled once; re.compile() of a compiled pattern returns it, so findRegexPattern takes them too """
+ENTITY_RE = re.compile( r"&#?\w+;" )
+TAGS_RE = re.compile( r"<([\s\S]*?)>" )
+ACK_RE = re.compile( r"<ack[\s\S]*?>([\s\S]*?)</ack>" )
+ABSTRACT_RE = re.compile( r"<abstract[\s\S]*?>([\s\S]*?)</abstract>" )
+JOURNAL_TITLE_RE = re.compile( r"<journal-title>([\s\S]*?)</journal-title>" )
+TITLE_GROUP_RE = re.compile( r"<title-group[\s\S]*?>([\s\S]*?)</title-group>" )
+GRANT_LONG_RE = re.compile( r"([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2}\-[A-Z]{2,5})" )
+GRANT_END_PARA_RE = re.compile( r"([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2}[\s]{0,1}\([A-Z]{2,5}\))" )
+GRANT_SHORT_RE = re.compile( r"([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2})" )
+GRANT_FULL_PARA_RES = [ re.compile( r"(American Cancer Society \([\s\S]*?\))" ),
+                        re.compile( r"(American Cancer Society grant \([\s\S]*?\))" ),
+                        re.compile( r"(ACS grant \([\s\S]*?\))" ) ]
+DIGIT_RE = re.compile( r"\d" )
 
 def unescape(text):
     """ This function converts HTML entities and character references to ordinary characters. """
@@ -27,7 +45,7 @@ def unescape(text):
             except KeyError:
                 pass
         return text # leave as is
-    return re.sub("&#?\w+;", fixup, text)
+    return ENTITY_RE.sub(fixup, text)
 
 def findRegexPattern(regex, text):    
     reg = re.compile( regex )
@@ -38,13 +56,13 @@ def findRegexPattern(regex, text):
     return match.groups()
 
 def remove_tags(text):    
-    """ remove any noisy tags in matching """
-    tags_re = re.compile( "<([\s\S]*?)>" )
-    match = tags_re.findall( text )
-#    print match
-    for m in match:
-        text = text.replace(m, "")
-    return unescape( text.replace("<>", " ").replace("</>", " ").replace("  ", " ").strip() )
+    """ remove any noisy tags in matching; timed as 'clean' wherever it is called from (titles, bodies, ...) """
+    with METRICS.stage('clean'):
+        match = TAGS_RE.findall( text )
+#        print match
+        for m in match:
+            text = text.replace(m, "")
+        return unescape( text.replace("<>", " ").replace("</>", " ").replace("  ", " ").strip() )
 
 def replace_unprintable(text, new_string):
     unpStr = ''
@@ -66,22 +84,19 @@ def is_valid_grantNo(gn):
 def extract_grantNo(text):
     
     """ If being granted by ACS, check whether target content has Grant No. (two possible formats) """
-    grantNo_long = findRegexPattern( "([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2}\-[A-Z]{2,5})", 
-                                            text )    # REG-03-098-08-EFS
+    grantNo_long = findRegexPattern( GRANT_LONG_RE, text )    # REG-03-098-08-EFS
     
-    grantNo_endPara = findRegexPattern( "([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2}[\s]{0,1}\([A-Z]{2,5}\))",
-                                            text )    # REG-03-098-08(EFS) or REG-03-098-08 (EFS)
+    grantNo_endPara = findRegexPattern( GRANT_END_PARA_RE, text )    # REG-03-098-08(EFS) or REG-03-098-08 (EFS)
     
-    grantNo_short = findRegexPattern( "([A-Z]{2,5}[\- ][0-9]{2}\-[0-9]{3}\-[0-9]{2})", 
-                                            text )    # REG-03-098-08
+    grantNo_short = findRegexPattern( GRANT_SHORT_RE, text )    # REG-03-098-08
     
 #     grantNo_compact = findRegexPattern( "([A-Z]{2,5}[0-9]{7}[A-Z]{0,5})", text )    # REG0309808
     
-    grantNo_fullPara = findRegexPattern( "(American Cancer Society \([\s\S]*?\))", text )
-    if not grantNo_fullPara:
-        grantNo_fullPara = findRegexPattern( "(American Cancer Society grant \([\s\S]*?\))", text )
-        if not grantNo_fullPara:
-            grantNo_fullPara = findRegexPattern( "(ACS grant \([\s\S]*?\))", text )
+    grantNo_fullPara = None
+    for regex in GRANT_FULL_PARA_RES:
+        grantNo_fullPara = findRegexPattern( regex, text )
+        if grantNo_fullPara:
+            break
     
     grantNo = ''
     """ First go with grantNo_long, if it is None, then go with grantNo_para which may also be None """
@@ -95,7 +110,7 @@ def extract_grantNo(text):
 #         grantNo = grantNo_compact
     elif grantNo_fullPara:
         """ if grantNo_fullPara does NOT contain digits, DISCARD """
-        grantNo_fullPara = [ x for x in grantNo_fullPara if re.compile('\d').search(x) ]
+        grantNo_fullPara = [ x for x in grantNo_fullPara if DIGIT_RE.search(x) ]
         grantNo = [ x[ x.index('(') + 1 : x.index(')') ] for x in grantNo_fullPara ]
     else:
         return None
@@ -122,15 +137,20 @@ def extract_target_content(regex, text):
     target_content = replace_unprintable( target_content, "" )
     return target_content.replace("  ", " ")
 
-def create_publication_from_rawtext(fdata):
-    acknowledgement = findRegexPattern( "<ack[\s\S]*?>([\s\S]*?)</ack>", fdata )
-    abstract = findRegexPattern( "<abstract[\s\S]*?>([\s\S]*?)</abstract>", fdata )
+def qualification(fdata):
+    """
+    (ACS mention: 'full', 'abbr' or None, grant number or None, article title, journal title) of a document;
+    the titles are only extracted, '' otherwise, when it has both an ACS mention and a grant number
+    """
+    with METRICS.stage('extract'):
+        acknowledgement = findRegexPattern( ACK_RE, fdata )
+        abstract = findRegexPattern( ABSTRACT_RE, fdata )
     
     """ whether the article has ACK and ABS """
     target_content = ''
     if acknowledgement == None and abstract == None:
 #         print("NO ACKNOWLEDGEMENT AND ABSTRACT FOUND!")
-        return None
+        return None, None, '', ''
     elif acknowledgement != None and abstract != None:
         target_content = acknowledgement[0] + " " + abstract[0]
     else:
@@ -139,36 +159,113 @@ def create_publication_from_rawtext(fdata):
         
     target_content = remove_tags( target_content )
 #       print "TARGET CONTENT:", target_content
-    has_ACS_full = False
-    has_ACS_abbr = False
+    acs = None
     if ( "American Cancer Society" in target_content or 
         "American cancer society" in target_content or
         "american cancer society" in target_content ):
-        has_ACS_full = True
+        acs = 'full'
     elif " ACS " in target_content:
-        has_ACS_abbr = True
+        acs = 'abbr'
         
-    has_grantNo = False
-    grantNo = extract_grantNo( target_content )
-    if grantNo:
-        has_grantNo = True
+    with METRICS.stage('extract'):
+        grantNo = extract_grantNo( target_content )
         
-    if not ( ( has_ACS_full or has_ACS_abbr ) and has_grantNo ):
-        return None
+    if not ( acs and grantNo ):
+        return acs, grantNo, '', ''
         
     """ For output """
-    journal_title = extract_target_content( "<journal-title>([\s\S]*?)</journal-title>", fdata )
-    journal_title = journal_title.lower()
+    with METRICS.stage('extract'):
+        journal_title = extract_target_content( JOURNAL_TITLE_RE, fdata )
+        journal_title = journal_title.lower()
 #     print("JOURNAL-TITLE:", journal_title)
         
-    """ <title-group> <article-title> </article-title> <subtitle> </subtitle> <title-group>  """
-    article_title = extract_target_content( "<title-group[\s\S]*?>([\s\S]*?)</title-group>", fdata )
-    article_title = article_title.replace( "-", " " )
+        """ <title-group> <article-title> </article-title> <subtitle> </subtitle> <title-group>  """
+        article_title = extract_target_content( TITLE_GROUP_RE, fdata )
+        article_title = article_title.replace( "-", " " )
 #     print("ARTICLE-TITLE:", article_title)
         
-        
+    return acs, grantNo, article_title, journal_title
+
+def create_publication_from_rawtext(fdata, folder=None, dirname=None, filename=None):
+    acs, grantNo, article_title, journal_title = qualification( fdata )
+    if not ( acs and grantNo ):
+        return None
     return [ folder, dirname, filename, article_title, journal_title, grantNo ]    
 
+def clean_row(line):
+    """ no field may break the comma separated output """
+    return [ s.replace(",", " ").replace(";", " ").replace("\n", " ").replace("\t", " ") for s in line ]
+
+class QualificationRecord( namedtuple( 'QualificationRecord', ['path', 'qualified', 'acs', 'grant_numbers', 'title', 'journal', 'error'] ) ):
+    """ the result of qualify_document; error is the exception message if the document could not be read """
+    __slots__ = ()
+
+    def row(self):
+        """ the row of qualified_articles.csv, with the last three components of the path as folder, dirname and filename """
+        folder, dirname, filename = ( [''] * 3 + re.split( r'[\\/]', self.path ) )[-3:]
+        return clean_row( [ folder, dirname, filename, self.title, self.journal, self.grant_numbers ] )
+
+def qualify_document(path, data):
+    """ pure: no state is shared between calls, so it can run in threads and worker processes """
+    try:
+        if isinstance(data, bytes):
+            with METRICS.stage('decode'):
+                data = data.decode('utf-8', 'replace')
+        acs, grantNo, article_title, journal_title = qualification( data )
+    except Exception as err: # e.g. a qualified document without a <journal-title>
+        return QualificationRecord( path, False, None, None, '', '', '%s: %s' % ( type(err).__name__, err ) )
+    return QualificationRecord( path, bool( acs and grantNo ), acs, grantNo, article_title, journal_title, None )
+
+def _qualify_item(item):
+    return qualify_document( *item )
+
+def qualify_documents(items, workers=1, chunksize=64):
+    """
+    items: (path, bytes or str of the NXML document); yields their QualificationRecords in the same order.
+    workers > 1 qualifies them in that many processes; if the generator is closed (or fails) before
+    the end, the workers are terminated rather than left to qualify the rest.
+    """
+    if workers > 1:
+        pool = Pool(workers)
+        finished = False
+        try:
+            for record in pool.imap(_qualify_item, items, chunksize=chunksize):
+                yield record
+            finished = True
+        finally:
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+    else:
+        for item in items:
+            yield _qualify_item(item)
+
+def read_documents(paths):
+    """ (path, bytes) of the files, for qualify_documents """
+    for path in paths:
+        with METRICS.stage('read'), open( path, 'rb' ) as infile:
+            data = infile.read()
+        METRICS.count('files')
+        METRICS.count('bytes', len(data))
+        yield path, data
+
+def qualified_rows(root, folders):
+    """ yield the cleaned row of every qualified article of the folders (e.g. "articles.A-B") of the corpus """
+    for folder in folders:
+        path = os.path.join( root, folder )
+        for dirname in os.listdir( path ):
+            for filename in os.listdir( os.path.join( path, dirname ) ):
+                if filename[0] == '#' and filename[-1] == '#':
+                    continue
+                with METRICS.stage('read'):
+                    fdata = open( os.path.join( path, dirname, filename ), 'r').read()
+                METRICS.count('files')
+                this_output = create_publication_from_rawtext(fdata, folder, dirname, filename)
+                if this_output:
+                    METRICS.count('qualified')
+                    yield clean_row( this_output )
 
 
 if __name__ == '__main__':
@@ -189,11 +286,14 @@ if __name__ == '__main__':
             if filename[0] == '#' and filename[-1] == '#':
                 continue
             
-            fdata = open( path + dirname + '\\' + filename , 'r').read()
+            with METRICS.stage('read'):
+                fdata = open( path + dirname + '\\' + filename , 'r').read()
+            METRICS.count('files')
         
-            this_output = create_publication_from_rawtext(fdata)
+            this_output = create_publication_from_rawtext(fdata, folder, dirname, filename)
             if not this_output:
                 continue
+            METRICS.count('qualified')
             output.append( this_output )
             
             print("")
@@ -205,10 +305,11 @@ if __name__ == '__main__':
     
     with open("../qualified_articles_raw.csv", "a") as outfile:
         for line in output:
-            line = [ s.replace(",", " ").replace(";", " ").replace("\n", " ").replace("\t", " ") for s in line ]
+            line = clean_row( line )
             outfile.write( ','.join( line ) + '\n' )       
     outfile.close()    
     print("\n", len(output), "qualified articles have been output!")
+    print("Run metrics are written to", METRICS.save())
 
 
 
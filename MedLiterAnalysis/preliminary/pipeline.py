@@ -0,0 +1,495 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Run the whole flow in one process, handing the records from stage to stage in memory:
+
+    qualified_articles   parse_documents           rows of the articles acknowledging an ACS grant
+    article_citations    citation_providers        + citations and the title found
+    impact_factors       append_journals           impact factor of every journal, new journals
+    article_cite_ifr     combine_cites_impfactor   + impact factor of the journal
+    candidate_grants     extend_known_grants       grants with their seeds and the articles of their authors
+    grants_final         tfidf_vectorizer          grants with the recalled publications
+    grants_final_rows    alter_representation      rows of grants_final.csv
+
+Each stage can also materialize its output in the file the script used to write, and a stage can be
+loaded from that file instead of being run, e.g. to start after the Scholar queries:
+
+    python pipeline.py [--root <corpus root>] [--materialize all|stage,stage] [--load stage,stage] [--until stage]
+                       [--providers corpus,scholar] [--dense]
+
+A stage whose run returns an iterator hands it to the next stage as it is, without a list of its
+records in memory, when that stage is the only one using it, reads it in one pass (see
+Stage.iterates) and it is neither materialized nor cached; its work is then timed in the stage
+reading it. Otherwise the pipeline makes a list of the records.
+
+With --cache, every stage is materialized and its fingerprint is recorded in ../.pipeline_state.json:
+the digests of its code (its modules and its run function), its parameters, its source files (the
+corpus, journal_impactfactor.csv, ...) and the part of its input records it uses. A stage whose
+fingerprint is unchanged and whose files are intact is loaded instead of being run, like make.
+Since the fingerprint holds the records of the inputs, not their files, candidate_grants is still
+skipped when only the impact factors changed: it does not use that column of article_cite_ifr.
+
+    python pipeline.py --cache [--force stage,stage]   run the stale stages only
+    python pipeline.py --dry-run                       list the stages which would run and why
+
+The time of every stage, and of the work inside it (see run_metrics), is written to
+../run_metrics_pipeline.json; "--profile stage,stage" profiles them with cProfile and
+"--trace-memory stage,stage" traces their allocations.
+'''
+import argparse, csv, hashlib, importlib.util, json, os, pickle, sys, types
+from extend_known_grants import DATA_ROOT, FOLDERS, iter_corpus_files
+from digests import file_digest
+from run_metrics import METRICS
+
+STATE_FILE = '../.pipeline_state.json'
+
+
+def records_digest(records):
+    """ a digest of records which does not depend on the order of sets and dicts, nor on 5 vs '5' (CSV rows) """
+    digest = hashlib.sha1()
+    def feed(value):
+        if isinstance(value, (list, tuple)):
+            digest.update(b'[')
+            for item in value:
+                feed(item)
+            digest.update(b']')
+        elif isinstance(value, dict):
+            digest.update(b'{')
+            for key in sorted( value, key=str ):
+                feed(key)
+                feed(value[key])
+            digest.update(b'}')
+        elif isinstance(value, (set, frozenset)):
+            feed( sorted( value, key=str ) )
+        elif hasattr(value, '__dict__'):
+            digest.update( type(value).__name__.encode('utf-8') )
+            feed( vars(value) )
+        elif hasattr(value, 'tobytes'):
+            digest.update( value.tobytes() ) # numpy arrays
+        else:
+            digest.update( repr( '' if value is None else str(value) ).encode('utf-8') )
+    feed(records)
+    return digest.hexdigest()
+
+_corpus_digests = {}
+def corpus_digest(root, folders):
+    """ the digest of the paths, sizes and modification times of the corpus files; the files are not read """
+    key = ( root, tuple(folders) )
+    if key not in _corpus_digests:
+        digest = hashlib.sha1()
+        for folder, dirname, filename, path in iter_corpus_files(root, folders):
+            info = os.stat(path)
+            digest.update( ( "%s\\%s\\%s %d %d\n" % (folder, dirname, filename, info.st_size, info.st_mtime_ns) ).encode('utf-8') )
+        _corpus_digests[key] = digest.hexdigest()
+    return _corpus_digests[key]
+
+def code_digest(modules, function=None):
+    """ the digest of the source of the modules and of the bytecode of the function """
+    digest = hashlib.sha1()
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        digest.update( file_digest( spec.origin ).encode('utf-8') if spec and spec.origin else name.encode('utf-8') )
+    def feed(code):
+        digest.update( code.co_code )
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                feed(const) # a nested function or comprehension, its repr has its address
+            else:
+                digest.update( repr(const).encode('utf-8') )
+    if function is not None:
+        feed( function.__code__ )
+    return digest.hexdigest()
+
+
+class Stage:
+    """
+    run(*records of the inputs) returns the records of the stage
+    materialize(records) writes them to the file of the old script, load() reads them back from it
+    For the cache:
+        modules: names of the modules the stage runs, part of its code version
+        params: its parameters, a JSON-serializable dict
+        sources: function returning { name: digest } of the data it reads besides its inputs
+        uses: { input name: function of the input records returning the part the stage depends on }
+        outputs: the files materialize writes
+    iterates: names of the inputs run reads once, in order, so they can be given as an iterator
+    """
+    def __init__(self, name, inputs, run, materialize=None, load=None,
+                 modules=(), params=None, sources=None, uses=None, outputs=(), iterates=()):
+        self.name = name
+        self.inputs = list(inputs)
+        self.run = run
+        self.materialize = materialize
+        self.load = load
+        self.modules = list(modules)
+        self.params = params or {}
+        self.sources = sources
+        self.uses = uses or {}
+        self.outputs = list(outputs)
+        self.iterates = set(iterates)
+
+    def input_digest(self, input_name, records):
+        return records_digest( self.uses[input_name](records) if input_name in self.uses else records )
+
+    def fingerprint(self, input_digests):
+        """ the fingerprint of the stage given { input name: digest of the part of its records the stage uses } """
+        return { 'code': code_digest(self.modules, self.run),
+                 'params': json.loads( json.dumps( self.params, sort_keys=True ) ),
+                 'sources': self.sources() if self.sources else {},
+                 'inputs': dict(input_digests) }
+
+
+def stale_reasons(stage, recorded, fingerprint):
+    """ why the stage has to run, [] if its recorded run is still valid """
+    if recorded is None:
+        return ['never cached']
+    reasons = []
+    if recorded['code'] != fingerprint['code']:
+        reasons.append('code changed')
+    if recorded['params'] != fingerprint['params']:
+        reasons.append( 'params changed: ' + ', '.join( sorted( key for key in set(recorded['params']) | set(fingerprint['params'])
+                                                                if recorded['params'].get(key) != fingerprint['params'].get(key) ) ) )
+    for name in sorted( set(recorded['sources']) | set(fingerprint['sources']) ):
+        if recorded['sources'].get(name) != fingerprint['sources'].get(name):
+            reasons.append( 'source changed: ' + name )
+    for name in sorted( fingerprint['inputs'] ):
+        if fingerprint['inputs'][name] is not None and recorded['inputs'].get(name) != fingerprint['inputs'][name]:
+            reasons.append( 'input changed: ' + name )
+    for path in stage.outputs:
+        if file_digest(path) != recorded['outputs'].get(path):
+            reasons.append( 'output missing or modified: ' + path )
+    if stage.load is None:
+        reasons.append('cannot be loaded')
+    return reasons
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as infile:
+        return json.load(infile)
+
+def save_state(state, path=STATE_FILE):
+    with open(path + '.tmp', 'w') as outfile:
+        json.dump(state, outfile, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+class Pipeline:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage):
+        for name in stage.inputs:
+            if name not in self.stages:
+                raise ValueError('stage "%s" needs "%s", which is not declared before it' % (stage.name, name))
+        self.stages[stage.name] = stage
+
+    def order(self, targets=None, loaded=()):
+        """ the stages needed for the targets (all stages by default), each after its inputs """
+        ordered = []
+        def visit(name):
+            if name in ordered:
+                return
+            if name not in loaded:
+                for input_name in self.stages[name].inputs:
+                    visit(input_name)
+            ordered.append(name)
+        for name in targets or self.stages:
+            visit(name)
+        return ordered
+
+    def run(self, targets=None, materialize=(), loaded=(), cache=False, force=(), state_path=STATE_FILE):
+        """
+        materialize: names of the stages whose output is written to its file, 'all' for every stage
+        loaded: names of the stages read from their file instead of being run
+        cache: materialize every stage, record its fingerprint and load the stages whose fingerprint is unchanged
+        force: names of the stages run even if their fingerprint is unchanged
+        Returns { stage name: records } but for the stages whose iterator was handed to the next stage
+        """
+        state = load_state(state_path) if cache else {}
+        records = {}
+        streamed = set()
+        ordered = self.order(targets, loaded)
+        for name in ordered:
+            stage = self.stages[name]
+            if name in loaded:
+                print("---", name, "is loaded")
+                records[name] = stage.load()
+                continue
+            if cache:
+                fingerprint = stage.fingerprint( dict( ( input_name, stage.input_digest( input_name, records[input_name] ) )
+                                                       for input_name in stage.inputs ) )
+                reasons = [ 'forced' ] if name in force else stale_reasons( stage, state.get(name), fingerprint )
+                if not reasons:
+                    print("---", name, "is unchanged, loaded")
+                    records[name] = stage.load()
+                    continue
+                print("---", name, "(" + "; ".join(reasons) + ")")
+            else:
+                print("---", name)
+            with METRICS.stage(name):
+                records[name] = stage.run( *[ records[input_name] for input_name in stage.inputs ] )
+            if isinstance( records[name], types.GeneratorType ):
+                if self.can_stream( name, ordered, loaded, materialize, cache ):
+                    streamed.add(name)
+                else:
+                    with METRICS.stage(name):
+                        records[name] = list( records[name] )
+            if stage.materialize is not None and ( cache or materialize == 'all' or name in materialize ):
+                stage.materialize( records[name] )
+                if cache:
+                    """ the sources again: a stage may write one of them, e.g. impact_factors appends the new journals """
+                    fingerprint['sources'] = stage.sources() if stage.sources else {}
+                    fingerprint['outputs'] = dict( ( path, file_digest(path) ) for path in stage.outputs )
+                    state[name] = fingerprint
+                    save_state(state, state_path)
+        return dict( ( name, stage_records ) for name, stage_records in records.items() if name not in streamed )
+
+    def can_stream(self, name, ordered, loaded=(), materialize=(), cache=False):
+        """ whether the iterator of the stage can be handed as it is to the one stage reading it """
+        if cache or ( self.stages[name].materialize is not None and ( materialize == 'all' or name in materialize ) ):
+            return False
+        readers = [ other for other in ordered if other not in loaded and name in self.stages[other].inputs ]
+        return len(readers) == 1 and name in self.stages[ readers[0] ].iterates
+
+    def dry_run(self, targets=None, force=(), state_path=STATE_FILE):
+        """
+        [(stage name, 'run'|'skip'|'maybe', reasons)] without running anything. A stage after a stage
+        which runs is 'maybe': it runs only if the part of that output it uses changes.
+        """
+        state = load_state(state_path)
+        report = []
+        will_run = set()
+        for name in self.order(targets):
+            stage = self.stages[name]
+            recorded = state.get(name)
+            """ the inputs are not computed: an input which is skipped gives the records it was recorded with """
+            fingerprint = stage.fingerprint( dict( ( input_name, None if input_name in will_run else ( recorded or {} ).get('inputs', {}).get(input_name) )
+                                                   for input_name in stage.inputs ) )
+            reasons = [ 'forced' ] if name in force else stale_reasons( stage, recorded, fingerprint )
+            rerun_inputs = [ input_name for input_name in stage.inputs if input_name in will_run ]
+            if reasons:
+                will_run.add(name)
+                report.append( ( name, 'run', reasons ) )
+            elif rerun_inputs:
+                will_run.add(name)
+                report.append( ( name, 'maybe', [ 'input is rerun: ' + input_name for input_name in rerun_inputs ] ) )
+            else:
+                report.append( ( name, 'skip', [] ) )
+        return report
+
+
+def read_rows(path):
+    with open(path, 'r', encoding="utf8") as infile:
+        return [ line for line in csv.reader(infile) ]
+
+def write_rows(rows, path):
+    with open(path, 'w', encoding="utf8", newline='') as outfile:
+        csv.writer(outfile, lineterminator='\n').writerows(rows)
+
+def read_pickle(path):
+    return pickle.load( open(path, 'rb') )
+
+def write_pickle(records, path):
+    pickle.dump( records, open(path, 'wb') )
+
+
+def cite_articles(qualified_rows, chain, previous_path='../article_citations.csv'):
+    """
+    The rows with the citations of their title: the answer already in article_citations.csv for the same
+    title key, otherwise the answer of the provider chain; every distinct title is looked up once.
+    """
+    from title_matching import title_key
+    answers = {}
+    if os.path.exists(previous_path):
+        for line in read_rows(previous_path):
+            if len(line) >= 8:
+                answers[ title_key( line[3] ) ] = ( line[6], line[7] )
+    missing = {}
+    for line in qualified_rows:
+        key = title_key( line[3] ) or line[3]
+        if key not in answers:
+            missing.setdefault( key, line )
+    keys = list(missing)
+    for position, answer, provider in chain.lookup_many( [ ( missing[key][3], missing[key] ) for key in keys ] ):
+        if answer is not None: # a failed lookup, its rows are left without citations and looked up again next time
+            answers[ keys[position] ] = answer
+    print(len(qualified_rows) - len(keys), "articles are answered from before,", len(keys), "titles are looked up:", chain.stats)
+    if chain.stats.get('failed'):
+        print(chain.stats['failed'], "lookups failed; force article_citations to look them up again")
+
+    rows = []
+    for line in qualified_rows:
+        citations, result_title = answers.get( title_key( line[3] ) or line[3], ( '', '' ) )
+        rows.append( list(line) + [ citations, result_title ] if result_title else list(line) )
+    return rows
+
+def write_article_citations(rows, path='../article_citations.csv'):
+    write_rows(rows, path)
+    if os.path.exists(path + '.journal'):
+        os.remove(path + '.journal') # the 'result_writer' journal of the old file, it is indexed again
+
+
+def build_pipeline(root=DATA_ROOT, folders=FOLDERS, providers=('scholar',), workers=None, simi_threshold=0.9, dense=False):
+    pipeline = Pipeline()
+    corpus = lambda: { 'corpus': corpus_digest(root, folders) }
+    duplicates = lambda: { 'duplicate_groups.csv': file_digest('../duplicate_groups.csv') }
+
+    def qualified_articles():
+        from parse_documents import qualified_rows
+        return qualified_rows(root, folders)
+    pipeline.add( Stage( 'qualified_articles', [], qualified_articles,
+                         lambda rows: write_rows(rows, '../qualified_articles.csv'),
+                         lambda: read_rows('../qualified_articles.csv'),
+                         modules=['parse_documents', 'extend_known_grants'], params={ 'root': root, 'folders': list(folders) },
+                         sources=corpus, outputs=['../qualified_articles.csv'] ) )
+
+    def article_citations(qualified_rows):
+        from citation_providers import build_chain
+        return cite_articles( qualified_rows, build_chain( list(providers), workers=workers, root=root ) )
+    """ Scholar is not fingerprinted: its answers are kept until the stage is forced """
+    provider_files = lambda: { 'article_citations_offline.csv': file_digest('../article_citations_offline.csv') } if 'corpus' in providers else {}
+    pipeline.add( Stage( 'article_citations', ['qualified_articles'], article_citations,
+                         write_article_citations,
+                         lambda: read_rows('../article_citations.csv'),
+                         modules=['citation_providers', 'citation_index', 'scholar', 'title_matching'], params={ 'providers': list(providers) },
+                         sources=provider_files, outputs=['../article_citations.csv'] ) )
+
+    def impact_factors(article_rows):
+        from append_journals import article_journals, new_journals
+        from combine_cites_impfactor import read_impact_factors
+        journals = new_journals( article_journals(article_rows) )
+        print(len(journals), "journals have no impact factor yet")
+        return read_impact_factors(), journals
+    def append_new_journals(factors_and_journals):
+        from append_journals import append_journals
+        append_journals( factors_and_journals[1] )
+    def load_impact_factors():
+        from combine_cites_impfactor import read_impact_factors
+        return read_impact_factors(), set()
+    pipeline.add( Stage( 'impact_factors', ['article_citations'], impact_factors, append_new_journals, load_impact_factors,
+                         modules=['append_journals', 'combine_cites_impfactor', 'journal_index'],
+                         sources=lambda: { 'journal_impactfactor.csv': file_digest('../journal_impactfactor.csv') },
+                         uses={ 'article_citations': lambda rows: [ line[4] for line in rows ] } ) )
+
+    def article_cite_ifr(article_rows, factors_and_journals):
+        from combine_cites_impfactor import insert_impact_factors
+        for line in insert_impact_factors( article_rows, factors_and_journals[0] ):
+            yield line
+        print("%d journals have no impact factor, %d are matched fuzzily, see journal_misses.csv" % factors_and_journals[0].write_report())
+    pipeline.add( Stage( 'article_cite_ifr', ['article_citations', 'impact_factors'], article_cite_ifr,
+                         lambda rows: write_rows(rows, '../article_cite_ifr.csv'),
+                         lambda: read_rows('../article_cite_ifr.csv'),
+                         modules=['combine_cites_impfactor', 'journal_index'], uses={ 'impact_factors': lambda factors_and_journals: factors_and_journals[0].values },
+                         outputs=['../article_cite_ifr.csv'] ) )
+
+    scanned = set()
+    def candidate_grants(aci_rows):
+        from extend_known_grants import build_grant_table, add_candidate_publications
+        from near_duplicates import load_duplicate_map
+        """ a seed needs its citations, articles Scholar did not find are left out """
+        grant_table = build_grant_table( ( line for line in aci_rows if len(line) >= 8 ), root )
+        print(len(grant_table), "known grants,", add_candidate_publications(grant_table, root, folders, load_duplicate_map(), scanned),
+              "publications are matched")
+        return list( grant_table.values() )
+    def write_candidate_grants(grants):
+        from extend_known_grants import SCANNED_FILE
+        write_pickle(grants, '../grantsWithCandiPubs.pkl')
+        write_pickle(scanned, SCANNED_FILE) # for 'incremental_update'
+
+    """ the impact factor (column 5) is not used by the grants """
+    pipeline.add( Stage( 'candidate_grants', ['article_cite_ifr'], candidate_grants, write_candidate_grants,
+                         lambda: read_pickle('../grantsWithCandiPubs.pkl'),
+                         modules=['extend_known_grants', 'near_duplicates'], params={ 'root': root, 'folders': list(folders) },
+                         sources=lambda: dict( corpus(), **duplicates() ),
+                         uses={ 'article_cite_ifr': lambda rows: [ line[:5] + line[6:] for line in rows if len(line) >= 8 ] },
+                         outputs=['../grantsWithCandiPubs.pkl', '../grantsWithCandiPubs_scanned.pkl'], iterates=['article_cite_ifr'] ) )
+
+    """ the similarities of all the candidates, saved with grants_final for 'threshold_sweep' """
+    from threshold_sweep import SimilarityTable
+    similarities = SimilarityTable()
+    def grants_final(grants):
+        from tfidf_vectorizer import recall_grant_publications
+        from near_duplicates import load_duplicate_map
+        store = None
+        if dense:
+            from embedding_store import EmbeddingStore
+            store = EmbeddingStore()
+        return recall_grant_publications(grants, simi_threshold, store, load_duplicate_map(), similarities, root)
+    def write_grants_final(grants):
+        write_pickle(grants, '../grants_final.pkl')
+        similarities.save('../similarities.npz')
+    def grants_final_sources():
+        sources = dict( corpus(), **duplicates() )
+        if dense:
+            sources['body_embeddings.npy'] = file_digest('../body_embeddings.npy')
+        return sources
+    pipeline.add( Stage( 'grants_final', ['candidate_grants'], grants_final, write_grants_final,
+                         lambda: read_pickle('../grants_final.pkl'),
+                         modules=['tfidf_vectorizer', 'near_duplicates', 'embedding_store'],
+                         params={ 'root': root, 'simi_threshold': simi_threshold, 'dense': dense },
+                         sources=grants_final_sources, outputs=['../grants_final.pkl', '../similarities.npz'] ) )
+
+    def grants_final_rows(grants):
+        from alter_representation import final_grant_rows, pub_count_distribution
+        rows = list( final_grant_rows(grants) )
+        print(pub_count_distribution( row[0] for row in rows ))
+        return rows
+    pipeline.add( Stage( 'grants_final_rows', ['grants_final'], grants_final_rows,
+                         lambda rows: write_rows(rows, '../grants_final.csv'),
+                         lambda: read_rows('../grants_final.csv'),
+                         modules=['alter_representation'], outputs=['../grants_final.csv'] ) )
+    return pipeline
+
+
+def _names(value):
+    return [ name for name in value.split(',') if name ]
+
+def parse_options(argv=None):
+    """ the options of the command line; a stage name which is not a stage of build_pipeline is an error """
+    parser = argparse.ArgumentParser( description='The whole flow in one process, see the documentation of pipeline.py.' )
+    parser.add_argument( '--root', default=DATA_ROOT, help='the root of the corpus' )
+    parser.add_argument( '--materialize', type=_names, default=[], metavar='all|STAGES', help='stages whose output is written to its file' )
+    parser.add_argument( '--load', type=_names, default=[], metavar='STAGES', help='stages read from their file instead of being run' )
+    parser.add_argument( '--until', metavar='STAGE', help='the last stage to run' )
+    parser.add_argument( '--providers', type=_names, default=['scholar'], help='citation providers in fallback order, e.g. corpus,scholar' )
+    parser.add_argument( '--dense', action='store_true', help='score with the dense body embeddings of embedding_store' )
+    parser.add_argument( '--cache', action='store_true', help='run the stale stages only' )
+    parser.add_argument( '--force', type=_names, default=[], metavar='STAGES', help='stages run even if they are unchanged' )
+    parser.add_argument( '--dry-run', action='store_true', help='list the stages which would run and why' )
+    parser.add_argument( '--profile', type=_names, default=[], metavar='STAGES', help='stages profiled with cProfile' )
+    parser.add_argument( '--trace-memory', type=_names, default=[], metavar='STAGES', help='stages whose allocations are traced' )
+    options = parser.parse_args(argv)
+    if options.materialize == ['all']:
+        options.materialize = 'all'
+    stages = build_pipeline( options.root ).stages
+    named = ( [] if options.materialize == 'all' else options.materialize ) + options.load + options.force + ( [options.until] if options.until else [] )
+    unknown = [ name for name in named if name not in stages ]
+    if unknown:
+        parser.error( 'unknown stage %s, one of %s' % ( ', '.join(unknown), ', '.join(stages) ) )
+    return options
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    root = options.root
+    folders = FOLDERS if root == DATA_ROOT else [ folder for folder in FOLDERS if os.path.isdir( os.path.join(root, folder) ) ]
+    until = options.until
+
+    METRICS.profiled.update(options.profile)
+    METRICS.traced.update(options.trace_memory)
+
+    pipeline = build_pipeline( root, folders, providers=options.providers, dense=options.dense )
+    if options.dry_run:
+        for name, action, reasons in pipeline.dry_run( [until] if until else None, options.force ):
+            print("%-18s %-5s %s" % ( name, action, "; ".join(reasons) ))
+        sys.exit()
+    records = pipeline.run( [until] if until else None, options.materialize, options.load, options.cache, options.force )
+    for name in pipeline.order( [until] if until else None, options.load ):
+        if name not in records:
+            print(name, "streamed to the next stage")
+            continue
+        print(name, len( records[name] ) if name != 'impact_factors' else len( records[name][0] ))
+    print("Run metrics are written to", METRICS.save())
@@ -0,0 +1,166 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+A crash-safe, buffered writer of the rows of article_citations.csv.
+
+Rows are written with csv quoting into a buffer and flushed to the file in batches. After every
+batch (a checkpoint) the file is fsynced, and then one journal line per row and a commit line are
+appended to "<file>.journal" and fsynced:
+
+    end offset of the batch, folder, journal, file, title key, citations, result title
+    ...
+    end offset of the batch, SHA-1 of the file up to that offset
+
+A row is done only once the commit line of its batch is on disk. On resume, the journal alone gives
+the done articles and the answered title keys, as long as the file up to the last committed offset
+still has the digest of that commit: the file is then truncated to the offset and the journal to its
+last commit line, so a batch half written by a crash is dropped instead of leaving broken or
+duplicated rows. A file without journal (written before the journal existed), or whose committed
+part changed (rewritten by another script, shorter or longer), is indexed again.
+'''
+import csv, hashlib, io, os
+from title_matching import title_key
+
+
+def row_key(line):
+    """ folder, journal, file of an article """
+    return tuple( line[:3] )
+
+
+class JournaledResultWriter:
+    def __init__(self, path='../article_citations.csv', batch_size=50):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.batch_size = batch_size
+        self.done = set()
+        self.answers = {}
+        self.buffer = io.StringIO()
+        self.csv_writer = csv.writer(self.buffer, lineterminator='\n')
+        self.pending = []
+        self.recovered_bytes = 0
+
+        if not os.path.exists(self.journal_path):
+            self._index_existing()
+        offset, digest = self._read_journal()
+        self.digest = self._prefix_digest(offset)
+        if self.digest is None or self.digest.hexdigest() != digest:
+            """ the file is not the one the journal was written for """
+            self.done, self.answers = set(), {}
+            self._index_existing()
+            offset, digest = self._read_journal()
+            self.digest = self._prefix_digest(offset)
+        if os.path.getsize(self.path) > offset:
+            """ a batch was being written when the run stopped """
+            self.recovered_bytes = os.path.getsize(self.path) - offset
+            with open(self.path, 'r+b') as outfile:
+                outfile.truncate(offset)
+        self.outfile = open(self.path, 'ab')
+        self.journal = open(self.journal_path, 'a', encoding="utf8", newline='')
+        self.journal_writer = csv.writer(self.journal, lineterminator='\n')
+
+    def _prefix_digest(self, offset):
+        """ the SHA-1 of the first offset bytes of the file, None if the file is shorter """
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        if os.path.getsize(self.path) < offset:
+            return None
+        digest = hashlib.sha1()
+        with open(self.path, 'rb') as infile:
+            remaining = offset
+            while remaining:
+                block = infile.read( min(remaining, 1 << 20) )
+                digest.update(block)
+                remaining -= len(block)
+        return digest
+
+    def _index_existing(self):
+        """ writes the journal of a file from before the journal, all its rows count as checkpointed """
+        rows = []
+        offset = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding="utf8", newline='') as infile:
+                rows = [ line for line in csv.reader(infile) if len(line) >= 6 ]
+            offset = os.path.getsize(self.path)
+        digest = self._prefix_digest(offset).hexdigest()
+        with open(self.journal_path, 'w', encoding="utf8", newline='') as journal:
+            journal_writer = csv.writer(journal, lineterminator='\n')
+            for line in rows:
+                citations, result_title = ( line[6], line[7] ) if len(line) >= 8 else ( '', '' )
+                journal_writer.writerow( [offset] + list( row_key(line) ) + [ title_key( line[3] ), citations, result_title ] )
+            journal_writer.writerow( [ offset, digest ] ) # even without rows, so the offset is the whole file
+            journal.flush()
+            os.fsync( journal.fileno() )
+
+    def _read_journal(self):
+        """ returns (offset, digest) of the last commit and drops the journal lines after it """
+        offset, digest = 0, None
+        committed = 0
+        batch = []
+        with open(self.journal_path, 'rb') as journal:
+            data = journal.read()
+        position = 0
+        for raw_line in data.splitlines(True):
+            position += len(raw_line)
+            line = next( csv.reader( [ raw_line.decode('utf8') ] ), [] )
+            if len(line) == 7:
+                batch.append(line)
+            elif len(line) == 2 and raw_line.endswith(b'\n'):
+                offset, digest = int(line[0]), line[1]
+                committed = position
+                for row in batch:
+                    self.done.add( tuple( row[1:4] ) )
+                    self.answers[ row[4] ] = ( row[5], row[6] )
+                batch = []
+        if committed < len(data):
+            with open(self.journal_path, 'r+b') as journal:
+                journal.truncate(committed)
+        return offset, digest
+
+    def is_done(self, line):
+        return row_key(line) in self.done
+
+    def answer(self, line):
+        """ (citations, result title) of an earlier article with the same title key, or None """
+        return self.answers.get( title_key( line[3] ) )
+
+    def write(self, line, citations, result_title):
+        if result_title:
+            self.csv_writer.writerow( list(line) + [ citations, result_title ] )
+        else:
+            self.csv_writer.writerow( line )
+        self.pending.append( ( row_key(line), title_key( line[3] ), citations, result_title ) )
+        if len(self.pending) >= self.batch_size:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if not self.pending:
+            return
+        data = self.buffer.getvalue().encode('utf8')
+        self.outfile.write(data)
+        self.outfile.flush()
+        os.fsync( self.outfile.fileno() )
+        offset = self.outfile.tell()
+        self.digest.update(data)
+        for key, title, citations, result_title in self.pending:
+            self.journal_writer.writerow( [offset] + list(key) + [ title, citations, result_title ] )
+            self.done.add(key)
+            self.answers[title] = ( citations, result_title )
+        self.journal_writer.writerow( [ offset, self.digest.hexdigest() ] )
+        self.journal.flush()
+        os.fsync( self.journal.fileno() )
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.pending = []
+
+    def close(self):
+        self.checkpoint()
+        self.outfile.close()
+        self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -3,40 +3,104 @@ Created on Jul 14, 2014
 
 @author: munichong
 '''
-import csv
+import argparse, csv
 import scholar
+from title_matching import title_key
+from result_writer import JournaledResultWriter
+from citation_providers import build_chain
+from scholar_metrics import METRICS
+from run_metrics import METRICS as RUN_METRICS
 
-def get_finished_articles():
-    outfile = open('../article_citations.csv', 'r')
-    finished_articles = set()
-    for line in csv.reader( outfile ):
-        article_title = line[3]
-        finished_articles.add( article_title )
-    outfile.close()
-    return finished_articles
-
-def output(string):
-    outfile = open('../article_citations.csv', 'a')
-    outfile.write( string + '\n' )
-    outfile.close()
-
-
-
-with open('../qualified_articles.csv', 'r') as articles:
-    finished_articles = get_finished_articles()
-#     n=0
-    for line in csv.reader( articles ):
-        article_title = line[3]
-#         n+=1
-#         print n
-        if article_title in finished_articles:
+""" Responses are cached so that an interrupted run does not repeat its queries.
+    "python retrieve_citations_from_Scholar.py --offline" reads only the cache,
+    "python retrieve_citations_from_Scholar.py --concurrent [workers]" queries with scholar_concurrent. """
+scholar.ScholarConf.CACHE_FILE = '../scholar_cache.sqlite'
+
+""" The citation providers in fallback order (see citation_providers), e.g. [ 'dump', 'corpus', 'scholar' ];
+    "--providers dump,scholar" overrides them and "--dump <file>" gives the bulk citation dump. """
+CITATION_PROVIDERS = [ 'scholar' ]
+CITATION_DUMP = '../citation_dump.csv'
+
+def output_rows(writer, lines, citations, result_title):
+    for line in lines:
+        writer.write( line, citations, result_title )
+
+def plan_queries(lines, writer):
+    """
+    Groups the unfinished articles by title key so every distinct title is queried once.
+    Returns
+        queries: (title to query, articles with its key) in the order of the articles
+        answered: (articles, (citations, result title)) whose key was queried in an earlier run
+        stats: counts of the plan
+    """
+    groups = {}
+    queries = []
+    answered = {}
+    stats = { 'articles': 0, 'finished': 0, 'answered_before': 0, 'queries': 0, 'saved_queries': 0 }
+    for line in lines:
+        stats['articles'] += 1
+        if writer.is_done(line):
+            stats['finished'] += 1
             continue
-        
-        """ retrieve citations from Google Scholar """
-        citations, result_title = scholar.main( article_title )
-        if not result_title:
-            output_line = ','.join( line )
+        key = title_key( line[3] ) or line[3]
+        if writer.answer(line) is not None:
+            answered.setdefault( key, [] ).append(line)
+            stats['answered_before'] += 1
+        elif key in groups:
+            groups[key].append(line)
         else:
-            output_line = ','.join( line ) + ',' + citations + ',' + result_title            
-        output( output_line )
-        
\ No newline at end of file
+            groups[key] = [line]
+            queries.append( ( line[3], groups[key] ) )
+    stats['queries'] = len(queries)
+    stats['saved_queries'] = stats['articles'] - stats['finished'] - stats['queries']
+    answered = [ ( rows, writer.answer( rows[0] ) ) for rows in answered.values() ]
+    return queries, answered, stats
+
+def retrieve(writer, queries, chain):
+    """
+    writes the answer of each query to all its articles; the articles of a failed lookup are not written,
+    so they are not journaled as done and a resumed run looks them up again. Returns the number of failed queries.
+    """
+    items = [ ( title, rows[0] ) for title, rows in queries ]
+    failed = 0
+    for position, answer, provider in chain.lookup_many(items):
+        if answer is None:
+            failed += 1
+            continue
+        citations, result_title = answer
+        output_rows( writer, queries[position][1], citations, result_title )
+    return failed
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser( description='Citations of the articles of qualified_articles.csv.' )
+    parser.add_argument( '--offline', action='store_true', help='answer from the Scholar cache only' )
+    parser.add_argument( '--concurrent', metavar='WORKERS', type=int, nargs='?', const=4, default=None,
+                         help='query Scholar with scholar_concurrent (4 workers if not given)' )
+    parser.add_argument( '--providers', type=lambda value: value.split(','), default=CITATION_PROVIDERS,
+                         help='citation providers in fallback order, e.g. dump,corpus,scholar' )
+    parser.add_argument( '--dump', default=CITATION_DUMP, help='the bulk citation dump of the dump provider' )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    scholar.ScholarConf.OFFLINE = options.offline
+    chain = build_chain( options.providers, workers=options.concurrent, dump=options.dump )
+
+    """ see result_writer: rows are checkpointed every 50 articles and a resumed run starts from the last checkpoint """
+    with JournaledResultWriter('../article_citations.csv') as writer:
+        if writer.recovered_bytes:
+            print(writer.recovered_bytes, "bytes of an unfinished batch are dropped")
+        with open('../qualified_articles.csv', 'r') as articles:
+            queries, answered, stats = plan_queries( csv.reader( articles ), writer )
+        print(stats)
+
+        for rows, (citations, result_title) in answered:
+            output_rows( writer, rows, citations, result_title )
+        failed = retrieve( writer, queries, chain )
+    print( stats['saved_queries'], "queries are saved by coalescing" )
+    if failed:
+        print( failed, "lookups failed, their articles are left for the next run" )
+    print( "answered by provider:", chain.stats )
+    METRICS.save('../scholar_metrics') # see scholar_metrics, the .json and .prom files
+    print("Run metrics are written to", RUN_METRICS.save())
@@ -0,0 +1,213 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Where the time of a run goes. The scripts time their work into METRICS by stage:
+
+    read        reading an NXML file
+    decode      bytes to str
+    extract     the regular expressions pulling parts out of a document (ack, abstract, authors, body, titles)
+    clean       remove_tags and the unescaping of the extracted text
+    match       looking authors up in the grants, titles up in the Scholar results
+    vectorize   fitting the TF-IDF vectorizer of a grant and transforming its bodies
+    score       the similarities of the candidates to the centroid of the seeds
+    query       a Scholar query
+and count what they process (files, grants, titles, ...). A stage inside another one is counted in
+both: "extract" includes the "clean" of the titles and bodies it extracts. The stages timed in
+threads (the queries of scholar_concurrent) add up the time of every thread, so they can have a
+share above 1.
+
+A stage can also be profiled with cProfile, or have the peak of its allocations traced with
+tracemalloc (the traced stages should not nest, each one resets the peak). Both are off unless asked
+for, since they slow the stage down:
+
+    MEDLITER_PROFILE=vectorize,score       cProfile these stages
+    MEDLITER_TRACEMALLOC=read,vectorize    trace the memory of these stages
+    MEDLITER_METRICS=<path>                where the report is written, "off" not to time anything
+
+At the end of a run the script writes the report, ../run_metrics_<script>.json by default:
+
+    {"run": "tfidf_vectorizer", "wall_seconds": ..., "peak_rss_mb": ...,
+     "stages": {"vectorize": {"seconds": 812.4, "calls": 5310, "mean_ms": 153.0, "share": 0.71}, ...},
+     "counters": {"grants": 1204, ...},
+     "profiles": {"vectorize": [ {"function": ..., "calls": ..., "tottime": ..., "cumtime": ...}, ... ]},
+     "memory": {"read": {"peak_mb": 3.1, "calls": 5310}}}
+with the full profile of each profiled stage in <path>.<stage>.prof, for pstats or snakeviz. Work done
+in other processes (the workers of qualify_documents, near_duplicates) is not included.
+'''
+import cProfile, io, json, os, pstats, sys, threading, time, tracemalloc
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+PROFILE_TOP = 25 # functions of a profile in the report
+
+
+def peak_rss_mb():
+    """ the peak resident set size of this process in MB, None where it is not available """
+    if resource is None:
+        return None
+    peak = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    return round( peak / ( 1024.0 * 1024 if sys.platform == 'darwin' else 1024.0 ), 1 ) # bytes on macOS, KB elsewhere
+
+def _names(value):
+    return set( name for name in ( value or '' ).split(',') if name )
+
+
+class _Stage:
+    """ the context of one timed call of a stage """
+    __slots__ = ( 'metrics', 'name', 'start', 'profile', 'traced' )
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.profile = None
+        self.traced = None
+
+    def __enter__(self):
+        metrics = self.metrics
+        if self.name in metrics.profiled:
+            self.profile = metrics.enable_profile(self.name)
+        if self.name in metrics.traced:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.traced = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, 'reset_peak'): # Python 3.9
+                tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1] - self.traced if self.traced is not None else None
+        if self.profile is not None:
+            self.metrics.disable_profile(self.profile)
+        self.metrics.add(self.name, seconds, peak)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NO_STAGE = _NoStage()
+
+
+class RunMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        self.configure_from_environment()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.stages = {}   # key: stage   value: [seconds, calls]
+            self.counters = {}
+            self.profiles = {} # key: stage   value: cProfile.Profile
+            self.memory = {}   # key: stage   value: [peak bytes, calls]
+            self.profiling = threading.local()
+
+    def configure(self, profile=(), trace=(), path=None, enabled=True):
+        """ profile, trace: the names of the stages to profile and to trace the memory of """
+        self.profiled = set(profile)
+        self.traced = set(trace)
+        self.path = path
+        self.enabled = enabled
+
+    def configure_from_environment(self):
+        path = os.environ.get('MEDLITER_METRICS')
+        self.configure( _names( os.environ.get('MEDLITER_PROFILE') ), _names( os.environ.get('MEDLITER_TRACEMALLOC') ),
+                        None if path == 'off' else path, path != 'off' )
+
+    def stage(self, name):
+        """ with METRICS.stage('extract'): ... times the block as a call of the stage """
+        return _Stage(self, name) if self.enabled else NO_STAGE
+
+    def timed(self, name):
+        """ decorator timing every call of the function as a call of the stage """
+        def decorator(function):
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__ = function.__name__, function.__doc__
+            return wrapper
+        return decorator
+
+    def add(self, name, seconds, peak=None):
+        with self.lock:
+            stage = self.stages.setdefault( name, [0.0, 0] )
+            stage[0] += seconds
+            stage[1] += 1
+            if peak is not None:
+                memory = self.memory.setdefault( name, [0, 0] )
+                memory[0] = max( memory[0], peak )
+                memory[1] += 1
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def enable_profile(self, name):
+        """ the profile of the stage, enabled, unless a profiled stage is already running in this thread """
+        if getattr(self.profiling, 'active', False):
+            return None
+        with self.lock:
+            profile = self.profiles.setdefault( name, cProfile.Profile() )
+        try:
+            profile.enable()
+        except ValueError: # another profiler is active, e.g. the script runs under cProfile
+            return None
+        self.profiling.active = True
+        return profile
+
+    def disable_profile(self, profile):
+        profile.disable()
+        self.profiling.active = False
+
+    def top_functions(self, name, n=PROFILE_TOP):
+        stats = pstats.Stats( self.profiles[name], stream=io.StringIO() )
+        rows = []
+        for (filename, line, function), (calls, _, tottime, cumtime, _) in stats.stats.items():
+            rows.append( { 'function': '%s:%d(%s)' % ( os.path.basename(filename), line, function ), 'calls': calls,
+                           'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4) } )
+        return sorted( rows, key=lambda row: -row['cumtime'] )[:n]
+
+    def to_dict(self, run=None):
+        wall_seconds = time.time() - self.started
+        with self.lock:
+            stages = dict( ( name, { 'seconds': round(seconds, 3), 'calls': calls, 'mean_ms': round( 1000 * seconds / calls, 3 ),
+                                     'share': round( seconds / wall_seconds, 3 ) if wall_seconds else None } )
+                           for name, (seconds, calls) in self.stages.items() )
+            counters = dict(self.counters)
+            memory = dict( ( name, { 'peak_mb': round( peak / 1e6, 3 ), 'calls': calls } ) for name, (peak, calls) in self.memory.items() )
+            profiled = list(self.profiles)
+        return { 'run': run or os.path.splitext( os.path.basename( sys.argv[0] ) )[0],
+                 'started': time.strftime( '%Y-%m-%d %H:%M:%S', time.localtime(self.started) ),
+                 'wall_seconds': round(wall_seconds, 3), 'peak_rss_mb': peak_rss_mb(),
+                 'stages': stages, 'counters': counters,
+                 'profiles': dict( ( name, self.top_functions(name) ) for name in profiled ),
+                 'memory': memory }
+
+    def save(self, run=None, path=None):
+        """ writes the report of the run, and the profile of each profiled stage next to it; returns its path, None when disabled """
+        if not self.enabled:
+            return None
+        report = self.to_dict(run)
+        path = path or self.path or '../run_metrics_%s.json' % report['run']
+        with open(path, 'w') as outfile:
+            json.dump(report, outfile, indent=2, sort_keys=True)
+        for name, profile in list( self.profiles.items() ):
+            profile.dump_stats( '%s.%s.prof' % ( os.path.splitext(path)[0], name ) )
+        return path
+
+
+METRICS = RunMetrics()
@@ -16,6 +16,7 @@ import os
 import sys
 import re
 import string
+import time
 
 try:
     # Try importing for Python 3
@@ -40,6 +41,11 @@ except ImportError:
         print('We need BeautifulSoup, sorry...')
         sys.exit(1)
 
+from scholar_cache import shared_cache
+from title_matching import clean_title, best_match
+from scholar_metrics import METRICS, classify_error, is_blocked_page
+from run_metrics import METRICS as RUN_METRICS
+
 # Support unicode in both Python 2 and 3. In Python 3, unicode is str.
 if sys.version_info[0] == 3:
     unicode = str # pylint: disable-msg=W0622
@@ -60,6 +66,10 @@ class QueryArgumentError(Error):
     """A query did not have a suitable set of arguments."""
 
 
+class BlockedError(Error):
+    """Scholar answered with a CAPTCHA page instead of results."""
+
+
 class ScholarConf(object):
     """Helper class for global settings."""
 
@@ -76,6 +86,21 @@ class ScholarConf(object):
     # cookie use across sessions.
     COOKIE_JAR_FILE = None
 
+    # If set, HTTP responses are cached in this file (see scholar_cache)
+    # and reused across sessions. CACHE_TTL is in seconds, None for ever;
+    # CACHE_MAX_BYTES bounds the compressed size, None for no limit.
+    CACHE_FILE = None
+    CACHE_TTL = None
+    CACHE_MAX_BYTES = None
+
+    # If True, responses are served only from the cache and missing
+    # ones are treated as failed requests. No network access happens.
+    OFFLINE = False
+
+    # Parser of the result pages: 'bs4' (ScholarArticleParser120726),
+    # or the faster 'stream' and 'lxml' backends of scholar_fastparse.
+    PARSER_BACKEND = 'bs4'
+
 class ScholarUtils(object):
     """A wrapper for various utensils that come in handy."""
 
@@ -221,7 +246,7 @@ class ScholarArticleParser(object):
         self.article = ScholarArticle()
 
         for tag in div:
-            if not hasattr(tag, 'name'):
+            if getattr(tag, 'name', None) is None:
                 continue
 
             if tag.name == 'div' and self._tag_has_class(tag, 'gs_rt') and \
@@ -233,7 +258,7 @@ class ScholarArticleParser(object):
 
             if tag.name == 'font':
                 for tag2 in tag:
-                    if not hasattr(tag2, 'name'):
+                    if getattr(tag2, 'name', None) is None:
                         continue
                     if tag2.name == 'span' and \
                        self._tag_has_class(tag2, 'gs_fl'):
@@ -241,13 +266,13 @@ class ScholarArticleParser(object):
 
     def _parse_links(self, span):
         for tag in span:
-            if not hasattr(tag, 'name'):
+            if getattr(tag, 'name', None) is None:
                 continue
             if tag.name != 'a' or tag.get('href') is None:
                 continue
 
             if tag.get('href').startswith('/scholar?cites'):
-                if hasattr(tag, 'string') and tag.string.startswith('Cited by'):
+                if tag.string is not None and tag.string.startswith('Cited by'):
                     self.article['num_citations'] = \
                         self._as_int(tag.string.split()[-1])
 
@@ -268,7 +293,7 @@ class ScholarArticleParser(object):
                         self.article['cluster_id'] = arg[6:]
 
             if tag.get('href').startswith('/scholar?cluster'):
-                if hasattr(tag, 'string') and tag.string.startswith('All '):
+                if tag.string is not None and tag.string.startswith('All '):
                     self.article['num_versions'] = \
                         self._as_int(tag.string.split()[1])
                 self.article['url_versions'] = \
@@ -286,7 +311,7 @@ class ScholarArticleParser(object):
         has a class attribute.
         """
         res = tag.get('class') or []
-        if type(res) != list:
+        if not isinstance(res, list):
             # BeautifulSoup 3 can return e.g. 'gs_md_wp gs_ttss',
             # so split -- conveniently produces a list in any case
             res = res.split()
@@ -333,7 +358,7 @@ class ScholarArticleParser120201(ScholarArticleParser):
         self.article = ScholarArticle()
 
         for tag in div:
-            if not hasattr(tag, 'name'):
+            if getattr(tag, 'name', None) is None:
                 continue
 
             if tag.name == 'h3' and self._tag_has_class(tag, 'gs_rt') and tag.a:
@@ -359,7 +384,7 @@ class ScholarArticleParser120726(ScholarArticleParser):
         self.article = ScholarArticle()
 
         for tag in div:
-            if not hasattr(tag, 'name'):
+            if getattr(tag, 'name', None) is None:
                 continue
             if str(tag).lower().find('.pdf'):
                 if tag.find('div', {'class': 'gs_ttss'}):
@@ -621,9 +646,24 @@ class ScholarQuerier(object):
         def handle_article(self, art):
             self.querier.add_article(art)
 
-    def __init__(self):
+    def __init__(self, session=None, raise_errors=False):
         self.articles = []
         self.query = None
+        self.settings = None # Last settings object, if any
+
+        # With raise_errors a failed request raises its exception
+        # instead of leaving the query without articles, so a caller
+        # can tell a failure from a query without results.
+        self.raise_errors = raise_errors
+
+        # Queriers created with the same ScholarSession share its
+        # cookies, opener and cache.
+        if session is not None:
+            self.cjar = session.cjar
+            self.opener = session.opener
+            self.cache = session.cache
+            return
+
         self.cjar = MozillaCookieJar()
 
         # If we have a cookie file, load it:
@@ -638,7 +678,12 @@ class ScholarQuerier(object):
                 self.cjar = MozillaCookieJar() # Just to be safe
 
         self.opener = build_opener(HTTPCookieProcessor(self.cjar))
-        self.settings = None # Last settings object, if any
+
+        self.cache = None
+        if ScholarConf.CACHE_FILE:
+            self.cache = shared_cache(ScholarConf.CACHE_FILE,
+                                      ttl=ScholarConf.CACHE_TTL,
+                                      max_bytes=ScholarConf.CACHE_MAX_BYTES)
 
     def apply_settings(self, settings):
         """
@@ -699,6 +744,7 @@ class ScholarQuerier(object):
         """
         self.clear_articles()
         self.query = query
+        METRICS.query()
 
         html = self._get_http_response(url=query.get_url(),
                                        log_msg='dump of query response HTML',
@@ -707,6 +753,8 @@ class ScholarQuerier(object):
             return
 
         self.parse(html)
+        if not self.articles:
+            METRICS.error('empty_result')
 
     def get_citation_data(self, article):
         """
@@ -733,8 +781,20 @@ class ScholarQuerier(object):
         """
         This method allows parsing of provided HTML content.
         """
-        parser = self.Parser(self)
-        parser.parse(html)
+        if ScholarConf.PARSER_BACKEND == 'bs4':
+            parser = self.Parser(self)
+        else:
+            from scholar_fastparse import parser_class
+            parser = parser_class(ScholarConf.PARSER_BACKEND)()
+            parser.handle_article = self.add_article
+        num_of_articles = len(self.articles)
+        start = time.time()
+        try:
+            parser.parse(html)
+        except Exception:
+            METRICS.error('parse_error')
+            raise
+        METRICS.parsed(time.time() - start, len(self.articles) - num_of_articles)
 
     def add_article(self, art):
         self.get_citation_data(art)
@@ -768,26 +828,79 @@ class ScholarQuerier(object):
             log_msg = 'HTTP response data follow'
         if err_msg is None:
             err_msg = 'request failed'
-        try:
-            ScholarUtils.log('info', 'requesting %s' % url)
-
-            req = Request(url=url, headers={'User-Agent': ScholarConf.USER_AGENT})
-            hdl = self.opener.open(req)
-            html = hdl.read()
 
-            ScholarUtils.log('debug', log_msg)
-            ScholarUtils.log('debug', '>>>>' + '-'*68)
-            ScholarUtils.log('debug', 'url: %s' % hdl.geturl())
-            ScholarUtils.log('debug', 'result: %s' % hdl.getcode())
-            ScholarUtils.log('debug', 'headers:\n' + str(hdl.info()))
-            ScholarUtils.log('debug', 'data:\n' + html)
-            ScholarUtils.log('debug', '<<<<' + '-'*68)
+        if self.cache is not None:
+            html = self.cache.get(url)
+            if html is not None:
+                ScholarUtils.log('info', 'cached %s' % url)
+                METRICS.count('cache_hits')
+                return html
+        if ScholarConf.OFFLINE:
+            ScholarUtils.log('info', err_msg + ': offline and not cached: %s' % url)
+            METRICS.error('offline_miss')
+            if self.raise_errors:
+                raise Error('offline and not cached: %s' % url)
+            return None
 
-            return html
+        try:
+            return self._fetch(url, log_msg)
         except Exception as err:
             ScholarUtils.log('info', err_msg + ': %s' % err)
+            if self.raise_errors:
+                raise
             return None
 
+    def _fetch(self, url, log_msg=None, timeout=None):
+        """
+        Helper method, sends HTTP request and returns response payload.
+        Unlike _get_http_response, failures raise their exception,
+        and a CAPTCHA page raises BlockedError.
+        """
+        ScholarUtils.log('info', 'requesting %s' % url)
+
+        req = Request(url=url, headers={'User-Agent': ScholarConf.USER_AGENT})
+        start = time.time()
+        try:
+            if timeout is None:
+                hdl = self.opener.open(req)
+            else:
+                hdl = self.opener.open(req, timeout=timeout)
+            html = hdl.read()
+        except Exception as err:
+            METRICS.request(time.time() - start, getattr(err, 'code', None), classify_error(err))
+            raise
+        # A CAPTCHA page comes back with status 200 but must not be
+        # taken (or cached) as an answer.
+        blocked = is_blocked_page(html)
+        METRICS.request(time.time() - start, hdl.getcode(), 'blocked' if blocked else None)
+
+        ScholarUtils.log('debug', log_msg or 'HTTP response data follow')
+        ScholarUtils.log('debug', '>>>>' + '-'*68)
+        ScholarUtils.log('debug', 'url: %s' % hdl.geturl())
+        ScholarUtils.log('debug', 'result: %s' % hdl.getcode())
+        ScholarUtils.log('debug', 'headers:\n' + str(hdl.info()))
+        ScholarUtils.log('debug', 'data:\n' + html.decode('utf-8', 'replace'))
+        ScholarUtils.log('debug', '<<<<' + '-'*68)
+
+        if blocked:
+            raise BlockedError('blocked by Scholar (CAPTCHA page): %s' % url)
+        if self.cache is not None and hdl.getcode() == 200:
+            self.cache.put(url, html)
+        return html
+
+
+class ScholarSession(object):
+    """
+    The cookie jar, URL opener and response cache shared by the
+    ScholarQuerier instances of one session, e.g. the worker threads
+    of scholar_concurrent.
+    """
+    def __init__(self):
+        querier = ScholarQuerier()
+        self.cjar = querier.cjar
+        self.opener = querier.opener
+        self.cache = querier.cache
+
 
 def txt(querier):
     articles = querier.articles
@@ -826,9 +939,8 @@ def compute_similarity(str1, str2):
 def extract_result(query_title, querier, topk):
     articles = querier.articles[ : topk]
     
-    max_citations = ''
-    max_title = ''
-    max_similarity = 0
+    titles = []
+    citations = []
     for art in articles:
         
         items = sorted( list(art.attrs.values()), key=lambda item: item[2] )
@@ -839,20 +951,16 @@ def extract_result(query_title, querier, topk):
  google.com/scholar?cluster=6540177324500022107&hl=en&as_sdt=0,5', 'Versions list', 8], [None, 
  'Citation link', 9] ] """
         title = ''
-        if items[0] is not None:
+        if items[0][0] is not None:
             title = items[0][0].replace(",", " ")
-        citations = ''
-        if items[3] is not None:
-            citations = items[3][0]
+        titles.append(title)
+        citations.append( items[3][0] )
         
-        """ Pick the most similar result """
-        simi = compute_similarity( title, query_title )
-        if simi > max_similarity:
-            max_citations = str( citations )
-            max_title = title
-            max_similarity = simi
-                    
-    return max_citations, max_title 
+    """ Pick the most similar result (see title_matching) """
+    best, similarity = best_match(query_title, titles)
+    if best is None:
+        return '', ''
+    return str( citations[best] ), titles[best]
 """ </cw87> """
 
 
@@ -869,7 +977,18 @@ def citation_export(querier):
         print(art.as_citation() + '\n')
 
 
-def main(title):
+def title_query(title):
+    """
+    Cleans an article title and returns it with the query searching
+    for it.
+    """
+    title = clean_title(title)
+    query = SearchScholarQuery()
+    query.set_words(title)
+    return title, query
+
+
+def main(title, raise_errors=False):
     usage = """scholar.py [options] <query string>
 A command-line interface to Google Scholar.
 
@@ -962,7 +1081,7 @@ scholar.py -c 5 -a "albert einstein" -t --none "quantum theory" --after 1970"""
 #             print 'Cluster ID queries do not allow additional search arguments.'
 #             return 1
 
-    querier = ScholarQuerier()
+    querier = ScholarQuerier(raise_errors=raise_errors)
 #     settings = ScholarSettings()
 # 
 #     if options.citation == 'bt':
@@ -978,14 +1097,14 @@ scholar.py -c 5 -a "albert einstein" -t --none "quantum theory" --after 1970"""
 #         return 1
 # 
 #     querier.apply_settings(settings)
-    title = title.replace("-", " ")
-    title = filter(lambda x: x in string.printable, title)
-    query = SearchScholarQuery()
-    query.set_words(title)
-    querier.send_query(query)
+    title, query = title_query(title)
+    with RUN_METRICS.stage('query'):
+        querier.send_query(query)
 #     txt(querier)
-    print title
-    citations, result_title = extract_result(title, querier, 5)
+    print(title)
+    with RUN_METRICS.stage('match'):
+        citations, result_title = extract_result(title, querier, 5)
+    RUN_METRICS.count('titles')
     """ results: [(u'Fast and effective text mining using linear-time document clustering', 752),
     (u'Text mining: The state of the art and the challenges', 387)]
     """
@@ -0,0 +1,165 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+An on-disk cache of the HTTP responses of ScholarQuerier, so an interrupted citation retrieval
+does not repeat its queries when it is restarted.
+
+The responses are stored zlib-compressed in a SQLite file, keyed by the normalized URL (scheme and
+host lower-cased, query arguments sorted). Entries older than the TTL are ignored and the least
+recently used ones are evicted when the file grows over its size limit. The total size is kept by
+triggers in a one-row table, in the transaction of the write, so a write does not sum the table.
+
+It is switched on with ScholarConf.CACHE_FILE; with ScholarConf.OFFLINE the querier serves only
+from the cache and never goes to the network. All the queriers of a process share one cache, and
+so one connection, per file (shared_cache).
+
+A CAPTCHA page comes back with status 200 but is not an answer: it is never stored, and one stored
+by an older version is dropped when it is read. It is told by its structure (the captcha elements,
+the form posting to /sorry/), not by its wording, which a genuine result may quote.
+'''
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+except ImportError:
+    from urlparse import urlsplit, urlunsplit, parse_qsl
+    from urllib import urlencode
+
+
+""" markers of the page Scholar serves instead of results when it suspects a robot """
+BLOCKED_MARKERS = (b'gs_captcha', b'id="captcha', b'action="/sorry/')
+
+
+def is_blocked_page(html):
+    head = html[:20000].lower() if isinstance(html, bytes) else html[:20000].lower().encode('utf-8', 'replace')
+    return any( marker in head for marker in BLOCKED_MARKERS )
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    query = sorted( (key.lstrip('?'), value) for key, value in parse_qsl(parts.query, keep_blank_values=True) )
+    return urlunsplit( (parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(query), '') )
+
+
+class ScholarResponseCache(object):
+    """
+    ttl: seconds an entry stays valid, None for ever
+    max_bytes: limit of the compressed size of all entries, None for no limit
+    """
+    def __init__(self, path, ttl=None, max_bytes=None, compress_level=6):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS responses ('
+                           ' key TEXT PRIMARY KEY, url TEXT, stored REAL, accessed REAL, size INTEGER, body BLOB)' )
+        self.conn.execute( 'CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)' )
+        self.conn.execute( 'CREATE INDEX IF NOT EXISTS responses_stored ON responses (stored)' )
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS usage (bytes INTEGER NOT NULL)' )
+        if self.conn.execute( 'SELECT COUNT(*) FROM usage' ).fetchone()[0] == 0: # a new file, or one from before the table
+            self.conn.execute( 'INSERT INTO usage SELECT COALESCE(SUM(size), 0) FROM responses' )
+        self.conn.execute( 'CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses'
+                           ' BEGIN UPDATE usage SET bytes = bytes + NEW.size; END' )
+        self.conn.execute( 'CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses'
+                           ' BEGIN UPDATE usage SET bytes = bytes - OLD.size; END' )
+        self.conn.execute( 'CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses'
+                           ' BEGIN UPDATE usage SET bytes = bytes + NEW.size - OLD.size; END' )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1( normalize_url(url).encode('utf-8') ).hexdigest()
+
+    def get(self, url):
+        """ the cached response body (bytes), or None if missing or expired """
+        key = self.key(url)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute( 'SELECT stored, body FROM responses WHERE key = ?', (key,) ).fetchone()
+            if row is None or ( self.ttl is not None and now - row[0] > self.ttl ):
+                self.misses += 1
+                return None
+            data = zlib.decompress(row[1])
+            if is_blocked_page(data):
+                self.conn.execute( 'DELETE FROM responses WHERE key = ?', (key,) )
+                self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute( 'UPDATE responses SET accessed = ? WHERE key = ?', (now, key) )
+            self.conn.commit()
+            self.hits += 1
+        return data
+
+    def put(self, url, data):
+        """ stores the response; returns False, storing nothing, for a blocked page """
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        if is_blocked_page(data):
+            return False
+        body = zlib.compress(data, self.compress_level)
+        now = time.time()
+        with self.lock:
+            """ an upsert, not INSERT OR REPLACE: the delete of a REPLACE does not fire the triggers """
+            self.conn.execute( 'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+                               ' url = excluded.url, stored = excluded.stored, accessed = excluded.accessed,'
+                               ' size = excluded.size, body = excluded.body',
+                               (self.key(url), normalize_url(url), now, now, len(body), sqlite3.Binary(body)) )
+            self._evict()
+            self.conn.commit()
+        return True
+
+    def _evict(self):
+        if self.ttl is not None:
+            self.conn.execute( 'DELETE FROM responses WHERE stored < ?', (time.time() - self.ttl,) )
+        if self.max_bytes is None:
+            return
+        while self.total_bytes() > self.max_bytes:
+            oldest = self.conn.execute( 'SELECT key FROM responses ORDER BY accessed LIMIT 64' ).fetchall()
+            if not oldest:
+                break
+            for ( key, ) in oldest:
+                self.conn.execute( 'DELETE FROM responses WHERE key = ?', (key,) )
+                if self.total_bytes() <= self.max_bytes:
+                    break
+
+    def total_bytes(self):
+        """ the compressed size of all entries """
+        return self.conn.execute( 'SELECT bytes FROM usage' ).fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute( 'SELECT COUNT(*) FROM responses' ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+def shared_cache(path, ttl=None, max_bytes=None):
+    """ the cache of the file for this process, opened once; closed at exit """
+    key = (path, ttl, max_bytes)
+    with _shared_lock:
+        if key not in _shared_caches:
+            _shared_caches[key] = ScholarResponseCache(path, ttl=ttl, max_bytes=max_bytes)
+        return _shared_caches[key]
+
+def close_shared_caches():
+    with _shared_lock:
+        for cache in _shared_caches.values():
+            cache.close()
+        _shared_caches.clear()
+
+atexit.register(close_shared_caches)
@@ -0,0 +1,259 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Query Google Scholar for many titles concurrently, without getting blocked.
+
+A pool of worker threads shares one ScholarSession (cookies, opener and response cache). Every
+request goes through
+    - a token bucket which limits the request rate of the whole pool,
+    - retries with exponential backoff and jitter for throttling (429 or a CAPTCHA page), server errors
+      and network errors,
+    - a circuit breaker which stops all requests for a while after consecutive failures,
+so a blocked session backs off instead of burning through the titles.
+
+A title whose query failed (retries exhausted, or an error which is not retried) is reported as
+failed, never as "no result", so the caller can ask again later. Once the circuit opens the run
+stops with CircuitOpenError: the titles after it were not asked at all.
+
+    python scholar_concurrent.py loadtest [titles] [workers] [rate]
+runs the engine against a local scholar_stub_server with its own rate limit.
+'''
+import csv, random, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from urllib2 import HTTPError, URLError
+
+import scholar
+from scholar import ScholarConf, ScholarQuerier, ScholarSession, ScholarUtils
+from scholar_metrics import METRICS
+from run_metrics import METRICS as RUN_METRICS
+
+
+class CircuitOpenError(scholar.Error):
+    """Requests are suspended after too many consecutive failures."""
+
+
+class TokenBucket(object):
+    """ at most 'rate' requests per second on average, with bursts of up to 'capacity' requests """
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min( self.capacity, self.tokens + (now - self.last) * self.rate )
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker(object):
+    """
+    closed: requests go through; after 'failure_threshold' consecutive failures it opens.
+    open: requests fail immediately for 'reset_timeout' seconds, then one trial request is let through (half open);
+    its success closes the circuit again and its failure reopens it.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.time() - self.opened_at >= self.reset_timeout and not self.trial:
+                self.trial = True
+                return
+            raise CircuitOpenError('circuit open after %d consecutive failures' % self.failures)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial:
+                    ScholarUtils.log('warn', 'circuit opened after %d consecutive failures' % self.failures)
+                self.opened_at = time.time()
+                self.trial = False
+
+
+def is_retryable(err):
+    if isinstance(err, scholar.BlockedError):
+        return True # the CAPTCHA page of a session Scholar suspects, as a 429 would be
+    if isinstance(err, HTTPError):
+        return err.code == 429 or err.code >= 500
+    return isinstance(err, (URLError, IOError, OSError))
+
+
+class ConcurrentScholarQuerier(object):
+    def __init__(self, workers=4, rate=0.2, burst=1, max_retries=4, backoff=2.0, max_backoff=120.0,
+                 failure_threshold=5, reset_timeout=300.0, timeout=30.0, site=None):
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.site = site # e.g. the URL of a scholar_stub_server instead of ScholarConf.SCHOLAR_SITE
+        self.session = ScholarSession()
+        self.lock = threading.Lock()
+        self.stats = { 'requests': 0, 'cached': 0, 'retries': 0, 'failures': 0, 'rejected': 0 }
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def fetch(self, url, log_msg=None):
+        """ the response body, or raises the last error once the retries are exhausted """
+        if self.session.cache is not None:
+            html = self.session.cache.get(url)
+            if html is not None:
+                self.count('cached')
+                METRICS.count('cache_hits')
+                return html
+        if ScholarConf.OFFLINE:
+            METRICS.error('offline_miss')
+            raise scholar.Error('offline and not cached: %s' % url)
+
+        request_url = url
+        if self.site and url.startswith(ScholarConf.SCHOLAR_SITE):
+            request_url = self.site + url[ len(ScholarConf.SCHOLAR_SITE): ]
+        querier = ScholarQuerier(self.session)
+
+        attempt = 0
+        while True:
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self.count('rejected')
+                METRICS.count('circuit_rejected')
+                raise
+            self.bucket.acquire()
+            self.count('requests')
+            try:
+                html = querier._fetch(request_url, log_msg, timeout=self.timeout)
+            except Exception as err:
+                self.breaker.record_failure()
+                if not is_retryable(err) or attempt >= self.max_retries:
+                    self.count('failures')
+                    raise
+                delay = min( self.max_backoff, self.backoff * (2 ** attempt) )
+                delay *= random.uniform(0.5, 1.0) # jitter, so the workers do not retry in lockstep
+                ScholarUtils.log('info', 'retrying in %.1fs after: %s' % (delay, err))
+                self.count('retries')
+                METRICS.count('retries')
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if self.session.cache is not None and request_url != url:
+                self.session.cache.put(url, html) # under the real URL, as if Scholar had answered
+            return html
+
+    def query_title(self, title, topk=5):
+        """ the same as scholar.main: (citations, result title) of the most similar of the top results """
+        title, query = scholar.title_query(title)
+        querier = RateLimitedQuerier(self)
+        with RUN_METRICS.stage('query'):
+            querier.send_query(query)
+        with RUN_METRICS.stage('match'):
+            answer = scholar.extract_result(title, querier, topk)
+        RUN_METRICS.count('titles')
+        return answer
+
+    def map(self, titles, topk=5):
+        """
+        yields (title, (citations, result title), None) in the order of the titles, ('', '') when Scholar has
+        no match, and (title, None, error) when the query failed.
+        Raises CircuitOpenError when the circuit opens: the titles after it are not queried nor yielded.
+        """
+        stopped = threading.Event()
+        def run(title):
+            if stopped.is_set():
+                return title, None, CircuitOpenError('the run was stopped by the circuit breaker')
+            try:
+                return title, self.query_title(title, topk), None
+            except CircuitOpenError as err:
+                stopped.set()
+                return title, None, err
+            except Exception as err:
+                ScholarUtils.log('warn', 'query failed for "%s": %s' % (title, err))
+                return title, None, err
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for title, answer, error in executor.map(run, titles):
+                if isinstance(error, CircuitOpenError):
+                    raise error
+                yield title, answer, error
+        finally:
+            stopped.set() # also when the caller stops early
+            executor.shutdown(wait=True)
+
+
+class RateLimitedQuerier(ScholarQuerier):
+    """ a ScholarQuerier whose requests go through the engine """
+    def __init__(self, engine):
+        ScholarQuerier.__init__(self, engine.session)
+        self.engine = engine
+
+    def _get_http_response(self, url, log_msg=None, err_msg=None):
+        """ unlike ScholarQuerier, a failed request raises: the title is failed, not without results """
+        return self.engine.fetch(url, log_msg)
+
+
+def load_test(titles, workers=8, rate=5.0, server_rate=None, latency=0.05, error_rate=0.02):
+    """ run the engine against a local stub server and report its throughput """
+    from scholar_stub_server import start_server
+    server = start_server( latency=latency, error_rate=error_rate, rate_limit=server_rate )
+    engine = ConcurrentScholarQuerier( workers=workers, rate=rate, burst=workers, backoff=0.2, max_backoff=2.0,
+                                       reset_timeout=2.0, site='http://127.0.0.1:%d' % server.server_port )
+    start = time.time()
+    found = failed = 0
+    circuit_open = False
+    try:
+        for title, answer, error in engine.map(titles):
+            if error is not None:
+                failed += 1
+            elif answer[1]:
+                found += 1
+    except CircuitOpenError:
+        circuit_open = True
+    elapsed = time.time() - start
+    server.shutdown()
+    report = { 'titles': len(titles), 'found': found, 'failed': failed, 'circuit_open': circuit_open, 'seconds': round(elapsed, 2),
+               'queries_per_minute': round( 60.0 * len(titles) / elapsed, 1 ),
+               'engine': engine.stats, 'server': server.state.stats, 'metrics': METRICS.to_dict() }
+    return report
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'loadtest':
+        num_of_titles = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+        rate = float(sys.argv[4]) if len(sys.argv) > 4 else 20.0
+        with open('../qualified_articles.csv', 'r', encoding="utf8") as articles:
+            titles = [ line[3] for line in csv.reader(articles) ][:num_of_titles]
+        print( load_test(titles, workers, rate, server_rate=rate * 0.8) )
@@ -0,0 +1,425 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Faster backends for parsing Scholar result pages.
+
+ScholarArticleParser120726 builds a full BeautifulSoup tree of the page and then searches it.
+The backends here only extract what ScholarArticle needs from each 'gs_r' result (the 'gs_rt'
+title and link, the year in 'gs_a' and the 'gs_fl'/'gs_ttss' links) and reuse the helpers of
+ScholarArticleParser, so the articles they produce have the same attrs.
+
+    stream  one pass of html.parser events, no tree (standard library only)
+    lxml    lxml.html tree searched with XPath, if lxml is installed
+
+ScholarConf.PARSER_BACKEND selects the backend used by ScholarQuerier ('bs4' by default).
+
+    python scholar_fastparse.py [directory of saved result pages]
+checks that every backend gives the same attrs as BeautifulSoup on the pages and reports the
+parsing throughput of each. tests/fixtures/scholar_pages has a few pages written by hand after the
+layout of Scholar, which tests/test_scholar_fastparse.py checks the backends against.
+'''
+import os, sys, time
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from scholar import ScholarArticle, ScholarArticleParser, ScholarArticleParser120726
+
+VOID_TAGS = set( [ 'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+                   'link', 'meta', 'param', 'source', 'track', 'wbr' ] )
+
+
+def _string(children):
+    """ BeautifulSoup's Tag.string of a node given as a list of strings and child lists """
+    if len(children) != 1:
+        return None
+    if isinstance(children[0], list):
+        return _string(children[0])
+    return children[0]
+
+def _text(children):
+    return ''.join( _text(child) if isinstance(child, list) else child for child in children )
+
+
+class _Links(object):
+    """ the direct <a> children of a links container, each as (href, children) """
+    def __init__(self, depth):
+        self.depth = depth
+        self.links = []
+        self.anchor = None # stack of the open nodes of the current anchor
+
+
+class _Child(object):
+    """ what ScholarArticleParser120726._parse_article reads from one direct child of a 'gs_r' div """
+    def __init__(self, is_ri):
+        self.is_ri = is_ri
+        self.ttss = None
+        self.h3_depth = None
+        self.h3_done = False
+        self.h3_text = [] # text of the h3 outside of its spans
+        self.span_depth = 0
+        self.a_depth = None
+        self.a_done = False
+        self.a_href = None
+        self.a_text = []
+        self.gs_a_depth = None
+        self.gs_a_text = None
+        self.fl = None
+
+
+class ScholarStreamParser(ScholarArticleParser, HTMLParser):
+    """
+    Drop-in replacement of ScholarArticleParser120726 driven by html.parser events.
+    Subclasses override handle_article() as with the other parsers.
+    """
+    def __init__(self, site=None):
+        ScholarArticleParser.__init__(self, site)
+        HTMLParser.__init__(self, convert_charrefs=True)
+
+    def parse(self, html):
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', 'replace')
+        self.reset()
+        self.stack = []
+        self.article_depth = None
+        self.child = None
+        self.feed(html)
+        self.close()
+
+    """ html.parser callbacks """
+
+    def handle_starttag(self, name, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if name in VOID_TAGS:
+            self._start(name, attrs, classes, len(self.stack))
+            self._end(name, len(self.stack))
+            return
+        self.stack.append(name)
+        self._start(name, attrs, classes, len(self.stack) - 1)
+
+    def handle_startendtag(self, name, attrs):
+        attrs = dict(attrs)
+        self._start(name, attrs, (attrs.get('class') or '').split(), len(self.stack))
+        self._end(name, len(self.stack))
+
+    def handle_endtag(self, name):
+        if name not in self.stack:
+            return
+        while self.stack:
+            depth = len(self.stack) - 1
+            open_name = self.stack.pop()
+            self._end(open_name, depth)
+            if open_name == name:
+                break
+
+    def handle_data(self, data):
+        child = self.child
+        if child is None:
+            return
+        for links in (child.ttss, child.fl):
+            if links is not None and links.anchor:
+                links.anchor[-1].append(data)
+        if child.h3_depth is not None and not child.h3_done and not child.span_depth:
+            child.h3_text.append(data)
+        if child.a_depth is not None and not child.a_done:
+            child.a_text.append(data)
+        if child.gs_a_depth is not None:
+            child.gs_a_text.append(data)
+
+    """ extraction """
+
+    def _start(self, name, attrs, classes, depth):
+        if self.article_depth is None:
+            if name == 'div' and 'gs_r' in classes:
+                self.article_depth = depth
+                self.article = ScholarArticle()
+            return
+
+        if depth == self.article_depth + 1:
+            self.child = _Child( name == 'div' and 'gs_ri' in classes )
+        child = self.child
+        if child is None:
+            return
+
+        for links in (child.ttss, child.fl):
+            if links is None:
+                continue
+            if links.anchor:
+                node = []
+                links.anchor[-1].append(node)
+                if name not in VOID_TAGS:
+                    links.anchor.append(node)
+            elif name == 'a' and depth == links.depth + 1 and attrs.get('href') is not None:
+                node = []
+                links.links.append( (attrs.get('href'), node) )
+                links.anchor = [node]
+
+        if depth == self.article_depth + 1:
+            return
+
+        if name == 'div' and 'gs_ttss' in classes and child.ttss is None:
+            child.ttss = _Links(depth)
+        if not child.is_ri:
+            return
+        if name == 'h3' and child.h3_depth is None:
+            child.h3_depth = depth
+        elif child.h3_depth is not None and not child.h3_done:
+            if name == 'span':
+                child.span_depth += 1
+            elif name == 'a' and child.a_depth is None:
+                child.a_depth = depth
+                child.a_href = attrs.get('href')
+        if name == 'div' and 'gs_a' in classes and child.gs_a_depth is None and child.gs_a_text is None:
+            child.gs_a_depth = depth
+            child.gs_a_text = []
+        if name == 'div' and 'gs_fl' in classes and child.fl is None:
+            child.fl = _Links(depth)
+
+    def _end(self, name, depth):
+        if self.article_depth is None:
+            return
+        if depth == self.article_depth:
+            self.article_depth = None
+            self.child = None
+            self._clean_article()
+            if self.article['title']:
+                self.handle_article(self.article)
+            return
+
+        child = self.child
+        if child is None:
+            return
+        if depth == self.article_depth + 1:
+            self._apply(child)
+            self.child = None
+            return
+
+        for links in (child.ttss, child.fl):
+            if links is None:
+                continue
+            if links.anchor and name not in VOID_TAGS:
+                links.anchor.pop()
+            if depth == links.depth:
+                links.depth = -1 # closed, no more links
+        if child.h3_depth is not None and not child.h3_done:
+            if depth == child.h3_depth:
+                child.h3_done = True
+            elif name == 'span':
+                child.span_depth -= 1
+            if child.a_depth == depth:
+                child.a_done = True
+        if depth == child.gs_a_depth:
+            child.gs_a_depth = None
+
+    def _apply(self, child):
+        """ set the fields in the order ScholarArticleParser120726._parse_article does """
+        if child.ttss is not None:
+            self._links(child.ttss)
+        if not child.is_ri:
+            return
+        if child.h3_depth is not None:
+            if child.a_depth is not None and child.a_href is not None:
+                self.article['title'] = ''.join(child.a_text)
+                self.article['url'] = self._path2url(child.a_href)
+                if self.article['url'].endswith('.pdf'):
+                    self.article['url_pdf'] = self.article['url']
+            else:
+                self.article['title'] = ''.join(child.h3_text)
+        if child.gs_a_text is not None:
+            year = self.year_re.findall( ''.join(child.gs_a_text) )
+            self.article['year'] = year[0] if len(year) > 0 else None
+        if child.fl is not None:
+            self._links(child.fl)
+
+    def _links(self, links):
+        """ ScholarArticleParser._parse_links on the collected anchors """
+        for href, children in links.links:
+            string = _string(children)
+            if href.startswith('/scholar?cites'):
+                if string is not None and string.startswith('Cited by'):
+                    self.article['num_citations'] = self._as_int(string.split()[-1])
+                self.article['url_citations'] = self._strip_url_arg('num', self._path2url(href))
+                args = self.article['url_citations'].split('?', 1)[1]
+                for arg in args.split('&'):
+                    if arg.startswith('cites='):
+                        self.article['cluster_id'] = arg[6:]
+            if href.startswith('/scholar?cluster'):
+                if string is not None and string.startswith('All '):
+                    self.article['num_versions'] = self._as_int(string.split()[1])
+                self.article['url_versions'] = self._strip_url_arg('num', self._path2url(href))
+            if _text(children).startswith('Import'):
+                self.article['url_citation'] = self._path2url(href)
+
+
+class ScholarLxmlParser(ScholarArticleParser120726):
+    """ the ScholarArticleParser120726 logic on an lxml tree """
+    GS_R = "//div[contains(concat(' ', normalize-space(@class), ' '), ' gs_r ')]"
+
+    def parse(self, html):
+        if lxml is None:
+            raise ImportError('the lxml parser backend needs lxml')
+        root = lxml.html.fromstring(html)
+        for div in root.xpath(self.GS_R):
+            self._parse_article(div)
+            self._clean_article()
+            if self.article['title']:
+                self.handle_article(self.article)
+
+    @staticmethod
+    def _has_class(tag, klass):
+        return klass in (tag.get('class') or '').split()
+
+    @staticmethod
+    def _find(tag, name, klass=None):
+        for node in tag.iterdescendants(name):
+            if klass is None or ScholarLxmlParser._has_class(node, klass):
+                return node
+        return None
+
+    @staticmethod
+    def _all_text(tag):
+        return tag.text_content()
+
+    @staticmethod
+    def _string(tag):
+        """ BeautifulSoup's Tag.string """
+        children = list(tag)
+        if tag.text and children:
+            return None
+        if not children:
+            return tag.text
+        if len(children) == 1 and not children[0].tail:
+            return ScholarLxmlParser._string(children[0])
+        return None
+
+    def _parse_article(self, div):
+        self.article = ScholarArticle()
+        for tag in div:
+            if not isinstance(tag.tag, str):
+                continue
+            ttss = self._find(tag, 'div', 'gs_ttss')
+            if ttss is not None:
+                self._parse_links(ttss)
+            if tag.tag == 'div' and self._has_class(tag, 'gs_ri'):
+                h3 = self._find(tag, 'h3')
+                if h3 is not None:
+                    atag = self._find(h3, 'a')
+                    if atag is not None and atag.get('href') is not None:
+                        self.article['title'] = self._all_text(atag)
+                        self.article['url'] = self._path2url(atag.get('href'))
+                        if self.article['url'].endswith('.pdf'):
+                            self.article['url_pdf'] = self.article['url']
+                    else:
+                        self.article['title'] = ''.join( text for text in self._texts_outside(h3, 'span') )
+                gs_a = self._find(tag, 'div', 'gs_a')
+                if gs_a is not None:
+                    year = self.year_re.findall(self._all_text(gs_a))
+                    self.article['year'] = year[0] if len(year) > 0 else None
+                gs_fl = self._find(tag, 'div', 'gs_fl')
+                if gs_fl is not None:
+                    self._parse_links(gs_fl)
+
+    @staticmethod
+    def _texts_outside(tag, skip):
+        if tag.text:
+            yield tag.text
+        for child in tag:
+            if isinstance(child.tag, str) and child.tag != skip:
+                for text in ScholarLxmlParser._texts_outside(child, skip):
+                    yield text
+            if child.tail:
+                yield child.tail
+
+    def _parse_links(self, span):
+        for tag in span:
+            if tag.tag != 'a' or tag.get('href') is None:
+                continue
+            href = tag.get('href')
+            string = self._string(tag)
+            if href.startswith('/scholar?cites'):
+                if string is not None and string.startswith('Cited by'):
+                    self.article['num_citations'] = self._as_int(string.split()[-1])
+                self.article['url_citations'] = self._strip_url_arg('num', self._path2url(href))
+                args = self.article['url_citations'].split('?', 1)[1]
+                for arg in args.split('&'):
+                    if arg.startswith('cites='):
+                        self.article['cluster_id'] = arg[6:]
+            if href.startswith('/scholar?cluster'):
+                if string is not None and string.startswith('All '):
+                    self.article['num_versions'] = self._as_int(string.split()[1])
+                self.article['url_versions'] = self._strip_url_arg('num', self._path2url(href))
+            if self._all_text(tag).startswith('Import'):
+                self.article['url_citation'] = self._path2url(href)
+
+
+PARSER_BACKENDS = { 'bs4': ScholarArticleParser120726,
+                    'stream': ScholarStreamParser,
+                    'lxml': ScholarLxmlParser }
+
+
+def parser_class(backend):
+    if backend not in PARSER_BACKENDS:
+        raise ValueError('unknown parser backend "%s", one of %s' % (backend, sorted(PARSER_BACKENDS)))
+    if backend == 'lxml' and lxml is None:
+        raise ImportError('the lxml parser backend needs lxml')
+    return PARSER_BACKENDS[backend]
+
+def parse_articles(html, backend='stream'):
+    """ the articles of a result page, as a list of ScholarArticle """
+    articles = []
+    parser = parser_class(backend)()
+    parser.handle_article = articles.append
+    parser.parse(html)
+    return articles
+
+def article_attrs(articles):
+    return [ dict( (key, value[0]) for key, value in art.attrs.items() ) for art in articles ]
+
+
+def load_pages(directory=None, num_of_generated=200):
+    """ the saved pages of a directory, or generated pages if there is none """
+    if directory and os.path.isdir(directory):
+        pages = []
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.html') or filename.endswith('.htm'):
+                pages.append( open(os.path.join(directory, filename), 'rb').read() )
+        if pages:
+            return pages
+    from scholar_stub_server import render_result_page, generate_articles
+    return [ render_result_page( generate_articles('saved page %d on tumor biology' % i, 10) )
+             for i in range(num_of_generated) ]
+
+def benchmark(pages, backends=None, repeat=3):
+    """ { backend: { 'pages_per_second', 'mb_per_second', 'identical' } } with BeautifulSoup as the reference """
+    backends = backends or [ b for b in PARSER_BACKENDS if b != 'lxml' or lxml is not None ]
+    reference = [ article_attrs( parse_articles(page, 'bs4') ) for page in pages ]
+    size = sum( len(page) for page in pages ) / 1048576.0
+    report = {}
+    for backend in backends:
+        identical = all( article_attrs( parse_articles(page, backend) ) == attrs for page, attrs in zip(pages, reference) )
+        start = time.time()
+        for _ in range(repeat):
+            for page in pages:
+                parse_articles(page, backend)
+        elapsed = (time.time() - start) / repeat
+        report[backend] = { 'pages_per_second': round( len(pages) / elapsed, 1 ),
+                            'mb_per_second': round( size / elapsed, 2 ),
+                            'identical': identical }
+    return report
+
+
+if __name__ == '__main__':
+    pages = load_pages( sys.argv[1] if len(sys.argv) > 1 else '../scholar_pages' )
+    print(len(pages), "pages")
+    for backend, result in sorted( benchmark(pages).items() ):
+        print(backend, result)
@@ -0,0 +1,184 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Metrics of the Scholar querier, to tune the concurrency and backoff of the citation retrieval.
+
+ScholarQuerier records into METRICS:
+    request latency    histogram of the seconds of every HTTP request (cache hits excluded)
+    status codes       requests by HTTP status code
+    errors             failed requests and queries by class:
+                           blocked        HTTP 429/503 or a CAPTCHA page
+                           http_error     any other HTTP error status
+                           timeout        the request timed out
+                           network        connection errors
+                           offline_miss   offline and not in the response cache
+                           parse_error    the result page could not be parsed
+                           empty_result   the result page had no article
+    parse time         histogram of the seconds of parsing a result page
+    articles per page  histogram of the number of articles of a result page
+    throughput         queries per minute since the first query
+and scholar_concurrent adds its retries and the requests rejected by its circuit breaker.
+
+METRICS.to_json() and METRICS.to_prometheus() export them, METRICS.save() writes both next to each other.
+'''
+import json, socket, threading, time
+
+try:
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from urllib2 import HTTPError, URLError
+from scholar_cache import BLOCKED_MARKERS, is_blocked_page # the pages Scholar serves instead of results to a robot
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+ARTICLE_BUCKETS = (0, 1, 2, 5, 10, 20)
+
+
+def classify_error(err):
+    if isinstance(err, HTTPError):
+        return 'blocked' if err.code in (429, 503) else 'http_error'
+    if isinstance(err, socket.timeout) or 'timed out' in str(err):
+        return 'timeout'
+    if isinstance(err, (URLError, IOError, OSError)):
+        return 'network'
+    return 'other'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * ( len(self.buckets) + 1 ) # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """ (upper bound, observations <= bound) with Prometheus' "+Inf" last """
+        total, result = 0, []
+        for bound, count in zip( list(self.buckets) + ['+Inf'], self.counts ):
+            total += count
+            result.append( (bound, total) )
+        return result
+
+    def quantile(self, q):
+        """ the upper bound of the bucket holding the q-quantile, None without observations """
+        if not self.count:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+
+    def to_dict(self):
+        return { 'count': self.count, 'sum': round(self.sum, 6),
+                 'mean': round(self.sum / self.count, 6) if self.count else None,
+                 'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99),
+                 'buckets': [ [bound, total] for bound, total in self.cumulative() ] }
+
+
+class ScholarMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.request_seconds = Histogram(LATENCY_BUCKETS)
+            self.parse_seconds = Histogram(PARSE_BUCKETS)
+            self.articles_per_page = Histogram(ARTICLE_BUCKETS)
+            self.status_codes = {}
+            self.errors = {}
+            self.counters = { 'queries': 0, 'requests': 0, 'cache_hits': 0 }
+            self.first_query = None
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def query(self):
+        with self.lock:
+            self.counters['queries'] += 1
+            if self.first_query is None:
+                self.first_query = time.time()
+
+    def request(self, seconds, status=None, error=None):
+        """ one HTTP request; status is None when no response came back """
+        with self.lock:
+            self.counters['requests'] += 1
+            self.request_seconds.observe(seconds)
+            if status is not None:
+                self.status_codes[status] = self.status_codes.get(status, 0) + 1
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def error(self, error_class):
+        with self.lock:
+            self.errors[error_class] = self.errors.get(error_class, 0) + 1
+
+    def parsed(self, seconds, num_of_articles):
+        with self.lock:
+            self.parse_seconds.observe(seconds)
+            self.articles_per_page.observe(num_of_articles)
+
+    def queries_per_minute(self):
+        if self.first_query is None:
+            return 0.0
+        return 60.0 * self.counters['queries'] / max( time.time() - self.first_query, 1e-9 )
+
+    def to_dict(self):
+        with self.lock:
+            return { 'counters': dict(self.counters),
+                     'queries_per_minute': round( self.queries_per_minute(), 2 ),
+                     'status_codes': dict( ( str(code), n ) for code, n in self.status_codes.items() ),
+                     'errors': dict(self.errors),
+                     'request_seconds': self.request_seconds.to_dict(),
+                     'parse_seconds': self.parse_seconds.to_dict(),
+                     'articles_per_page': self.articles_per_page.to_dict() }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, histogram, description in ( ( 'scholar_request_seconds', self.request_seconds, 'Latency of Scholar HTTP requests.' ),
+                                                  ( 'scholar_parse_seconds', self.parse_seconds, 'Time to parse a result page.' ),
+                                                  ( 'scholar_articles_per_page', self.articles_per_page, 'Articles found on a result page.' ) ):
+                lines.append( '# HELP %s %s' % (name, description) )
+                lines.append( '# TYPE %s histogram' % name )
+                for bound, total in histogram.cumulative():
+                    lines.append( '%s_bucket{le="%s"} %d' % (name, bound, total) )
+                lines.append( '%s_sum %s' % (name, repr(histogram.sum)) )
+                lines.append( '%s_count %d' % (name, histogram.count) )
+            lines.append( '# TYPE scholar_responses_total counter' )
+            for code, n in sorted( self.status_codes.items() ):
+                lines.append( 'scholar_responses_total{code="%s"} %d' % (code, n) )
+            lines.append( '# TYPE scholar_errors_total counter' )
+            for error_class, n in sorted( self.errors.items() ):
+                lines.append( 'scholar_errors_total{class="%s"} %d' % (error_class, n) )
+            for name, n in sorted( self.counters.items() ):
+                lines.append( '# TYPE scholar_%s_total counter' % name )
+                lines.append( 'scholar_%s_total %d' % (name, n) )
+            lines.append( '# TYPE scholar_queries_per_minute gauge' )
+            lines.append( 'scholar_queries_per_minute %s' % repr( round( self.queries_per_minute(), 4 ) ) )
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path='../scholar_metrics'):
+        """ writes <path>.json and <path>.prom """
+        with open(path + '.json', 'w') as outfile:
+            outfile.write( self.to_json() )
+        with open(path + '.prom', 'w') as outfile:
+            outfile.write( self.to_prometheus() )
+
+
+METRICS = ScholarMetrics()
@@ -0,0 +1,164 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+A local stand-in for Google Scholar to load-test the citation retrieval offline.
+
+It answers /scholar queries with recorded result pages: the responses stored in a
+ScholarResponseCache file (see scholar_cache), looked up by the URL the query would have had on
+ScholarConf.SCHOLAR_SITE. Queries which were never recorded get a generated page in the layout
+ScholarArticleParser120726 parses, with the queried words as the title of the first result.
+
+Latency, server errors, CAPTCHA pages (answered with status 200, as Scholar does) and a
+server-side rate limit (answered with HTTP 429) can be injected, and /stats returns the request
+counters as JSON.
+
+    python scholar_stub_server.py [port] [cache file]
+'''
+import hashlib, json, random, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from html import escape
+from scholar_cache import ScholarResponseCache
+from scholar import ScholarConf
+
+
+def render_result_page(articles):
+    """ articles: dicts with title, url, year, num_citations, num_versions, cluster_id """
+    results = []
+    for art in articles:
+        cluster = art['cluster_id']
+        links = []
+        if art.get('num_citations'):
+            links.append( '<a href="/scholar?cites=%s&amp;as_sdt=2005&amp;sciodt=0,5&amp;hl=en&amp;num=20">Cited by %d</a>'
+                          % (cluster, art['num_citations']) )
+        links.append( '<a href="/scholar?q=related:%s:scholar.google.com/&amp;hl=en&amp;as_sdt=0,5">Related articles</a>' % cluster )
+        if art.get('num_versions'):
+            links.append( '<a href="/scholar?cluster=%s&amp;hl=en&amp;as_sdt=0,5&amp;num=20">All %d versions</a>'
+                          % (cluster, art['num_versions']) )
+        results.append(
+            '<div class="gs_r"><div class="gs_ri">'
+            '<h3 class="gs_rt"><a href="%s">%s</a></h3>'
+            '<div class="gs_a">A Author, B Author - Journal of Examples, %s - example.org</div>'
+            '<div class="gs_rs">Abstract text of the article &hellip;</div>'
+            '<div class="gs_fl">%s</div>'
+            '</div></div>' % ( escape(art['url']), escape(art['title']), art['year'], ' '.join(links) ) )
+    return ( '<!doctype html><html><head><title>Google Scholar</title></head><body>'
+             '<div id="gs_ccl">%s</div></body></html>' % ''.join(results) ).encode('utf-8')
+
+CAPTCHA_PAGE = ( b'<!doctype html><html><head><title>Sorry...</title></head><body>'
+                 b'<div id="gs_captcha_ccl"><h1>Please show you&#39;re not a robot</h1>'
+                 b'<p>Our systems have detected unusual traffic from your computer network.</p>'
+                 b'<form action="/sorry/index" method="post"><div id="captcha"></div></form></div></body></html>' )
+
+def generate_articles(words, num=5):
+    """ deterministic fake results for a query; the first one has the queried words as its title """
+    rng = random.Random( hashlib.sha1( words.encode('utf-8') ).hexdigest() )
+    articles = []
+    for i in range(num):
+        cluster = str( rng.randrange(10**18, 10**19) )
+        title = words if i == 0 else ' '.join( rng.sample( words.split() or ['related'], min(3, len(words.split()) or 1) ) ) + ' revisited'
+        articles.append( { 'title': title, 'url': 'http://example.org/article/%s' % cluster,
+                           'year': rng.randrange(1995, 2015), 'num_citations': rng.randrange(0, 500),
+                           'num_versions': rng.randrange(1, 10), 'cluster_id': cluster } )
+    return articles
+
+
+class StubState(object):
+    def __init__(self, cache=None, latency=0.0, error_rate=0.0, rate_limit=None, blocked_rate=0.0):
+        self.cache = cache
+        self.latency = latency
+        self.error_rate = error_rate
+        self.blocked_rate = blocked_rate
+        self.rate_limit = rate_limit # requests per second, None for no limit
+        self.lock = threading.Lock()
+        self.allowance = rate_limit or 0
+        self.last_check = time.time()
+        self.stats = { 'requests': 0, 'recorded': 0, 'generated': 0, 'throttled': 0, 'errors': 0, 'blocked': 0 }
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def throttled(self):
+        """ a token bucket of one second worth of requests """
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.time()
+            self.allowance = min( self.rate_limit, self.allowance + (now - self.last_check) * self.rate_limit )
+            self.last_check = now
+            if self.allowance < 1:
+                return True
+            self.allowance -= 1
+            return False
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, code, body, content_type='text/html; charset=utf-8'):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.state
+        if self.path == '/stats':
+            with state.lock:
+                return self.send( 200, json.dumps(state.stats).encode('utf-8'), 'application/json' )
+
+        state.count('requests')
+        if state.throttled():
+            state.count('throttled')
+            return self.send(429, b'Too Many Requests')
+        if state.latency:
+            time.sleep(state.latency)
+        if state.error_rate and random.random() < state.error_rate:
+            state.count('errors')
+            return self.send(503, b'Service Unavailable')
+        if state.blocked_rate and random.random() < state.blocked_rate:
+            state.count('blocked')
+            return self.send(200, CAPTCHA_PAGE)
+
+        if state.cache is not None:
+            html = state.cache.get(ScholarConf.SCHOLAR_SITE + self.path)
+            if html is not None:
+                state.count('recorded')
+                return self.send(200, html)
+
+        parts = urlsplit(self.path)
+        args = dict( (key.lstrip('?'), value) for key, value in parse_qsl(parts.query, keep_blank_values=True) )
+        state.count('generated')
+        self.send( 200, render_result_page( generate_articles( args.get('q', '') ) ) )
+
+
+def start_server(port=0, cache_file=None, latency=0.0, error_rate=0.0, rate_limit=None, blocked_rate=0.0):
+    """ serve in a background thread; returns the server, its base URL is 'http://127.0.0.1:%d' % server.server_port """
+    state = StubState( ScholarResponseCache(cache_file) if cache_file else None, latency, error_rate, rate_limit, blocked_rate )
+    handler = type( 'BoundStubHandler', (StubHandler,), { 'state': state } )
+    server = ThreadingHTTPServer( ('127.0.0.1', port), handler )
+    server.daemon_threads = True
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    cache_file = sys.argv[2] if len(sys.argv) > 2 else None
+    server = start_server(port, cache_file)
+    print("Serving on http://127.0.0.1:%d" % server.server_port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,305 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+One SQLite database in place of the CSV files the scripts join by position (line[4] the journal,
+line[6] the grant, ...):
+
+    journals            name, impact factor                      journal_impactfactor.csv
+    grants              grant number
+    articles            file, title, title key, journal, grant   qualified_articles.csv
+                        journal_id: the journal matched by 'journal_index', and how
+    citations           citations and result title of an article article_citations.csv
+                        and its title and journal as written there
+    grant_publications  the publications recalled for a grant    grants_final.csv
+
+The joins of combine_cites_impfactor and alter_representation are indexed SQL joins, and an update
+(the citations of one article, the impact factor of one journal) is one UPDATE instead of rewriting
+the files after it; only a journal which is new, or whose impact factor becomes known or unknown, is
+matched again, and only against the articles it can take: those with its journal_key and those
+missed or matched fuzzily. The files are still exported in their old layouts for the scripts which read them,
+each with the names as they were loaded from it: the journals are told apart by their exact name
+("Nature Cell Biology" and "Nature cell biology" are two rows, matched to the articles alike), and
+article_citations.csv keeps its own titles without overwriting those of qualified_articles.csv.
+
+    python store.py load                        bulk-loads the CSV files which exist
+    python store.py export <table> [path]       qualified_articles, article_citations, article_cite_ifr,
+                                                articleCiteIf, journal_impactfactor or grants_final
+'''
+import contextlib, csv, os, sqlite3, sys
+from journal_index import JournalIndex, UNKNOWN_VALUES, journal_key
+from title_matching import title_key
+
+STORE_FILE = '../medliter.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journals (
+    journal_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    impact_factor TEXT NOT NULL DEFAULT '');
+CREATE TABLE IF NOT EXISTS grants (
+    grant_id INTEGER PRIMARY KEY,
+    grant_no TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS articles (
+    article_id INTEGER PRIMARY KEY,
+    relative_path TEXT NOT NULL UNIQUE,
+    folder TEXT, dirname TEXT, filename TEXT,
+    title TEXT, title_key TEXT,
+    journal TEXT, journal_key TEXT,
+    journal_id INTEGER REFERENCES journals,
+    journal_match TEXT,
+    grant_id INTEGER REFERENCES grants);
+CREATE INDEX IF NOT EXISTS articles_title_key ON articles (title_key);
+CREATE INDEX IF NOT EXISTS articles_journal ON articles (journal);
+CREATE INDEX IF NOT EXISTS articles_journal_key ON articles (journal_key);
+CREATE INDEX IF NOT EXISTS articles_journal_match ON articles (journal_match);
+CREATE INDEX IF NOT EXISTS articles_journal_id ON articles (journal_id);
+CREATE INDEX IF NOT EXISTS articles_grant_id ON articles (grant_id);
+CREATE TABLE IF NOT EXISTS citations (
+    article_id INTEGER PRIMARY KEY REFERENCES articles,
+    citations TEXT, result_title TEXT,
+    title TEXT, journal TEXT);
+CREATE TABLE IF NOT EXISTS grant_publications (
+    grant_id INTEGER NOT NULL REFERENCES grants,
+    position INTEGER NOT NULL,
+    relative_path TEXT NOT NULL,
+    title TEXT, journal TEXT, authors TEXT, citation TEXT,
+    PRIMARY KEY (grant_id, relative_path));
+CREATE VIEW IF NOT EXISTS article_cite_ifr AS
+    SELECT a.article_id, a.folder, a.dirname, a.filename, a.title, a.journal,
+           COALESCE(c.title, a.title) AS cited_title, COALESCE(c.journal, a.journal) AS cited_journal,
+           COALESCE(j.impact_factor, '') AS impact_factor, g.grant_no, g.grant_id, c.citations, c.result_title
+    FROM articles a JOIN grants g USING (grant_id)
+                    LEFT JOIN journals j USING (journal_id)
+                    LEFT JOIN citations c USING (article_id);
+"""
+
+
+class Store:
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.journal_index = None # the 'journal_index' index of the journals table, see resolve_journals
+        self.journal_ids = {}     # key: lower-cased name   value: journal_id
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextlib.contextmanager
+    def _bulk(self):
+        """ a bulk load is one transaction, without waiting for the disk on every page; the setting is restored after it """
+        synchronous = self.conn.execute( 'PRAGMA synchronous' ).fetchone()[0]
+        self.conn.execute( 'PRAGMA synchronous = OFF' )
+        try:
+            with self.conn:
+                yield self.conn
+        finally:
+            self.conn.execute( 'PRAGMA synchronous = %d' % synchronous )
+
+    """ bulk loads; each returns the number of rows loaded """
+
+    def _grant_ids(self, grant_nos):
+        self.conn.executemany( 'INSERT OR IGNORE INTO grants (grant_no) VALUES (?)', ( ( grant_no, ) for grant_no in set(grant_nos) ) )
+        return dict( self.conn.execute( 'SELECT grant_no, grant_id FROM grants' ) )
+
+    def load_articles(self, rows, replace=True):
+        """
+        rows of qualified_articles.csv (or of article_citations.csv, whose first 6 columns are the same);
+        with replace=False the articles already loaded are left as they are
+        """
+        rows = [ line for line in rows if len(line) >= 6 ]
+        conflict = '''DO UPDATE SET title = excluded.title, title_key = excluded.title_key,
+                                    journal = excluded.journal, journal_key = excluded.journal_key, grant_id = excluded.grant_id''' if replace else 'DO NOTHING'
+        with self._bulk():
+            grant_ids = self._grant_ids( line[5] for line in rows )
+            self.conn.executemany( '''INSERT INTO articles (relative_path, folder, dirname, filename, title, title_key, journal, journal_key, grant_id)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                      ON CONFLICT (relative_path) ''' + conflict,
+                                   ( ( "\\".join( line[:3] ), line[0], line[1], line[2], line[3], title_key( line[3] ), line[4], journal_key( line[4] ),
+                                       grant_ids[ line[5] ] ) for line in rows ) )
+        self.resolve_journals()
+        return len(rows)
+
+    def load_citations(self, rows):
+        """
+        rows of article_citations.csv; the articles which are not loaded yet are loaded too, rows without
+        citations are not answered yet. Returns the number of answered rows.
+        """
+        rows = [ line for line in rows if len(line) >= 6 ]
+        self.load_articles(rows, replace=False)
+        with self._bulk():
+            self.conn.executemany( '''INSERT INTO citations (article_id, citations, result_title, title, journal)
+                                      SELECT article_id, ?, ?, ?, ? FROM articles WHERE relative_path = ?
+                                      ON CONFLICT (article_id) DO UPDATE SET
+                                          citations = excluded.citations, result_title = excluded.result_title,
+                                          title = excluded.title, journal = excluded.journal''',
+                                   ( ( line[6] if len(line) >= 8 else None, line[7] if len(line) >= 8 else None, line[3], line[4], "\\".join( line[:3] ) )
+                                     for line in rows ) )
+        return len( [ line for line in rows if len(line) >= 8 ] )
+
+    def load_journals(self, rows):
+        """ rows of journal_impactfactor.csv, 'journal,impact factor' or only 'journal' for a new journal """
+        rows = [ line for line in rows if line and line[0].strip() ]
+        with self._bulk():
+            self.conn.executemany( '''INSERT INTO journals (name, impact_factor) VALUES (?, ?)
+                                      ON CONFLICT (name) DO UPDATE SET impact_factor = excluded.impact_factor
+                                      WHERE excluded.impact_factor NOT IN ('', '-')''',
+                                   ( ( line[0].strip(), line[1] if len(line) > 1 else '' ) for line in rows ) )
+        self.resolve_journals()
+        return len(rows)
+
+    def load_grants_final(self, rows):
+        """
+        rows of grants_final.csv; the publications of the grants in the rows replace their old ones and come
+        after the publications of the other grants, so a partial reload does not interleave with them
+        """
+        rows = [ line for line in rows if len(line) >= 5 ]
+        with self._bulk():
+            grant_ids = self._grant_ids( line[0] for line in rows )
+            self.conn.executemany( 'DELETE FROM grant_publications WHERE grant_id = ?', ( ( grant_ids[grant_no], ) for grant_no in set( line[0] for line in rows ) ) )
+            first = self.conn.execute( 'SELECT COALESCE(MAX(position) + 1, 0) FROM grant_publications' ).fetchone()[0]
+            self.conn.executemany( 'INSERT OR REPLACE INTO grant_publications VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   ( ( grant_ids[ line[0] ], first + position, line[1], line[2], line[3], line[4], line[5] if len(line) > 5 else '' )
+                                     for position, line in enumerate(rows) ) )
+        return len(rows)
+
+    def _journal_index(self):
+        """ the 'journal_index' index of the journals table, built once and kept up to date by set_impact_factor """
+        if self.journal_index is None:
+            self.journal_index = JournalIndex()
+            self.journal_ids = {}
+            for journal_id, name, impact_factor in self.conn.execute( 'SELECT journal_id, name, impact_factor FROM journals ORDER BY journal_id' ):
+                self.journal_index.add( name, impact_factor )
+                self.journal_ids.setdefault( name.strip().lower(), journal_id )
+        return self.journal_index
+
+    def _match_articles(self, journals):
+        """ matches the journals of articles to the journals table, updating the articles whose match changed """
+        index = self._journal_index()
+        with self.conn:
+            for journal in journals:
+                index.impact_factor( journal ) # records the misses
+                matched, how, similarity = index.match( journal )
+                journal_id = self.journal_ids.get(matched)
+                self.conn.execute( 'UPDATE articles SET journal_id = ?, journal_match = ? WHERE journal = ? AND ( journal_id IS NOT ? OR journal_match IS NOT ? )',
+                                   ( journal_id, how, journal, journal_id, how ) )
+
+    def resolve_journals(self):
+        """ matches every distinct journal of the articles to the journals table; returns the 'journal_index' index """
+        self.journal_index = None
+        self._match_articles( [ journal for ( journal, ) in self.conn.execute( 'SELECT DISTINCT journal FROM articles' ).fetchall() ] )
+        return self.journal_index
+
+    """ updates """
+
+    def set_citations(self, relative_path, citations, result_title):
+        with self.conn:
+            self.conn.execute( '''INSERT INTO citations (article_id, citations, result_title)
+                                  SELECT article_id, ?, ? FROM articles WHERE relative_path = ?
+                                  ON CONFLICT (article_id) DO UPDATE SET
+                                      citations = excluded.citations, result_title = excluded.result_title''',
+                               ( citations, result_title, relative_path ) )
+
+    def set_impact_factor(self, journal, impact_factor):
+        """
+        the article_cite_ifr rows of all the articles of the journal change with it, nothing is rewritten; the
+        articles are matched again only if the journal is new or its impact factor becomes known or unknown
+        """
+        before = self.conn.execute( 'SELECT impact_factor FROM journals WHERE name = ?', ( journal, ) ).fetchone()
+        with self.conn:
+            self.conn.execute( 'INSERT INTO journals (name, impact_factor) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET impact_factor = excluded.impact_factor',
+                               ( journal, impact_factor ) )
+        known = impact_factor not in UNKNOWN_VALUES
+        if before is not None and ( before[0] not in UNKNOWN_VALUES ) == known:
+            return # the matches only depend on whether the impact factor is known
+        if self.journal_index is not None:
+            if before is None or known:
+                self.journal_index.add( journal, impact_factor )
+                self.journal_ids.setdefault( journal.strip().lower(),
+                                             self.conn.execute( 'SELECT journal_id FROM journals WHERE name = ?', ( journal, ) ).fetchone()[0] )
+            else:
+                self.journal_index = None # an index does not forget an impact factor, it is built again
+        """ the articles the journal can take: the same journal_key, or not matched to a journal of their own """
+        self._match_articles( [ name for ( name, ) in self.conn.execute( '''SELECT journal FROM articles WHERE journal_key = ?
+                                                                          UNION SELECT journal FROM articles
+                                                                          WHERE journal_match IS NULL OR journal_match IN ('fuzzy', 'ambiguous', 'miss')''',
+                                                                       ( journal_key(journal), ) ).fetchall() ] )
+
+    def articles_with_title_key(self, key):
+        return self.conn.execute( 'SELECT relative_path, title FROM articles WHERE title_key = ?', ( key, ) ).fetchall()
+
+    """ the rows of the old files """
+
+    def qualified_articles(self):
+        return self.conn.execute( '''SELECT folder, dirname, filename, title, journal, grant_no
+                                     FROM article_cite_ifr ORDER BY article_id''' )
+
+    def article_citations(self):
+        for line in self.conn.execute( '''SELECT folder, dirname, filename, cited_title, cited_journal, grant_no, citations, result_title
+                                          FROM article_cite_ifr ORDER BY article_id''' ):
+            yield list(line) if line[7] is not None else list( line[:6] )
+
+    def article_cite_ifr(self):
+        for line in self.conn.execute( '''SELECT folder, dirname, filename, cited_title, cited_journal, impact_factor, grant_no, citations, result_title
+                                          FROM article_cite_ifr ORDER BY article_id''' ):
+            yield list(line) if line[8] is not None else list( line[:7] )
+
+    def articleCiteIf(self):
+        """ one row per grant: grant number, then 'Cited by: c  Impact Factor: i' for each of its articles with citations """
+        row = None
+        for grant_no, citations, impact_factor in self.conn.execute( '''SELECT grant_no, citations, impact_factor FROM article_cite_ifr
+                                                                        WHERE citations IS NOT NULL ORDER BY grant_id, article_id''' ):
+            if row is None or row[0] != grant_no:
+                if row is not None:
+                    yield row
+                row = [ grant_no ]
+            row.append( 'Cited by: ' + citations + '  Impact Factor: ' + impact_factor )
+        if row is not None:
+            yield row
+
+    def journal_impactfactor(self):
+        for name, impact_factor in self.conn.execute( 'SELECT name, impact_factor FROM journals ORDER BY journal_id' ):
+            yield [ name, impact_factor ] if impact_factor else [ name ]
+
+    def grants_final(self):
+        return self.conn.execute( '''SELECT g.grant_no, p.relative_path, p.title, p.journal, p.authors, p.citation
+                                     FROM grant_publications p JOIN grants g USING (grant_id) ORDER BY p.position''' )
+
+
+""" (file name without '.csv', the Store method bulk-loading its rows), the journals first to match the articles to them """
+LOADERS = [ ( 'journal_impactfactor', Store.load_journals ),
+            ( 'qualified_articles', Store.load_articles ),
+            ( 'article_citations', Store.load_citations ),
+            ( 'grants_final', Store.load_grants_final ) ]
+EXPORTS = ( 'qualified_articles', 'article_citations', 'article_cite_ifr', 'articleCiteIf', 'journal_impactfactor', 'grants_final' )
+
+def load_files(store, directory='..'):
+    for name, loader in LOADERS:
+        path = os.path.join( directory, name + '.csv' )
+        if os.path.exists(path):
+            with open( path, 'r', encoding="utf8" ) as infile:
+                print(name, loader( store, csv.reader( infile ) ), "rows are loaded")
+
+def export(store, name, path=None):
+    if name not in EXPORTS:
+        raise ValueError('unknown table "%s", one of %s' % (name, EXPORTS))
+    with open( path or os.path.join( '..', name + '.csv' ), 'w', encoding="utf8", newline='' ) as outfile:
+        csv.writer( outfile ).writerows( getattr(store, name)() )
+
+
+if __name__ == '__main__':
+    with Store() as store:
+        if len(sys.argv) > 1 and sys.argv[1] == 'load':
+            load_files(store)
+        elif len(sys.argv) > 2 and sys.argv[1] == 'export':
+            export( store, sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None )
+        else:
+            print(__doc__)
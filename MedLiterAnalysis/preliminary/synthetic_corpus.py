@@ -0,0 +1,198 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+A synthetic PMC corpus, laid out as the real one (root\\articles.A-B\\<journal>\\<file>.nxml), to
+measure the scripts without J:\\. Every document has the parts the scripts read: <journal-title>,
+<article-id> (pmid, pmc, doi), <title-group>, <contrib-group>, <abstract>, <body> and <ack>.
+
+    grants         n_grants ACS grants, each with a team of authors and a topic (a slice of the vocabulary)
+    acs_rate       the share of documents acknowledging one of the grants, with a grant number written in
+                   one of grant_formats (see GRANT_FORMATS), and a third of them as " ACS " instead
+    author_overlap the share of the other documents with an author of a grant team, the candidates of
+                   'extend_known_grants'; half of them are on the topic of that grant
+    tag_density    the share of the body words in inline tags (<italic>, <xref>, <sup>, ...)
+    body_words     the median number of words of a body; the sizes are log-normal around it
+
+The same seed gives the same corpus. A manifest.json next to the folders records the parameters
+and what was generated.
+
+    python synthetic_corpus.py <root> [--files 1000] [--grants 20] [--acs-rate 0.05] [--author-overlap 0.2]
+                               [--tag-density 0.05] [--body-words 2000] [--seed 1]
+'''
+import argparse, json, math, os, random
+from extend_known_grants import FOLDERS
+
+WORDS = ( "cancer tumor cell cells growth protein gene genes expression signaling pathway mouse mice model "
+          "therapy patients clinical trial survival risk breast prostate lung colon receptor kinase apoptosis "
+          "metastasis inhibitor mutation sequencing chromatin transcription factor immune response antibody "
+          "vaccine radiation dose toxicity screening cohort incidence mortality smoking diet exercise obesity "
+          "insulin hormone estrogen androgen stem progenitor differentiation proliferation migration invasion "
+          "angiogenesis hypoxia metabolism mitochondria oxidative stress damage repair replication telomere "
+          "methylation microrna noncoding splicing ubiquitin proteasome autophagy necrosis inflammation cytokine "
+          "lymphocyte macrophage tcell bcell leukemia lymphoma melanoma glioma sarcoma carcinoma adenoma "
+          "biomarker imaging biopsy resection chemotherapy resistance sensitivity xenograft organoid culture "
+          "assay western blot staining microscopy flow cytometry analysis regression statistical significant" ).split()
+COMMON_WORDS = ( "the of and in to a with was were for by that is on as from this these we our at be are which "
+                 "results study data shown observed increased decreased compared using between" ).split()
+SURNAMES = ( "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Wang Li Zhang Liu Chen "
+             "Yang Huang Zhao Wu Zhou Kim Lee Park Choi Nguyen Tran Muller Schmidt Schneider Fischer Rossi Russo "
+             "Ferrari Silva Santos Oliveira Cohen Levi Kumar Singh Patel Sharma Tanaka Suzuki Sato Ito" ).split()
+GIVEN_NAMES = ( "John Mary James Linda Robert Susan Michael Karen David Lisa Wei Jing Min Hui Yan Ji Hyun Seo "
+                "Anna Marco Luca Giulia Ana Pedro Maria Raj Priya Amit Yuki Kenji Hana Thomas Laura Daniel Sarah" ).split()
+JOURNALS = [ "Cancer Research", "Journal of Clinical Oncology", "Oncogene", "PLoS ONE", "Clinical Cancer Research",
+             "Cancer Epidemiology, Biomarkers &amp; Prevention", "Molecular Cancer Therapeutics", "Breast Cancer Research",
+             "BMC Cancer", "Journal of Biological Chemistry", "Proceedings of the National Academy of Sciences of the United States of America",
+             "Nucleic Acids Research", "Cancer Cell", "Journal of the National Cancer Institute", "Neoplasia" ]
+INLINE_TAGS = [ '<italic>%s</italic>', '<bold>%s</bold>', '<sup>%s</sup>', '<xref ref-type="bibr" rid="B%d">%%s</xref>', '<named-content content-type="gene">%s</named-content>' ]
+
+""" how an acknowledgement writes the number of an ACS grant: name: function of (prefix, year, number, sequence, suffix) """
+GRANT_FORMATS = {
+    'long': lambda p, y, n, s, x: "%s-%02d-%03d-%02d-%s" % (p, y, n, s, x),      # RSG-09-175-01-CCE
+    'end_para': lambda p, y, n, s, x: "%s-%02d-%03d-%02d (%s)" % (p, y, n, s, x), # RSG-09-175-01 (CCE)
+    'short': lambda p, y, n, s, x: "%s-%02d-%03d-%02d" % (p, y, n, s),           # IRG-58-010-52
+    'space': lambda p, y, n, s, x: "%s %02d-%03d-%02d-%s" % (p, y, n, s, x),      # PF 10-123-01-TBE
+    'full_para': lambda p, y, n, s, x: "(%s%02d%03d)" % (p, y, n),                 # American Cancer Society (IRG0912345)
+}
+GRANT_PREFIXES = [ 'RSG', 'IRG', 'PF', 'MRSG', 'CRP', 'RSGT', 'TBE' ]
+GRANT_SUFFIXES = [ 'CCE', 'TBE', 'MGO', 'CSM', 'LIB', 'GMC', 'CNE' ]
+
+
+class SyntheticGrant:
+    def __init__(self, number, team, topic):
+        self.number = number # the parts of its number, formatted by GRANT_FORMATS
+        self.team = team     # [ (surname, given names) ]
+        self.topic = topic   # the words its documents are about
+
+
+def _author(rnd):
+    return ( rnd.choice(SURNAMES), rnd.choice(GIVEN_NAMES) + ( ' ' + chr( 65 + rnd.randrange(26) ) if rnd.random() < 0.5 else '' ) )
+
+def _grants(rnd, n_grants):
+    grants = []
+    for _ in range(n_grants):
+        number = ( rnd.choice(GRANT_PREFIXES), rnd.randrange(0, 16), rnd.randrange(1000), rnd.randrange(1, 5), rnd.choice(GRANT_SUFFIXES) )
+        start = rnd.randrange( len(WORDS) - 20 )
+        grants.append( SyntheticGrant( number, [ _author(rnd) for _ in range( rnd.randint(2, 6) ) ], WORDS[start:start + 20] ) )
+    return grants
+
+def _text(rnd, n_words, topic, tag_density=0.0):
+    words = []
+    for i in range(n_words):
+        word = rnd.choice(topic) if rnd.random() < 0.4 else rnd.choice(COMMON_WORDS) if rnd.random() < 0.6 else rnd.choice(WORDS)
+        if tag_density and rnd.random() < tag_density:
+            tag = rnd.choice(INLINE_TAGS)
+            word = ( tag % rnd.randint(1, 60) if '%d' in tag else tag ) % word
+        words.append(word)
+        if i % 15 == 14:
+            words[-1] += '.'
+    return ' '.join(words)
+
+def _acknowledgement(rnd, grant, grant_formats):
+    grant_format = rnd.choice(grant_formats)
+    number = GRANT_FORMATS[grant_format]( *grant.number )
+    funder = 'ACS grant' if grant_format == 'full_para' and rnd.random() < 0.3 else 'American Cancer Society'
+    if grant_format != 'full_para' and rnd.random() < 1.0 / 3:
+        return "We thank the members of the laboratory. This work was supported by the ACS %s and by NIH grant CA%06d." % ( number, rnd.randrange(10 ** 6) )
+    return "This work was supported by %s %s and by the National Cancer Institute (CA%06d)." % ( funder, number, rnd.randrange(10 ** 6) )
+
+def document(rnd, i, authors, topic, acknowledgement, tag_density, body_words):
+    """ the NXML of one article """
+    journal = JOURNALS[ i % len(JOURNALS) ]
+    contribs = ''.join( '\n<contrib contrib-type="author"><name><surname>%s</surname><given-names>%s</given-names></name><xref ref-type="aff" rid="A1">1</xref></contrib>' % author
+                        for author in authors )
+    paragraphs = []
+    remaining = body_words
+    while remaining > 0:
+        n = min( remaining, rnd.randint(80, 250) )
+        paragraphs.append( '<p>%s</p>' % _text(rnd, n, topic, tag_density) )
+        remaining -= n
+    sections = []
+    for title, start in zip( ( 'Introduction', 'Materials and Methods', 'Results', 'Discussion' ), range(0, len(paragraphs), max( 1, len(paragraphs) // 4 ) ) ):
+        sections.append( '<sec><title>%s</title>\n%s\n</sec>' % ( title, '\n'.join( paragraphs[start:start + max( 1, len(paragraphs) // 4 )] ) ) )
+    title = _text(rnd, rnd.randint(6, 14), topic).rstrip('.').capitalize()
+    return '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE article PUBLIC "-//NLM//DTD Journal Archiving and Interchange DTD v2.3 20070202//EN" "archivearticle.dtd">
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="research-article"><front><journal-meta><journal-id journal-id-type="nlm-ta">%s</journal-id>
+<journal-title>%s</journal-title><issn pub-type="ppub">%04d-%04d</issn></journal-meta>
+<article-meta><article-id pub-id-type="pmid">%d</article-id><article-id pub-id-type="pmc">%d</article-id><article-id pub-id-type="doi">10.%d/synthetic.%d</article-id>
+<title-group><article-title>%s</article-title></title-group>
+<contrib-group>%s
+</contrib-group>
+<aff id="A1"><label>1</label>Department of Oncology, Synthetic University</aff>
+<pub-date pub-type="ppub"><year>%d</year></pub-date>
+<abstract><p>%s</p></abstract>
+</article-meta></front>
+<body>%s</body>
+<back>%s<ref-list>%s</ref-list></back></article>
+''' % ( journal, journal, 1000 + i % 9000, i % 10000, 10000000 + i, 2000000 + i, 1000 + i % 9000, i, title, contribs, 1990 + i % 30,
+        _text(rnd, rnd.randint(150, 300), topic, tag_density / 2), '\n'.join(sections),
+        '<ack><p>%s</p></ack>' % acknowledgement if acknowledgement else '',
+        ''.join( '<ref id="B%d"><element-citation><pub-id pub-id-type="pmid">%d</pub-id></element-citation></ref>' % ( k, 10000000 + rnd.randrange(10 ** 6) )
+                 for k in range( 1, rnd.randint(10, 40) ) ) )
+
+def generate_corpus(root, files=1000, n_grants=20, acs_rate=0.05, author_overlap=0.2, tag_density=0.05, body_words=2000,
+                    grant_formats=tuple(GRANT_FORMATS), folders=FOLDERS[:2], files_per_dir=200, seed=1):
+    """ writes the corpus under root and returns its manifest """
+    rnd = random.Random(seed)
+    grants = _grants(rnd, n_grants)
+    counts = { 'files': 0, 'bytes': 0, 'acs': 0, 'acs_abbreviated': 0, 'candidates': 0, 'on_topic_candidates': 0 }
+    for i in range(files):
+        folder = folders[ i % len(folders) ]
+        dirname = 'Synthetic_Journal_%d' % ( i // len(folders) // files_per_dir )
+        authors = [ _author(rnd) for _ in range( rnd.randint(1, 8) ) ]
+        topic = rnd.choice( grants ).topic if grants else WORDS
+        acknowledgement = "We thank the reviewers." if rnd.random() < 0.5 else None
+        if grants and rnd.random() < acs_rate:
+            grant = rnd.choice(grants)
+            authors[:rnd.randint( 1, len(authors) )] = rnd.sample( grant.team, min( len(grant.team), 2 ) )
+            topic = grant.topic
+            acknowledgement = _acknowledgement(rnd, grant, list(grant_formats))
+            counts['acs'] += 1
+            counts['acs_abbreviated'] += ' ACS ' in acknowledgement
+        elif grants and rnd.random() < author_overlap:
+            grant = rnd.choice(grants)
+            authors[ rnd.randrange( len(authors) ) ] = rnd.choice(grant.team)
+            counts['candidates'] += 1
+            if rnd.random() < 0.5:
+                topic = grant.topic
+                counts['on_topic_candidates'] += 1
+        n_words = max( 50, int( body_words * math.exp( rnd.gauss(0, 0.5) ) ) )
+        data = document( rnd, i, authors, topic, acknowledgement, tag_density, n_words )
+
+        path = os.path.join( root, folder, dirname )
+        os.makedirs( path, exist_ok=True )
+        with open( os.path.join( path, 'Synthetic_%06d.nxml' % i ), 'w', encoding="utf8", newline='\n' ) as outfile:
+            outfile.write(data)
+        counts['files'] += 1
+        counts['bytes'] += len( data.encode('utf-8') )
+
+    manifest = { 'root': root, 'folders': list(folders), 'seed': seed,
+                 'params': { 'files': files, 'grants': n_grants, 'acs_rate': acs_rate, 'author_overlap': author_overlap,
+                             'tag_density': tag_density, 'body_words': body_words, 'grant_formats': list(grant_formats) },
+                 'generated': counts,
+                 'grants': [ GRANT_FORMATS['long']( *grant.number ) for grant in grants ] }
+    with open( os.path.join( root, 'manifest.json' ), 'w' ) as outfile:
+        json.dump( manifest, outfile, indent=2 )
+    return manifest
+
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser( description='Generate a synthetic PMC corpus, see the documentation of synthetic_corpus.py.' )
+    parser.add_argument( 'root', help='the directory of the corpus' )
+    parser.add_argument( '--files', type=int, default=1000 )
+    parser.add_argument( '--grants', type=int, default=20 )
+    parser.add_argument( '--acs-rate', type=float, default=0.05 )
+    parser.add_argument( '--author-overlap', type=float, default=0.2 )
+    parser.add_argument( '--tag-density', type=float, default=0.05 )
+    parser.add_argument( '--body-words', type=int, default=2000 )
+    parser.add_argument( '--seed', type=int, default=1 )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_options()
+    manifest = generate_corpus( options.root, options.files, options.grants, options.acs_rate, options.author_overlap,
+                                options.tag_density, options.body_words, seed=options.seed )
+    print( json.dumps( manifest['generated'] ) )
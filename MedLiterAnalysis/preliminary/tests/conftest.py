@@ -0,0 +1,4 @@
+import os, sys
+
+""" the modules are imported flat, as the scripts import each other from preliminary/ """
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
@@ -0,0 +1,71 @@
+import random
+from alter_representation import grant_groups, h_index, grant_aggregates
+
+def make_rows(n_grants=30, seed=1):
+    """ (grant, citations, impact factor) rows of several grants, the rows of a grant consecutive """
+    rnd = random.Random(seed)
+    rows = []
+    for g in range(n_grants):
+        for a in range( rnd.randint(1, 6) ):
+            rows.append( ( 'RSG-%02d' % g, str( rnd.randint(0, 50) ), '%.3f' % rnd.uniform(0, 10) ) )
+    return rows
+
+def as_dict(groups):
+    groups = list(groups)
+    assert len( set( grantNo for grantNo, group in groups ) ) == len(groups) # one group per grant
+    return dict(groups)
+
+def shuffled(rows, seed=2):
+    rows = list(rows)
+    random.Random(seed).shuffle(rows)
+    return rows
+
+
+def test_sorted_and_hashed_give_the_same_groups():
+    rows = make_rows()
+    sorted_groups = list( grant_groups( rows, sorted_input=True ) )
+    assert [ grantNo for grantNo, group in sorted_groups ] == sorted( set( row[0] for row in rows ) )
+    assert as_dict( grant_groups(rows) ) == dict(sorted_groups)
+    assert list( grant_groups(rows) ) == sorted_groups # in the order of the first row when nothing is spilled
+
+def test_hashed_groups_keep_the_order_of_the_rows_of_a_grant():
+    rows = shuffled( make_rows() )
+    expected = {}
+    for grant, citations, factor in rows:
+        expected.setdefault( grant, [] ).append( ( citations, factor ) )
+    assert as_dict( grant_groups(rows) ) == expected
+
+def test_spilled_groups_are_the_same(tmp_path):
+    rows = shuffled( make_rows(200) )
+    expected = as_dict( grant_groups(rows) )
+    for max_rows in ( 1, 7, 50 ):
+        assert as_dict( grant_groups( rows, max_rows=max_rows, spill_dir=str(tmp_path) ) ) == expected, max_rows
+    assert list( tmp_path.iterdir() ) == [] # the partitions are temporary files
+
+def test_a_grant_with_more_rows_than_max_rows_is_one_group(tmp_path):
+    big = [ ( 'BIG-1', str(i), '1.0' ) for i in range(100) ]
+    rows = shuffled( big + make_rows(20) )
+    groups = as_dict( grant_groups( rows, max_rows=10, spill_dir=str(tmp_path) ) )
+    assert groups['BIG-1'] == [ ( c, i ) for grant, c, i in rows if grant == 'BIG-1' ]
+    assert groups == as_dict( grant_groups(rows) )
+
+def test_h_index():
+    assert h_index([]) == 0
+    assert h_index([ 0, 0 ]) == 0
+    assert h_index([ 1 ]) == 1
+    assert h_index([ 100 ]) == 1
+    assert h_index([ 3, 3, 3 ]) == 3
+    assert h_index([ 10, 8, 5, 4, 3 ]) == 4
+    assert h_index([ 1, 4, 2, 25, 3 ]) == 3 # the order does not matter
+    assert h_index([ 2.5, 2.5 ]) == 2
+
+def test_grant_aggregates_of_numbers():
+    group = [ ( '10', '2.0' ), ( '4', '1.5' ), ( '1', '3.0' ), ( '7', '0.5' ) ]
+    assert grant_aggregates( 'RSG-1', group ) == [ 'RSG-1', 4, 4, 22.0, 5.5, 5.5, 32.5, 1.75, 3 ]
+
+def test_grant_aggregates_skip_empty_and_non_numeric_values():
+    group = [ ( '10', '2.0' ), ( '', '1.5' ), ( 'n/a', '' ), ( '3', 'unknown' ), ( '5', '1' ) ]
+    assert grant_aggregates( 'RSG-1', group ) == [ 'RSG-1', 5, 3, 18.0, 6.0, 5.0, 25.0, 1.5, 3 ]
+
+def test_grant_aggregates_without_any_number():
+    assert grant_aggregates( 'RSG-1', [ ( '', '' ), ( 'x', 'y' ) ] ) == [ 'RSG-1', 2, 0, 0, '', '', 0, '', 0 ]
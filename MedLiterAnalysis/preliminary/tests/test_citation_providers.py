@@ -0,0 +1,100 @@
+import importlib, os
+import pytest
+import scholar
+from citation_providers import CitationProvider, ProviderChain, DumpIndex
+from result_writer import JournaledResultWriter
+from scholar_concurrent import CircuitOpenError
+
+
+class FakeProvider(CitationProvider):
+    """ answers: { title: answer }, a title in failing raises """
+    def __init__(self, name, answers, failing=()):
+        self.name = name
+        self.answers = answers
+        self.failing = failing
+
+    def lookup(self, title, line):
+        if title in self.failing:
+            raise IOError('no answer from the provider')
+        return self.answers.get(title)
+
+class OpenCircuitProvider(CitationProvider):
+    name = 'scholar'
+
+    def lookup_many(self, items):
+        yield 0, ( '5', items[0][0] ), None
+        raise CircuitOpenError('circuit open after 5 consecutive failures')
+
+@pytest.fixture
+def retrieve_module(monkeypatch):
+    """ the script sets the cache file of Scholar when it is imported """
+    monkeypatch.setattr( scholar.ScholarConf, 'CACHE_FILE', None )
+    return importlib.import_module('retrieve_citations_from_Scholar')
+
+def item(title, n):
+    return title, [ 'folder', 'Journal', 'article%d.nxml' % n, title, 'Author A', 'grant' ]
+
+
+def test_the_chain_falls_back_and_reports_failures():
+    first = FakeProvider( 'dump', { 'known': ( '3', 'known' ) }, failing=( 'failing', 'failing then known' ) )
+    second = FakeProvider( 'scholar', { 'failing then known': ( '8', 'failing then known' ), 'unknown': None } )
+    chain = ProviderChain( [ first, second ] )
+    items = [ item(title, n) for n, title in enumerate( [ 'known', 'failing', 'failing then known', 'unknown' ] ) ]
+    results = sorted( chain.lookup_many(items) )
+    assert results == [ ( 0, ( '3', 'known' ), 'dump' ), ( 1, None, None ),
+                        ( 2, ( '8', 'failing then known' ), 'scholar' ), ( 3, ( '', '' ), None ) ]
+    assert chain.stats == { 'dump': 1, 'scholar': 1, 'unanswered': 1, 'failed': 1 }
+
+def test_an_open_circuit_stops_the_chain():
+    chain = ProviderChain( [ OpenCircuitProvider(), FakeProvider( 'corpus', {} ) ] )
+    results = chain.lookup_many( [ item('first', 0), item('second', 1) ] )
+    assert next(results) == ( 0, ( '5', 'first' ), 'scholar' )
+    with pytest.raises(CircuitOpenError):
+        next(results)
+
+def test_failed_lookups_are_not_journaled(tmp_path, retrieve_module):
+    path = str( tmp_path / 'article_citations.csv' )
+    lines = [ item(title, n)[1] for n, title in enumerate( [ 'known', 'failing', 'unknown' ] ) ]
+    chain = ProviderChain( [ FakeProvider( 'dump', { 'known': ( '3', 'known' ) }, failing=( 'failing', ) ) ] )
+    with JournaledResultWriter(path) as writer:
+        queries, answered, stats = retrieve_module.plan_queries(lines, writer)
+        assert retrieve_module.retrieve(writer, queries, chain) == 1
+
+    with JournaledResultWriter(path) as writer:
+        assert [ writer.is_done(line) for line in lines ] == [ True, False, True ]
+        queries, answered, stats = retrieve_module.plan_queries(lines, writer)
+        assert [ title for title, rows in queries ] == [ 'failing' ]
+
+def test_options_are_not_taken_for_provider_names(retrieve_module):
+    options = retrieve_module.parse_options( [ '--providers', 'dump', '--offline' ] )
+    assert ( options.providers, options.offline, options.dump ) == ( [ 'dump' ], True, retrieve_module.CITATION_DUMP )
+    options = retrieve_module.parse_options( [ '--providers', 'dump,scholar', '--dump', 'dump.csv', '--concurrent' ] )
+    assert ( options.providers, options.dump, options.concurrent ) == ( [ 'dump', 'scholar' ], 'dump.csv', 4 )
+
+def test_the_dump_index_is_rebuilt_when_the_dump_changes(tmp_path):
+    dump = str( tmp_path / 'dump.csv' )
+    with open(dump, 'w') as outfile:
+        outfile.write( 'citing,cited\n10.1/a,doi:10.1/x\n10.1/b,doi:10.1/x pmid:42\n' )
+    index = DumpIndex( dump + '.sqlite' )
+    assert not index.is_current(dump)
+    index.build(dump)
+    assert index.is_current(dump) and index.count( [ 'doi:10.1/x' ] ) == 2
+    index.close()
+
+    with open(dump, 'a') as outfile:
+        outfile.write( '10.1/c,10.1/X\n' )
+    os.utime( dump, ns=( 0, os.stat(dump).st_mtime_ns + 10**9 ) )
+    index = DumpIndex( dump + '.sqlite' )
+    assert not index.is_current(dump)
+    index.build(dump)
+    assert index.count( [ 'doi:10.1/x' ] ) == 3 and index.count( [ 'pmid:42' ] ) == 1
+    index.close()
+
+def test_a_failed_scholar_query_is_not_an_unknown_article(monkeypatch):
+    from citation_providers import ScholarProvider
+    def unreachable(querier, url, log_msg=None, timeout=None):
+        raise IOError('network is unreachable')
+    monkeypatch.setattr( scholar.ScholarConf, 'CACHE_FILE', None )
+    monkeypatch.setattr( scholar.ScholarQuerier, '_fetch', unreachable )
+    [ ( position, answer, error ) ] = list( ScholarProvider().lookup_many( [ item('a title', 0) ] ) )
+    assert answer is None and isinstance(error, IOError)
@@ -0,0 +1,40 @@
+from grant_index import GrantIndex, export_grants
+
+ROWS = [ [ 'RSG-1', 'articles.A-B\\Nat_Cell_Biol\\a1.nxml', 'SPARC and the cell cycle', 'nature cell biology', 'A Author & B Author', '12' ],
+         [ 'RSG-1', 'articles.O-Z\\Oncogene\\a2.nxml', 'A second title', 'oncogene', 'C Author', '' ],
+         [ 'IRG-2', 'articles.O-Z\\Oncogene\\a3.nxml', 'A third title, with "quotes"', 'oncogene', '', '3' ],
+         [ 'MRSG-é', 'articles.A-B\\Cell\\a4.nxml', 'Café au lait spots αβ', 'cell', 'D Åuthor', '7' ],
+         [ 'RSG-1', 'articles.A-B\\Cell\\a5.nxml', 'Rows of a grant which are not consecutive', 'cell', 'E Author', '1' ],
+         [ 'IRG-2' ] ]
+
+def expected(rows):
+    publications = {}
+    for row in rows:
+        if len(row) >= 2:
+            publications.setdefault( row[0], [] ).append( row[1:] )
+    return publications
+
+
+def test_every_grant_reads_back_as_exported(tmp_path):
+    path = str( tmp_path / 'grants.gidx' )
+    assert export_grants( iter(ROWS), path ) == 3
+    with GrantIndex(path) as index:
+        assert len(index) == 4 # RSG-1 has two runs of rows
+        assert index.grantIDs() == sorted( index.grantIDs(), key=lambda grantID: grantID.encode('utf-8') )
+        for grantID, publications in expected(ROWS).items():
+            assert index.lookup(grantID) == publications, grantID
+
+def test_an_unknown_grant_has_no_publications(tmp_path):
+    path = str( tmp_path / 'grants.gidx' )
+    export_grants( iter(ROWS), path )
+    with GrantIndex(path) as index:
+        assert index.lookup('AAA-0') == []
+        assert index.lookup('RSG-') == []
+        assert index.lookup('ZZZ-9') == []
+
+def test_an_empty_input_gives_an_empty_index(tmp_path):
+    path = str( tmp_path / 'grants.gidx' )
+    assert export_grants( iter([]), path ) == 0
+    with GrantIndex(path) as index:
+        assert len(index) == 0
+        assert index.lookup('RSG-1') == []
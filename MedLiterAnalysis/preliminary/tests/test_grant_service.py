@@ -0,0 +1,63 @@
+import json
+import pytest
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from grant_service import start_service, split_path
+from incremental_update import GrantStateStore
+
+NXML = '<article><front><journal-title>Oncogene</journal-title><title-group><article-title>A title</article-title></title-group></front><body><p>text</p></body></article>'
+
+@pytest.fixture
+def service(tmp_path):
+    server = start_service( GrantStateStore(0.5), str( tmp_path / 'grant_states.pkl' ), port=0, max_batch=2 )
+    yield 'http://127.0.0.1:%d' % server.server_port
+    server.shutdown()
+    server.server_close()
+
+def post(url, body):
+    try:
+        with urlopen( Request( url, data=body, method='POST' ), timeout=10 ) as response:
+            return response.status, json.loads( response.read() )
+    except HTTPError as err:
+        return err.code, json.loads( err.read() )
+
+
+def test_a_document_is_classified(service):
+    status, answer = post( service + '/classify', NXML.encode('utf-8') )
+    assert status == 200
+    assert answer['matches'] == [] and answer['error'] is None
+
+    status, answer = post( service + '/classify/batch', json.dumps( { 'documents': [ { 'id': 'a\\b\\c.nxml', 'nxml': NXML } ] } ).encode('utf-8') )
+    assert status == 200
+    assert [ result['id'] for result in answer['results'] ] == [ 'a\\b\\c.nxml' ]
+
+@pytest.mark.parametrize( 'body', [ b'not json', b'\xff\xfe', b'[]', b'[{"nxml": "<article/>"}]', b'{}', b'{"documents": "<article/>"}',
+                                    b'{"documents": [{"id": "a\\\\b\\\\c.nxml"}]}', b'{"documents": [{"nxml": 1}]}',
+                                    b'{"documents": ["<article/>"]}', b'{"documents": [{"id": 1, "nxml": "<article/>"}]}' ] )
+def test_a_malformed_batch_gets_400(service, body):
+    status, answer = post( service + '/classify/batch', body )
+    assert status == 400 and answer['error']
+
+def test_a_batch_too_large_gets_413(service):
+    documents = [ { 'nxml': NXML } ] * 3
+    status, answer = post( service + '/classify/batch', json.dumps( { 'documents': documents } ).encode('utf-8') )
+    assert status == 413
+
+@pytest.mark.parametrize( 'path', [ 'c.nxml', 'a\\c.nxml', 'a\\b\\c\\d.nxml', 'a\\\\c.nxml', 'a/b/c.nxml' ] )
+def test_an_accepted_path_not_of_three_parts_gets_400(service, path):
+    status, answer = post( service + '/classify?accept=1&path=' + path.replace('\\', '%5C'), NXML.encode('utf-8') )
+    assert status == 400
+    status, answer = post( service + '/classify/batch?accept=1', json.dumps( { 'documents': [ { 'id': path, 'nxml': NXML } ] } ).encode('utf-8') )
+    assert status == 400
+
+def test_the_service_still_answers_after_bad_requests(service):
+    for body in ( b'[]', b'{"documents": [{}]}' ):
+        post( service + '/classify/batch', body )
+    with urlopen( service + '/stats', timeout=10 ) as response:
+        stats = json.loads( response.read() )
+    assert stats['errors'] == 2 and stats['documents'] == 0
+
+def test_split_path():
+    assert split_path('articles.A-B\\Oncogene\\a.nxml') == [ 'articles.A-B', 'Oncogene', 'a.nxml' ]
+    with pytest.raises(ValueError):
+        split_path('Oncogene\\a.nxml')
@@ -0,0 +1,19 @@
+import csv
+from grant_statistics import GrantColumns, compute_report
+
+def write(path, rows):
+    with open( str(path), 'w', encoding="utf8", newline='' ) as outfile:
+        csv.writer(outfile).writerows(rows)
+
+def test_the_seeds_are_those_of_article_cite_ifr(tmp_path):
+    write( tmp_path / 'grants_final.csv', [ [ 'RSG-1', 'f\\j\\seed.nxml', 'Seed', 'oncogene', 'A', '12' ],
+                                            [ 'RSG-1', 'f\\j\\uncounted.nxml', 'Seed without a count', 'oncogene', 'A', '' ],
+                                            [ 'RSG-1', 'f\\j\\recalled.nxml', 'Recalled', 'oncogene', 'A', '' ] ] )
+    write( tmp_path / 'article_cite_ifr.csv', [ [ 'f', 'j', 'seed.nxml', 'Seed', 'oncogene', '6.8', 'RSG-1', '12', 'Seed' ],
+                                                [ 'f', 'j', 'uncounted.nxml', 'Seed without a count', 'oncogene', '6.8', 'RSG-1', '', 'Seed without a count' ],
+                                                [ 'f', 'j', 'recalled.nxml', 'Recalled', 'oncogene', '6.8', 'IRG-2' ] ] )
+    columns = GrantColumns.load( str( tmp_path / 'grants_final.csv' ), str( tmp_path / 'none.csv' ), str( tmp_path / 'article_cite_ifr.csv' ) )
+    assert list(columns.is_seed) == [ True, True, False ]
+    report = compute_report(columns)
+    assert ( report['seeds_vs_recalled']['seeds'], report['seeds_vs_recalled']['recalled'] ) == ( 2, 1 )
+    assert report['citations']['seeds']['n'] == 1
@@ -0,0 +1,36 @@
+from journal_index import JournalIndex
+
+
+def index_of(rows):
+    index = JournalIndex()
+    for name, value in rows:
+        index.add(name, value)
+    return index
+
+def test_a_fuzzy_match_needs_the_cutoff(tmp_path):
+    index = index_of( [ ( 'Cancer', '5.2' ), ( 'Nucleic Acids Research', '9.1' ) ] )
+    assert index.match('Nucleic Acds Research')[:2] == ( 'nucleic acids research', 'fuzzy' )
+    assert index.impact_factor('Nucleic Acds Research') == '9.1'
+
+    matched, how, similarity = index.match('Cancers')
+    assert ( matched, how ) == ( None, 'miss' ) and round(similarity, 2) == 0.8
+    assert index.impact_factor('Cancers') == ''
+
+    path = str( tmp_path / 'journal_misses.csv' )
+    assert index.write_report(path) == ( 1, 1 )
+    with open(path) as report:
+        assert report.readline().strip() == 'Cancers,1,miss,cancer,0.8'
+
+def test_a_name_as_close_to_two_journals_is_ambiguous(tmp_path):
+    index = index_of( [ ( 'International Journal of Oncology X', '2.0' ), ( 'International Journal of Oncology Y', '3.0' ) ] )
+    matched, how, similarity = index.match('International Journal of Oncology')
+    assert ( matched, how ) == ( None, 'ambiguous' ) and similarity > index.min_similarity
+    assert index.impact_factor('International Journal of Oncology') == ''
+    index.write_report( str( tmp_path / 'journal_misses.csv' ) )
+    with open( str( tmp_path / 'journal_misses.csv' ) ) as report:
+        assert report.readline().split(',')[2] == 'ambiguous'
+
+def test_exact_and_normalized_names_are_not_fuzzy():
+    index = index_of( [ ( 'ACS Chemical Biology', '5.0' ), ( 'Cancers', '6.1' ), ( 'Cancer', '5.2' ) ] )
+    assert index.match('acs chem. biol.')[:2] == ( 'acs chemical biology', 'normalized' )
+    assert index.impact_factor('Cancers') == '6.1' and index.impact_factor('CANCER') == '5.2'
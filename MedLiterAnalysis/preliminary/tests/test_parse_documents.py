@@ -0,0 +1,31 @@
+import multiprocessing, time
+from parse_documents import qualify_documents
+
+NXML = ( '<article><front><journal-title>Oncogene</journal-title><title-group><article-title>Title %d</article-title></title-group>'
+         '</front><body>%s</body></article>' )
+
+def documents(n, paragraphs=1):
+    return [ ( 'articles.O-Z/Oncogene/a%d.nxml' % i, ( NXML % ( i, '<p>text of the body</p>' * paragraphs ) ).encode('utf-8') ) for i in range(n) ]
+
+
+def test_the_workers_qualify_in_order():
+    serial = list( qualify_documents( documents(50) ) )
+    parallel = list( qualify_documents( documents(50), workers=2, chunksize=4 ) )
+    assert parallel == serial
+    assert [ record.path for record in serial ] == [ path for path, data in documents(50) ]
+
+def test_the_workers_are_terminated_when_the_consumer_stops_early():
+    document = documents(1, paragraphs=20000)[0]
+    records = qualify_documents( [document] * 2000, workers=2, chunksize=1 ) # seconds of work left after the first record
+    next(records)
+    start = time.time()
+    records.close()
+    assert time.time() - start < 1
+    assert multiprocessing.active_children() == []
+
+def test_the_cleaning_of_a_body_is_timed_as_clean():
+    from run_metrics import METRICS
+    from tfidf_vectorizer import extract_body
+    METRICS.reset()
+    assert extract_body( '<body><p>caf&eacute; <italic>text</italic></p></body>' ) == 'café text'
+    assert METRICS.to_dict('test')['stages']['clean']['calls'] == 1
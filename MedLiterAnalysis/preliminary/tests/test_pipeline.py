@@ -0,0 +1,113 @@
+import importlib, json, sys
+import pytest
+from pipeline import Pipeline, Stage
+from digests import file_digest
+
+
+def counting_pipeline(consumed):
+    def numbers():
+        for n in range(5):
+            consumed.append(n)
+            yield n
+    pipeline = Pipeline()
+    pipeline.add( Stage( 'numbers', [], numbers, materialize=lambda records: None ) )
+    pipeline.add( Stage( 'total', ['numbers'], sum, iterates=['numbers'] ) )
+    return pipeline
+
+def test_an_iterator_is_handed_to_its_only_reader():
+    consumed = []
+    records = counting_pipeline(consumed).run()
+    assert records == { 'total': 10 } and consumed == [0, 1, 2, 3, 4]
+
+def test_an_iterator_is_listed_when_it_is_materialized_or_the_target():
+    records = counting_pipeline([]).run( materialize=['numbers'] )
+    assert records == { 'numbers': [0, 1, 2, 3, 4], 'total': 10 }
+    assert counting_pipeline([]).run( ['numbers'] ) == { 'numbers': [0, 1, 2, 3, 4] }
+
+def test_an_iterator_read_by_two_stages_is_listed():
+    pipeline = counting_pipeline([])
+    pipeline.add( Stage( 'largest', ['numbers'], max, iterates=['numbers'] ) )
+    assert pipeline.run() == { 'numbers': [0, 1, 2, 3, 4], 'total': 10, 'largest': 4 }
+
+
+""" the cache: numbers (read from numbers.txt) -> scaled (by factor, plus OFFSET of a module) -> total """
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    ( tmp_path / 'numbers.txt' ).write_text('1\n2\n3\n')
+    ( tmp_path / 'pipeline_cache_helper.py' ).write_text('OFFSET = 0\n')
+    monkeypatch.syspath_prepend( str(tmp_path) )
+    monkeypatch.delitem( sys.modules, 'pipeline_cache_helper', raising=False ) # another test's, and this one's afterwards
+    importlib.invalidate_caches()
+    return tmp_path
+
+def cached_pipeline(workdir, calls, factor=1):
+    helper = importlib.import_module('pipeline_cache_helper')
+    def stored(name):
+        path = str( workdir / ( name + '.json' ) )
+        def materialize(records):
+            with open(path, 'w') as outfile:
+                json.dump(records, outfile)
+        def load():
+            with open(path, 'r') as infile:
+                return json.load(infile)
+        return dict( materialize=materialize, load=load, outputs=[path] )
+    def numbers():
+        calls.append('numbers')
+        return [ int(line) for line in ( workdir / 'numbers.txt' ).read_text().split() ]
+    def scaled(numbers):
+        calls.append('scaled')
+        return [ n * factor + helper.OFFSET for n in numbers if n >= 0 ]
+    def total(scaled):
+        calls.append('total')
+        return sum(scaled)
+    pipeline = Pipeline()
+    pipeline.add( Stage( 'numbers', [], numbers, sources=lambda: { 'numbers.txt': file_digest( str( workdir / 'numbers.txt' ) ) }, **stored('numbers') ) )
+    pipeline.add( Stage( 'scaled', ['numbers'], scaled, modules=['pipeline_cache_helper'], params={ 'factor': factor },
+                         uses={ 'numbers': lambda numbers: [ n for n in numbers if n >= 0 ] }, **stored('scaled') ) )
+    pipeline.add( Stage( 'total', ['scaled'], total, **stored('total') ) )
+    return pipeline
+
+def run(workdir, factor=1, **options):
+    calls = []
+    records = cached_pipeline(workdir, calls, factor).run( cache=True, state_path=str( workdir / 'state.json' ), **options )
+    return calls, records
+
+def test_an_unchanged_stage_is_loaded_not_run(workdir):
+    assert run(workdir) == ( [ 'numbers', 'scaled', 'total' ], { 'numbers': [1, 2, 3], 'scaled': [1, 2, 3], 'total': 6 } )
+    assert run(workdir) == ( [], { 'numbers': [1, 2, 3], 'scaled': [1, 2, 3], 'total': 6 } )
+    assert cached_pipeline(workdir, []).dry_run( state_path=str( workdir / 'state.json' ) ) == [
+        ( 'numbers', 'skip', [] ), ( 'scaled', 'skip', [] ), ( 'total', 'skip', [] ) ]
+
+def test_a_param_change_reruns_the_stage_and_its_dependents(workdir):
+    run(workdir)
+    assert [ ( name, action ) for name, action, reasons in cached_pipeline(workdir, [], factor=2).dry_run( state_path=str( workdir / 'state.json' ) ) ] == [
+        ( 'numbers', 'skip' ), ( 'scaled', 'run' ), ( 'total', 'maybe' ) ]
+    calls, records = run(workdir, factor=2)
+    assert calls == [ 'scaled', 'total' ] and records['total'] == 12
+    assert run(workdir, factor=2)[0] == []
+
+def test_a_module_change_reruns_the_stage_and_its_dependents(workdir):
+    run(workdir)
+    ( workdir / 'pipeline_cache_helper.py' ).write_text('OFFSET = 10\n')
+    importlib.reload( importlib.import_module('pipeline_cache_helper') )
+    calls, records = run(workdir)
+    assert calls == [ 'scaled', 'total' ] and records['total'] == 36
+
+def test_a_source_change_reruns_every_stage_after_it(workdir):
+    run(workdir)
+    ( workdir / 'numbers.txt' ).write_text('1\n2\n3\n4\n')
+    calls, records = run(workdir)
+    assert calls == [ 'numbers', 'scaled', 'total' ] and records['total'] == 10
+
+def test_an_input_change_outside_what_a_stage_uses_does_not_rerun_it(workdir):
+    run(workdir)
+    ( workdir / 'numbers.txt' ).write_text('1\n2\n3\n-4\n')
+    calls, records = run(workdir)
+    assert calls == [ 'numbers' ] and records['numbers'] == [1, 2, 3, -4] and records['total'] == 6
+
+def test_a_changed_output_and_force_rerun_the_stage(workdir):
+    run(workdir)
+    ( workdir / 'scaled.json' ).write_text('[1, 2, 30]')
+    assert run(workdir)[0] == [ 'scaled' ] # its output is the same as recorded, so total is loaded
+    assert run( workdir, force=['numbers'] )[0] == [ 'numbers' ]
@@ -0,0 +1,77 @@
+import csv
+from result_writer import JournaledResultWriter
+
+def article(n, title=None):
+    return [ 'folder', 'Journal', 'article%d.nxml' % n, title or 'Title number %d' % n, 'Author A', 'grant' ]
+
+def rows(path):
+    with open(path, 'r', encoding="utf8", newline='') as infile:
+        return list( csv.reader(infile) )
+
+
+def test_resume_knows_the_committed_rows(tmp_path):
+    path = str( tmp_path / 'article_citations.csv' )
+    with JournaledResultWriter(path, batch_size=2) as writer:
+        writer.write( article(1), '12', 'Title number 1' )
+        writer.write( article(2), '', '' )
+        writer.write( article(3), '7', 'Title number 3' )
+
+    writer = JournaledResultWriter(path, batch_size=2)
+    assert [ writer.is_done( article(n) ) for n in (1, 2, 3, 4) ] == [ True, True, True, False ]
+    assert writer.answer( article(5, 'TITLE number 1.') ) == ( '12', 'Title number 1' )
+    assert writer.recovered_bytes == 0
+    writer.close()
+    assert len( rows(path) ) == 3
+
+def test_a_batch_cut_by_a_crash_is_dropped(tmp_path):
+    path = str( tmp_path / 'article_citations.csv' )
+    writer = JournaledResultWriter(path, batch_size=2)
+    writer.write( article(1), '12', 'Title number 1' )
+    writer.write( article(2), '3', 'Title number 2' )
+    """ the next batch reached the file but its commit line never reached the journal """
+    writer.write( article(3), '7', 'Title number 3' )
+    writer.outfile.write( writer.buffer.getvalue().encode('utf8')[:-9] )
+    writer.outfile.flush()
+    writer.journal_writer.writerow( [ 999, 'folder', 'Journal', 'article3.nxml', 'title number 3', '7', 'Title number 3' ] )
+    writer.journal.flush()
+
+    resumed = JournaledResultWriter(path, batch_size=2)
+    assert resumed.recovered_bytes > 0
+    assert not resumed.is_done( article(3) )
+    resumed.write( article(3), '7', 'Title number 3' )
+    resumed.close()
+    assert [ line[2] for line in rows(path) ] == [ 'article1.nxml', 'article2.nxml', 'article3.nxml' ]
+    assert JournaledResultWriter(path).is_done( article(3) )
+
+def test_a_file_without_journal_is_indexed(tmp_path):
+    path = tmp_path / 'article_citations.csv'
+    with open( str(path), 'w', encoding="utf8", newline='' ) as outfile:
+        csv.writer(outfile).writerows( [ article(1) + [ '4', 'Title number 1' ], article(2) ] )
+    writer = JournaledResultWriter( str(path) )
+    assert writer.is_done( article(1) ) and writer.is_done( article(2) )
+    assert writer.answer( article(1) ) == ( '4', 'Title number 1' )
+    writer.close()
+
+def test_a_file_rewritten_longer_is_indexed_again(tmp_path):
+    """ e.g. addNew_article_citations regenerating it from more qualified articles, with the journal left behind """
+    path = str( tmp_path / 'article_citations.csv' )
+    with JournaledResultWriter(path, batch_size=2) as writer:
+        writer.write( article(1), '12', 'Title number 1' )
+        writer.write( article(2), '3', 'Title number 2' )
+    with open( path, 'w', encoding="utf8", newline='' ) as outfile:
+        csv.writer(outfile, lineterminator='\n').writerows( [ article(n) for n in (1, 2, 3, 4) ] )
+
+    writer = JournaledResultWriter(path, batch_size=2)
+    assert writer.recovered_bytes == 0
+    assert writer.answer( article(1) ) == ( '', '' )
+    writer.close()
+    assert [ line[2] for line in rows(path) ] == [ 'article%d.nxml' % n for n in (1, 2, 3, 4) ]
+
+def test_a_file_without_rows_is_kept(tmp_path):
+    path = tmp_path / 'article_citations.csv'
+    path.write_text('a header,of fewer columns\n')
+    writer = JournaledResultWriter( str(path) )
+    assert writer.recovered_bytes == 0 and not writer.done
+    writer.close()
+    assert path.read_text() == 'a header,of fewer columns\n'
+    assert JournaledResultWriter( str(path) ).recovered_bytes == 0
@@ -0,0 +1,81 @@
+import sqlite3, time, zlib
+import scholar
+from scholar_cache import ScholarResponseCache, shared_cache
+
+URL = 'https://scholar.google.com/scholar?q=tumour+microenvironment&hl=en'
+CAPTCHA = b'<html><body><div id="gs_captcha_f">Please show you\'re not a robot</div></body></html>'
+
+
+def test_blocked_pages_are_not_stored(tmp_path):
+    cache = ScholarResponseCache( str( tmp_path / 'cache.sqlite' ) )
+    assert cache.put(URL, CAPTCHA) is False
+    assert cache.get(URL) is None and len(cache) == 0
+    assert cache.put(URL, b'<html>results</html>') is True
+    assert cache.get(URL) == b'<html>results</html>'
+
+def test_only_the_structure_of_a_captcha_page_blocks(tmp_path):
+    from scholar_cache import is_blocked_page
+    from scholar_stub_server import CAPTCHA_PAGE
+    result = ( b'<html><body><div class="gs_r gs_or gs_scl"><h3 class="gs_rt"><a href="/x">Unusual traffic '
+               b'patterns in hospital admissions</a></h3><div class="gs_rs">... detected unusual traffic from '
+               b'the ward, see <a href="https://example.org/sorry/">the note</a> ...</div></div></body></html>' )
+    assert not is_blocked_page(result) and is_blocked_page(CAPTCHA_PAGE) and is_blocked_page(CAPTCHA)
+    assert is_blocked_page( b'<form action="/sorry/index" method="post"></form>' )
+    cache = ScholarResponseCache( str( tmp_path / 'cache.sqlite' ) )
+    assert cache.put(URL, result) is True and cache.get(URL) == result
+
+def test_a_stored_blocked_page_is_dropped(tmp_path):
+    """ the cache of a version which stored them """
+    path = str( tmp_path / 'cache.sqlite' )
+    cache = ScholarResponseCache(path)
+    conn = sqlite3.connect(path)
+    conn.execute( 'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)', ( cache.key(URL), URL, time.time(), time.time(), 1, zlib.compress(CAPTCHA) ) )
+    conn.commit()
+    conn.close()
+    assert cache.get(URL) is None
+    assert len(cache) == 0
+
+def test_queriers_share_one_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr( scholar.ScholarConf, 'CACHE_FILE', str( tmp_path / 'cache.sqlite' ) )
+    first, second = scholar.ScholarQuerier(), scholar.ScholarQuerier()
+    assert first.cache is second.cache
+    assert shared_cache( str( tmp_path / 'cache.sqlite' ) ) is first.cache
+
+def test_the_total_size_is_kept_and_the_least_recently_used_are_evicted(tmp_path, monkeypatch):
+    path = str( tmp_path / 'cache.sqlite' )
+    cache = ScholarResponseCache(path, max_bytes=2200, compress_level=0)
+    clock = iter( range(1000, 2000) )
+    monkeypatch.setattr( 'scholar_cache.time.time', lambda: next(clock) )
+    def total():
+        return cache.conn.execute( 'SELECT COALESCE(SUM(size), 0) FROM responses' ).fetchone()[0]
+    urls = [ URL + '&start=%d' % i for i in range(6) ]
+    for url in urls[:3]:
+        cache.put(url, b'x' * 500)
+    cache.put(urls[0], b'y' * 600) # replaced, the total counts it once
+    assert cache.total_bytes() == total() < 2200 and len(cache) == 3
+    cache.get(urls[1])
+    for url in urls[3:]:
+        cache.put(url, b'z' * 500)
+    assert cache.total_bytes() == total() <= 2200
+    """ urls[2] and then urls[0] were the least recently used """
+    assert [ cache.get(url) is not None for url in urls ] == [ False, True, False, True, True, True ]
+    cache.close()
+    assert ScholarResponseCache(path).total_bytes() == total_of(path)
+
+def total_of(path):
+    conn = sqlite3.connect(path)
+    total = conn.execute( 'SELECT COALESCE(SUM(size), 0) FROM responses' ).fetchone()[0]
+    conn.close()
+    return total
+
+def test_the_total_of_a_file_from_before_the_usage_table(tmp_path):
+    path = str( tmp_path / 'cache.sqlite' )
+    conn = sqlite3.connect(path)
+    conn.execute( 'CREATE TABLE responses (key TEXT PRIMARY KEY, url TEXT, stored REAL, accessed REAL, size INTEGER, body BLOB)' )
+    conn.execute( 'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)', ( 'k', URL, time.time(), time.time(), 123, zlib.compress(b'x') ) )
+    conn.commit()
+    conn.close()
+    cache = ScholarResponseCache(path)
+    assert cache.total_bytes() == 123
+    cache.put(URL, b'<html>results</html>')
+    assert cache.total_bytes() == total_of(path)
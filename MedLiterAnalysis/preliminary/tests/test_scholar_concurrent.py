@@ -0,0 +1,71 @@
+import pytest
+from urllib.error import HTTPError
+import scholar
+from scholar_concurrent import ConcurrentScholarQuerier, CircuitOpenError
+from scholar_stub_server import start_server
+
+TITLES = [ 'matricellular proteins in the tumour microenvironment %d' % i for i in range(40) ]
+
+
+@pytest.fixture
+def stub():
+    servers = []
+    def start(**options):
+        servers.append( start_server(**options) )
+        return 'http://127.0.0.1:%d' % servers[-1].server_port
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def engine(site, **options):
+    settings = dict( workers=4, rate=1000.0, burst=4, max_retries=1, backoff=0.01, max_backoff=0.01,
+                     failure_threshold=3, reset_timeout=60.0, timeout=5.0, site=site )
+    settings.update(options)
+    return ConcurrentScholarQuerier(**settings)
+
+def test_answers_are_yielded_in_order(stub):
+    results = list( engine( stub() ).map(TITLES[:8]) )
+    assert [ title for title, answer, error in results ] == TITLES[:8]
+    assert all( error is None and answer[1] for title, answer, error in results )
+
+def test_an_open_circuit_stops_the_run(stub):
+    """ a Scholar which fails every request: no title may come back as answered with no result """
+    results = []
+    with pytest.raises(CircuitOpenError):
+        for result in engine( stub(error_rate=1.0) ).map(TITLES):
+            results.append(result)
+    assert all( answer is None and error is not None for title, answer, error in results )
+    assert len(results) < len(TITLES)
+
+def test_a_failed_query_is_a_failure_not_an_empty_answer(stub, monkeypatch):
+    site = stub()
+    fetch = scholar.ScholarQuerier._fetch
+    def failing_fetch(querier, url, log_msg=None, timeout=None):
+        if 'failing' in url:
+            raise HTTPError(url, 404, 'Not Found', {}, None)
+        return fetch(querier, url, log_msg, timeout)
+    monkeypatch.setattr( scholar.ScholarQuerier, '_fetch', failing_fetch )
+    results = list( engine(site, failure_threshold=100).map( [ 'a working title', 'a failing title', 'another working title' ] ) )
+    assert [ error is None for title, answer, error in results ] == [ True, False, True ]
+    assert results[1][1] is None and isinstance( results[1][2], HTTPError )
+
+def test_a_captcha_page_is_a_failure(stub, tmp_path, monkeypatch):
+    site = stub(blocked_rate=1.0)
+    monkeypatch.setattr( scholar.ScholarConf, 'CACHE_FILE', str( tmp_path / 'cache.sqlite' ) )
+    with pytest.raises(scholar.BlockedError):
+        scholar.ScholarQuerier(raise_errors=True)._get_http_response( site + '/scholar?q=blocked' )
+
+    querier = engine(site)
+    with pytest.raises(CircuitOpenError):
+        list( querier.map(TITLES) )
+    assert querier.stats['retries'] > 0 and querier.breaker.failures >= 3
+    assert len( querier.session.cache ) == 0
+
+def test_the_queries_are_timed_as_in_scholar_main(stub):
+    from run_metrics import METRICS as RUN_METRICS
+    RUN_METRICS.reset()
+    list( engine( stub() ).map(TITLES[:6]) )
+    report = RUN_METRICS.to_dict('scholar_concurrent')
+    assert report['stages']['query']['calls'] == 6
+    assert report['stages']['match']['calls'] == 6
+    assert report['counters']['titles'] == 6
@@ -0,0 +1,40 @@
+import os, warnings
+import pytest
+import scholar_fastparse
+from scholar_fastparse import parse_articles, article_attrs
+
+PAGES = os.path.join( os.path.dirname(__file__), 'fixtures', 'scholar_pages' )
+BACKENDS = [ 'stream', pytest.param( 'lxml', marks=pytest.mark.skipif( scholar_fastparse.lxml is None, reason='lxml is not installed' ) ) ]
+
+
+def page(name):
+    with open( os.path.join(PAGES, name), 'rb' ) as infile:
+        return infile.read()
+
+def reference(html):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore') # BeautifulSoup guessing its parser
+        return article_attrs( parse_articles(html, 'bs4') )
+
+@pytest.mark.parametrize( 'name', sorted( name for name in os.listdir(PAGES) if name.endswith('.html') ) )
+@pytest.mark.parametrize( 'backend', BACKENDS )
+def test_backend_gives_the_attrs_of_beautifulsoup(name, backend):
+    html = page(name)
+    assert article_attrs( parse_articles(html, backend) ) == reference(html)
+
+@pytest.mark.parametrize( 'backend', BACKENDS )
+def test_the_cases_of_the_layout(backend):
+    basic = article_attrs( parse_articles( page('basic.html'), backend ) )
+    assert basic[0]['title'] == 'Matricellular proteins: extracellular modulators of cell function'
+    assert ( basic[0]['num_citations'], basic[0]['num_versions'], basic[0]['year'] ) == ( 1231, 9, '2002' )
+    assert 'num=' not in basic[0]['url_citations'] and basic[0]['url_citation'].startswith('http://scholar.google.com/scholar.bib')
+    assert basic[1]['title'] == 'The tumour microenvironment & the "seed and soil" hypothesis – revisited'
+
+    citation = article_attrs( parse_articles( page('citation.html'), backend ) )
+    assert citation[0]['title'].startswith('Honeycomb') and citation[0]['url'] is None
+    assert citation[1]['title'] == 'Molecular biology of the cell' and citation[1]['year'] is None
+    assert citation[2]['num_citations'] == 0 and citation[2]['cluster_id'] is None
+
+    pdf = article_attrs( parse_articles( page('pdf.html'), backend ) )
+    assert len(pdf) == 2 # the query suggestion is a gs_r without a title
+    assert pdf[1]['url_pdf'] == pdf[1]['url']
@@ -0,0 +1,30 @@
+import numpy as np
+from extend_known_grants import Grant, Publication
+from tfidf_vectorizer import seed_centroid
+from threshold_sweep import SimilarityTable, sweep
+
+
+def publication(name, seed):
+    line = [ 'articles.A-B', 'J', name, 'title ' + name, 'journal' ]
+    return Publication( line + [ '', 'RSG-1', '10' ] if seed else line )
+
+def test_centroid_does_not_change_the_vector_of_a_single_seed():
+    grant = Grant('RSG-1')
+    seed = publication('a.nxml', True)
+    seed.vector = np.array( [ 1.0, 2.0 ] )
+    grant.addPublication(seed)
+    centroid, seeds = seed_centroid(grant)
+    assert seeds == [seed]
+    assert list( seed.vector ) == [ 1.0, 2.0 ]
+    assert centroid is not seed.vector
+
+def test_sweep_compares_in_float64_as_tfidf_vectorizer(tmp_path):
+    """ recalled as in tfidf_vectorizer (score >= threshold in float64): 0.89999999 is 0.9 in float32 """
+    table = SimilarityTable()
+    table.add_grant( 'RSG-1', [ publication('seed.nxml', True) ], [ ( publication('at.nxml', False), 0.9 ),
+                                                                     ( publication('below.nxml', False), 0.89999999 ) ] )
+    table.save( str( tmp_path / 'similarities.npz' ) )
+    distributions = sweep( SimilarityTable.load( str( tmp_path / 'similarities.npz' ) ), [ 0.9 ], str( tmp_path / 'grants_final_%s.csv' ) )
+    assert distributions[0.9] == { 2: 1 }
+    rows = ( tmp_path / 'grants_final_0.9.csv' ).read_text().splitlines()
+    assert [ row.split(',')[1] for row in rows ] == [ 'articles.A-B\\J\\seed.nxml', 'articles.A-B\\J\\at.nxml' ]
@@ -0,0 +1,81 @@
+import csv
+from store import Store, load_files, export
+
+FILES = {
+    'journal_impactfactor': [ [ 'Nature Cell Biology', '20.767' ], [ 'Nature cell biology', '20.767' ], [ 'Oncogene', '6.854' ], [ 'Cancers' ] ],
+    'qualified_articles': [ [ 'articles.A-B', 'Nat_Cell_Biol', 'a1.nxml', 'SPARC and the  cell cycle', 'nature cell biology', 'RSG-1' ],
+                            [ 'articles.O-Z', 'Oncogene', 'a2.nxml', 'A second title', 'oncogene', 'RSG-1' ],
+                            [ 'articles.O-Z', 'Oncogene', 'a3.nxml', 'A third title', 'oncogene', 'IRG-2' ] ],
+    'article_citations': [ [ 'articles.A-B', 'Nat_Cell_Biol', 'a1.nxml', 'SPARC and the cell cycle', 'nature cell biology', 'RSG-1', '12', 'SPARC and the cell cycle' ],
+                           [ 'articles.O-Z', 'Oncogene', 'a2.nxml', 'A second title', 'oncogene', 'RSG-1' ],
+                           [ 'articles.O-Z', 'Oncogene', 'a3.nxml', 'A third title', 'oncogene', 'IRG-2', '3', 'A third title' ] ],
+    'grants_final': [ [ 'RSG-1', 'articles.A-B\\Nat_Cell_Biol\\a1.nxml', 'SPARC and the  cell cycle', 'nature cell biology', 'A Author & B Author', '' ],
+                      [ 'IRG-2', 'articles.O-Z\\Oncogene\\a3.nxml', 'A third title', 'oncogene', 'C Author', '3' ] ],
+}
+
+def write(path, rows):
+    with open( str(path), 'w', encoding="utf8", newline='' ) as outfile:
+        csv.writer(outfile).writerows(rows)
+
+def read(path):
+    with open( str(path), 'r', encoding="utf8" ) as infile:
+        return list( csv.reader(infile) )
+
+def loaded_store(tmp_path):
+    for name, rows in FILES.items():
+        write( tmp_path / ( name + '.csv' ), rows )
+    store = Store( str( tmp_path / 'medliter.sqlite' ) )
+    load_files( store, str(tmp_path) )
+    return store
+
+
+def test_the_files_are_exported_as_they_were_loaded(tmp_path):
+    store = loaded_store(tmp_path)
+    for name, rows in FILES.items():
+        export( store, name, str( tmp_path / 'exported.csv' ) )
+        assert read( tmp_path / 'exported.csv' ) == rows, name
+    assert list( store.article_cite_ifr() ) == [ FILES['article_citations'][0][:5] + [ '20.767' ] + FILES['article_citations'][0][5:],
+                                                 FILES['article_citations'][1][:5] + [ '6.854', 'RSG-1' ],
+                                                 FILES['article_citations'][2][:5] + [ '6.854' ] + FILES['article_citations'][2][5:] ]
+    assert sorted( store.articleCiteIf() ) == [ [ 'IRG-2', 'Cited by: 3  Impact Factor: 6.854' ],
+                                                [ 'RSG-1', 'Cited by: 12  Impact Factor: 20.767' ] ]
+    store.close()
+
+def test_updates_and_the_settings_of_the_connection(tmp_path):
+    store = loaded_store(tmp_path)
+    assert store.conn.execute( 'PRAGMA synchronous' ).fetchone()[0] != 0 # restored after the bulk loads
+    store.set_citations( 'articles.O-Z\\Oncogene\\a2.nxml', '7', 'A second title' )
+    store.set_impact_factor( 'Oncogene', '7.0' )
+    rows = list( store.article_cite_ifr() )
+    assert rows[1] == [ 'articles.O-Z', 'Oncogene', 'a2.nxml', 'A second title', 'oncogene', '7.0', 'RSG-1', '7', 'A second title' ]
+    assert [ line[0] for line in store.journal_impactfactor() ] == [ 'Nature Cell Biology', 'Nature cell biology', 'Oncogene', 'Cancers' ]
+    store.close()
+
+def test_an_impact_factor_matches_only_the_articles_it_can_take(tmp_path, monkeypatch):
+    store = loaded_store(tmp_path)
+    store.load_articles( [ [ 'articles.C-H', 'Cell_Rep', 'a4.nxml', 'A fourth title', 'Cell Reports', 'IRG-2' ] ] )
+    assert list( store.article_cite_ifr() )[3][5] == ''
+
+    def no_index(*args):
+        raise AssertionError('the journal index is built again')
+    monkeypatch.setattr( 'store.JournalIndex', no_index )
+    matched = []
+    match_articles = Store._match_articles
+    monkeypatch.setattr( Store, '_match_articles', lambda self, journals: matched.append( sorted(journals) ) or match_articles(self, journals) )
+
+    store.set_impact_factor( 'Oncogene', '7.0' ) # known before and after: nothing is matched again
+    assert matched == []
+    store.set_impact_factor( 'Cell Reports', '8.1' )
+    assert matched == [ [ 'Cell Reports' ] ]
+    rows = list( store.article_cite_ifr() )
+    assert [ line[5] for line in rows ] == [ '20.767', '7.0', '7.0', '8.1' ]
+    store.close()
+
+def test_a_partial_reload_of_grants_final_does_not_interleave(tmp_path):
+    store = loaded_store(tmp_path)
+    store.load_grants_final( [ [ 'RSG-1', 'articles.O-Z\\Oncogene\\a2.nxml', 'A second title', 'oncogene', 'D Author', '' ],
+                               [ 'RSG-1', 'articles.A-B\\Nat_Cell_Biol\\a1.nxml', 'SPARC and the  cell cycle', 'nature cell biology', 'A Author', '12' ] ] )
+    assert [ ( line[0], line[1] ) for line in store.grants_final() ] == [ ( 'IRG-2', 'articles.O-Z\\Oncogene\\a3.nxml' ),
+                                                                         ( 'RSG-1', 'articles.O-Z\\Oncogene\\a2.nxml' ),
+                                                                         ( 'RSG-1', 'articles.A-B\\Nat_Cell_Biol\\a1.nxml' ) ]
+    store.close()
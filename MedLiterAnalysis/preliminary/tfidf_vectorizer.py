@@ -3,39 +3,53 @@ Created on Mar 17, 2015
 
 @author: Wang
 '''
-import pickle
+import pickle, sys
 from nltk import word_tokenize
-from extend_known_grants import Grant, findRegexPattern
+from extend_known_grants import Grant, findRegexPattern, publication_file, DATA_ROOT
 from parse_documents import remove_tags
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from threshold_sweep import SimilarityTable
+from run_metrics import METRICS
 
-def body_vector(grant):
-    tfidfVectorizer = TfidfVectorizer( stop_words='english', 
-                                       tokenizer=word_tokenize, ngram_range=(1, 3), max_features=100 )
-    root = "J:\\Medical Papers Data\\"
+def extract_body(fdata):
+    body = findRegexPattern( "<body[\s\S]*?>([\s\S]*?)</body>", fdata )
+    if body:
+        body = remove_tags(body[0]) # Some bodies which were not empty become empty here. The reason is the text between the body tags are HTML tags
+                                    # e.g. J:\Medical Papers Data\articles.C-H\\Environ_Health_Perspect\Environ_Health_Perspect_1997_May_105(5)_514-520.nxml
+        return body
+    return None
+
+def new_body_vectorizer():
+    return TfidfVectorizer( stop_words='english', 
+                            tokenizer=word_tokenize, ngram_range=(1, 3), max_features=100 )
+
+def fit_body_vectors(grant, root=DATA_ROOT):
+    """ fit a vectorizer on the bodies of the publications of a grant, set 'vector' of each publication and return the vectorizer """
+    tfidfVectorizer = new_body_vectorizer()
     pub_body = []
     for publication in grant.publications:
-        file_path = root + publication.relative_path
-        fdata = open(file_path, 'r').read()
-        body = findRegexPattern( "<body[\s\S]*?>([\s\S]*?)</body>", fdata )
-        
-        if body:
-            body = remove_tags(body[0]) # Some bodies which were not empty become empty here. The reason is the text between the body tags are HTML tags
-                                        # e.g. J:\Medical Papers Data\articles.C-H\\Environ_Health_Perspect\Environ_Health_Perspect_1997_May_105(5)_514-520.nxml
-            pub_body.append(body)
-        else:
-            pub_body.append(None)
+        file_path = publication_file(publication.relative_path, root)
+        with METRICS.stage('read'):
+            fdata = open(file_path, 'r').read()
+        with METRICS.stage('extract'):
+            pub_body.append( extract_body(fdata) )
             
-    tfidfVectorizer.fit( [b for b in pub_body if b ] )
+    with METRICS.stage('vectorize'):
+        tfidfVectorizer.fit( [b for b in pub_body if b ] )
     
     for index, body in enumerate( pub_body ):
         if not body:
             grant.publications[index].vector = None
             continue
-        vec = tfidfVectorizer.transform([body])
+        with METRICS.stage('vectorize'):
+            vec = tfidfVectorizer.transform([body])
         grant.publications[index].vector = vec
         
+    return tfidfVectorizer
+
+def body_vector(grant, root=DATA_ROOT):
+    fit_body_vectors(grant, root)
     return grant
 
 def initial_new_grant(grant_old, seeds):
@@ -45,59 +59,112 @@ def initial_new_grant(grant_old, seeds):
         grant_new.addPublication(pub)
     return grant_new
 
-if __name__=='__main__':
-    
-    grant_withCandiPubs = pickle.load( open('../grantsWithCandiPubs.pkl', 'rb') ) # The pkl file is created in 'extend_known_grants'
-    simi_threshold = 0.9
-    
+def seed_centroid(grant):
+    """ compute the centroid of the seed publications which have vectors """
+    seed_vector = None
+    num_of_seeds = 1
+    pub_seeds = []
+    for pub in grant.publications:
+        if not pub.isSeed:
+            continue
+        pub_seeds.append(pub)
+        if pub.vector is None:
+            continue
+        if seed_vector is None:
+            seed_vector = pub.vector
+        else:
+            seed_vector = seed_vector + pub.vector
+        num_of_seeds += 1
+    if seed_vector is not None:
+        seed_vector = seed_vector / num_of_seeds # not in place: with one seed it is the vector of that publication
+    return seed_vector, pub_seeds
+
+def score_candidates(grant, seeds=None):
+    """ 
+    Return the seed publications of a vectorized grant and the (pub, similarity) pairs 
+    of its candidate publications, the most similar first.
+    seeds: the (seed vector, seeds) of seed_centroid(grant) if it has been computed already
+    """
+    seed_vector, pub_seeds = seeds if seeds is not None else seed_centroid(grant)
+    similarity_to_seed = []
+    if seed_vector is None:
+        return pub_seeds, similarity_to_seed
+    for pub in grant.publications:
+        if pub in pub_seeds or pub.vector is None:
+            continue
+        with METRICS.stage('score'):
+            similarity = cosine_similarity( pub.vector, seed_vector )
+        similarity_to_seed.append( (pub, similarity[0][0]) )
+    similarity_to_seed = sorted( similarity_to_seed, key=lambda x:x[1], reverse=True )
+    return pub_seeds, similarity_to_seed
+
+def recall_publications(grant, pub_seeds, similarity_to_seed, simi_threshold):
+    grant_new = initial_new_grant( grant, pub_seeds )
+    for pub, simi in similarity_to_seed:
+        if simi < simi_threshold:
+            break
+        grant_new.addPublication(pub)
+    return grant_new
+
+def recall_grant_publications(grants, simi_threshold=0.9, store=None, duplicate_map={}, similarities=None, root=DATA_ROOT):
+    """
+    Returns the grants with their recalled publications.
+    store: an 'embedding_store' EmbeddingStore to score with the dense body embeddings instead of TF-IDF
+    similarities: a 'threshold_sweep' SimilarityTable to keep the similarities of all candidates in
+    """
+    from near_duplicates import collapse_duplicates
     n = 0
     grants_final = []
-    for grant in grant_withCandiPubs:
+    for grant in grants:
         n += 1
+        METRICS.count('grants')
         print("*** GRANT", n)
+        grant = collapse_duplicates(grant, duplicate_map)
         print(len(grant.publications), "publications in this grant")
-        grant = body_vector(grant)
-        print(len( [ 1 for pub in grant.publications if pub.vector != None ] ), "publications have vectors")
-        
-        # find seed publications whcih have grant ID
-        seed_vector = None
-        num_of_seeds = 1
-        pub_seeds = []
-        for index, pub in enumerate( grant.publications ):
-            if not pub.isSeed:
-                continue
-            if seed_vector == None:
-                seed_vector = pub.vector
-            else:
-                seed_vector = seed_vector + pub.vector
-
-                
-            pub_seeds.append(pub)
-            num_of_seeds += 1
-        seed_vector /= num_of_seeds # compute the centroid of the seeds as the seed vector
         
-        # compute pairwise distances
-        similarity_to_seed = []
-        for pub in grant.publications:
-            if pub in pub_seeds or pub.vector == None:
-                continue
-            similarity = cosine_similarity( pub.vector, seed_vector )
-#             print(similarity)
-            similarity_to_seed.append( (pub, similarity[0][0]) )
+        # compute the similarities of the candidates to the centroid of the seeds
+        if store is not None:
+            from embedding_store import score_candidates_dense
+            pub_seeds, similarity_to_seed = score_candidates_dense(grant, store)
+        else:
+            grant = body_vector(grant, root)
+            print(len( [ 1 for pub in grant.publications if pub.vector is not None ] ), "publications have vectors")
+            pub_seeds, similarity_to_seed = score_candidates(grant)
+        if similarities is not None:
+            similarities.add_grant(grant.grantID, pub_seeds, similarity_to_seed)
         
         # truncate the similar pubs 
-        similarity_to_seed = sorted( similarity_to_seed, key=lambda x:x[1], reverse=True )
-        grant_new = initial_new_grant( grant, pub_seeds )
-        for pub, simi in similarity_to_seed:
-            if simi < simi_threshold:
-                break
-            grant_new.addPublication(pub)
+        grant_new = recall_publications( grant, pub_seeds, similarity_to_seed, simi_threshold )
         grants_final.append(grant_new)        
         print(len(grant_new.publications), "publications are recalled")
         print("***\n")
+    return grants_final
+
+
+if __name__=='__main__':
+    
+    grant_withCandiPubs = pickle.load( open('../grantsWithCandiPubs.pkl', 'rb') ) # The pkl file is created in 'extend_known_grants'
+    simi_threshold = 0.9
+    
+    # "python tfidf_vectorizer.py dense" scores with the body embeddings built by 'embedding_store'
+    use_dense_store = len(sys.argv) > 1 and sys.argv[1] == 'dense'
+    if use_dense_store:
+        from embedding_store import EmbeddingStore
+        store = EmbeddingStore()
+    
+    # only one representative of each group of near-duplicates (created in 'near_duplicates') is scored
+    from near_duplicates import load_duplicate_map
+    duplicate_map = load_duplicate_map()
+    
+    similarities = SimilarityTable()
+    grants_final = recall_grant_publications(grant_withCandiPubs, simi_threshold, store if use_dense_store else None,
+                                             duplicate_map, similarities)
 
     # pickle grants_final
     pickle.dump( grants_final, open('../grants_final.pkl', 'wb') )
     
+    # keep the similarities so that other thresholds can be tried by 'threshold_sweep'
+    similarities.save('../similarities.npz')
+    print("Run metrics are written to", METRICS.save())
+    
     
-    
\ No newline at end of file
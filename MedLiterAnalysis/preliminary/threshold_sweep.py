@@ -0,0 +1,112 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Tune 'simi_threshold' without rerunning 'tfidf_vectorizer'.
+
+'tfidf_vectorizer' saves the similarity of every candidate publication to the
+centroid of its grant's seeds in a compressed columnar file (similarities.npz).
+This module reads that file once and writes grants_final_<threshold>.csv together
+with the publications-per-grant distribution of 'alter_representation.statistics'
+for each threshold.
+'''
+import csv, sys
+import numpy as np
+from alter_representation import pub_count_distribution
+
+
+class SimilarityTable:
+    """
+    Columns: grant_id, pub_path, score, is_seed  (one row per publication of a grant)
+    The seeds come first in each grant, followed by the candidates (the most similar first).
+    Seeds are always kept, so their score is NaN.
+    The pub_* columns keep what 'alter_representation.output_final_grants' writes for each publication.
+    """
+    def __init__(self):
+        self.grant_id = []
+        self.pub_path = []
+        self.score = []
+        self.is_seed = []
+        self.publications = {} # key: relative_path   value: [title, journal, authors, citation]
+
+    def __len__(self):
+        return len(self.grant_id)
+
+    def add_row(self, grantID, pub, score, isSeed):
+        self.grant_id.append(grantID)
+        self.pub_path.append(pub.relative_path)
+        self.score.append(score)
+        self.is_seed.append(isSeed)
+        if pub.relative_path not in self.publications:
+            self.publications[pub.relative_path] = [ pub.title or "", pub.journal or "",
+                                                     " & ".join(pub.authors or []),
+                                                     pub.citation if hasattr(pub, 'citation') else "" ]
+
+    def add_grant(self, grantID, pub_seeds, similarity_to_seed):
+        for pub in pub_seeds:
+            self.add_row(grantID, pub, np.nan, True)
+        for pub, simi in similarity_to_seed:
+            self.add_row(grantID, pub, simi, False)
+
+    def save(self, path):
+        paths = sorted(self.publications)
+        meta = [ self.publications[p] for p in paths ]
+        np.savez_compressed( path,
+                             grant_id=np.array(self.grant_id, dtype=str),
+                             pub_path=np.array(self.pub_path, dtype=str),
+                             score=np.array(self.score, dtype=np.float64),
+                             is_seed=np.array(self.is_seed, dtype=bool),
+                             pub_paths=np.array(paths, dtype=str),
+                             pub_meta=np.array(meta, dtype=str).reshape(len(paths), 4) )
+
+    @staticmethod
+    def load(path):
+        """ Returns a dict of numpy arrays, one per column. """
+        with np.load(path, allow_pickle=False) as data:
+            return { key: data[key] for key in data.files }
+
+
+def sweep(similarities, thresholds, output_pattern='../grants_final_%s.csv'):
+    """
+    Write the final grants of all thresholds in one pass over the similarities.
+    Returns { threshold: { pub_count: num_of_grants } }.
+    """
+    labels = sorted(set(thresholds))
+    thresholds = np.array(labels, dtype=np.float64) # the precision of the comparison in 'tfidf_vectorizer'
+    meta = dict( zip( similarities['pub_paths'], similarities['pub_meta'] ) )
+
+    outfiles = [ open(output_pattern % t, 'w', encoding="utf8", newline='') for t in labels ]
+    csv_writers = [ csv.writer(outfile) for outfile in outfiles ]
+
+    """ a candidate is recalled under all the thresholds which are not greater than its score """
+    score = similarities['score']
+    is_seed = similarities['is_seed']
+    num_recalled = np.where( is_seed, len(thresholds),
+                             np.searchsorted(thresholds, np.nan_to_num(score, nan=-np.inf), side='right') )
+
+    for grantID, path, k in zip(similarities['grant_id'], similarities['pub_path'], num_recalled):
+        if k == 0:
+            continue
+        row = [grantID, path] + list(meta[path])
+        for csv_writer in csv_writers[:k]:
+            csv_writer.writerow(row)
+    for outfile in outfiles:
+        outfile.close()
+
+    """ publications per grant under each threshold """
+    distributions = {}
+    for i, t in enumerate(labels):
+        distributions[t] = pub_count_distribution( similarities['grant_id'][ num_recalled > i ] )
+    return distributions
+
+
+if __name__ == "__main__":
+    """ e.g. python threshold_sweep.py 0.5 0.6 0.7 0.8 0.9 """
+    thresholds = [ float(t) for t in sys.argv[1:] ] or [0.5, 0.6, 0.7, 0.8, 0.9]
+    similarities = SimilarityTable.load('../similarities.npz')
+    print(len(similarities['grant_id']), "scored publications are read.")
+    distributions = sweep(similarities, thresholds)
+    for t, distribution in sorted(distributions.items()):
+        print("THRESHOLD", t, "-", sum( c * n for c, n in distribution.items() ), "publications")
+        print(distribution)
@@ -0,0 +1,133 @@
+'''
+Created on Oct 18, 2026
+
+@author: agent
+
+Match article titles against the titles of Scholar results.
+
+A title goes through one normalization pipeline:
+    clean_title       hyphens to spaces, unprintable characters dropped (what is sent to Scholar)
+    normalize_title   + lower case, punctuation to spaces, whitespace collapsed
+    title_key         the normalized title, to find the same title written differently
+    title_tokens      the set of its words
+
+Two titles are scored by the cosine of their binary word vectors, which for sets is
+|A & B| / sqrt(|A| * |B|); score_titles and best_match score a batch of candidates against one
+query title, TitleVectors scores many pairs at once with sparse matrices.
+
+    python title_matching.py [qualified_articles.csv]
+benchmarks the matching against scholar.compute_similarity on all the titles of the file.
+'''
+import csv, math, string, sys, time
+import numpy as np
+from scipy import sparse
+
+""" the unprintable ASCII characters, and a table mapping upper case to lower case and punctuation to spaces """
+UNPRINTABLE = bytes( c for c in range(128) if chr(c) not in string.printable )
+NORMALIZE_TABLE = bytes( ( c + 32 if 65 <= c <= 90 else c ) if chr(c).isalnum() or chr(c) == '_' else 32
+                         for c in range(128) ) + bytes( range(128, 256) )
+
+
+def clean_title(title):
+    """ non-ASCII characters are never printable, so they are dropped by the encoding """
+    title = title.replace("-", " ").encode('ascii', 'ignore')
+    return title.translate(None, UNPRINTABLE).decode('ascii')
+
+def _normalized_words(title):
+    title = title.replace("-", " ").encode('ascii', 'ignore')
+    return title.translate(NORMALIZE_TABLE, UNPRINTABLE).decode('ascii').split()
+
+def normalize_title(title):
+    return " ".join( _normalized_words(title) )
+
+def title_key(title):
+    """ titles differing only in whitespace, hyphens, punctuation or case have the same key """
+    return normalize_title(title)
+
+def title_tokens(title):
+    return frozenset( _normalized_words(title) )
+
+def set_cosine(tokens1, tokens2):
+    if not tokens1 or not tokens2:
+        return 0.0
+    return len(tokens1 & tokens2) / math.sqrt( len(tokens1) * len(tokens2) )
+
+def score_titles(query_title, titles):
+    """ the similarity of each title to the query title """
+    query = title_tokens(query_title)
+    return [ set_cosine( query, title_tokens(title) ) for title in titles ]
+
+def best_match(query_title, titles):
+    """ (index, similarity) of the most similar title, the first one on ties; (None, 0.0) if no title shares a word """
+    best, best_similarity = None, 0.0
+    for index, similarity in enumerate( score_titles(query_title, titles) ):
+        if similarity > best_similarity:
+            best, best_similarity = index, similarity
+    return best, best_similarity
+
+
+class TitleVectors:
+    """ L2-normalized binary word vectors of titles over a shared vocabulary """
+    def __init__(self):
+        self.vocabulary = {}
+
+    def transform(self, titles):
+        rows, cols = [], []
+        for row, title in enumerate(titles):
+            for token in title_tokens(title):
+                col = self.vocabulary.get(token)
+                if col is None:
+                    col = self.vocabulary[token] = len(self.vocabulary)
+                rows.append(row)
+                cols.append(col)
+        matrix = sparse.csr_matrix( ( np.ones(len(rows), dtype=np.float32), (rows, cols) ),
+                                    shape=( len(titles), max(1, len(self.vocabulary)) ) )
+        norms = np.sqrt( np.asarray( matrix.sum(axis=1) ).ravel() )
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+    def pair_scores(self, titles1, titles2):
+        """ the similarity of titles1[i] to titles2[i] for every i; each distinct title is vectorized once """
+        rows = {}
+        index1 = np.array( [ rows.setdefault( title, len(rows) ) for title in titles1 ], dtype=np.int64 )
+        index2 = np.array( [ rows.setdefault( title, len(rows) ) for title in titles2 ], dtype=np.int64 )
+        matrix = self.transform( sorted( rows, key=rows.get ) )
+        return np.asarray( matrix[index1].multiply( matrix[index2] ).sum(axis=1) ).ravel()
+
+
+def benchmark(titles, topk=5):
+    """ every title against itself and the next topk - 1 titles, as in the top results of a query """
+    from scholar import compute_similarity
+    queries = [ title for title in titles for _ in range(topk) ]
+    candidates = [ titles[ (i + k) % len(titles) ] for i in range( len(titles) ) for k in range(topk) ]
+
+    start = time.time()
+    baseline = [ compute_similarity( candidate.replace(",", " "), title ) for title, candidate in zip(queries, candidates) ]
+    baseline_time = time.time() - start
+
+    start = time.time()
+    sets = []
+    for i, title in enumerate(titles):
+        sets.extend( score_titles( title, candidates[i * topk : (i + 1) * topk] ) )
+    sets_time = time.time() - start
+
+    start = time.time()
+    vectors = TitleVectors().pair_scores(queries, candidates)
+    vectors_time = time.time() - start
+
+    picks = lambda scores: [ int( np.argmax( scores[i * topk : (i + 1) * topk] ) ) for i in range( len(titles) ) ]
+    return { 'titles': len(titles), 'pairs': len(queries),
+             'compute_similarity_seconds': round(baseline_time, 3),
+             'score_titles_seconds': round(sets_time, 3),
+             'title_vectors_seconds': round(vectors_time, 3),
+             'speedup_score_titles': round( baseline_time / sets_time, 1 ),
+             'speedup_title_vectors': round( baseline_time / vectors_time, 1 ),
+             'same_pick_as_compute_similarity': float( np.mean( np.array( picks(baseline) ) == np.array( picks(sets) ) ) ),
+             'max_difference_score_titles_vectors': float( np.max( np.abs( np.array(sets) - vectors ) ) ) }
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else '../qualified_articles.csv'
+    with open(path, 'r', encoding="utf8") as articles:
+        titles = [ line[3] for line in csv.reader(articles) ]
+    print( benchmark(titles) )